@@ -1,15 +1,24 @@
 import os
 import json
 import logging
-import requests
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pillow_heif import register_heif_opener
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
-from utils.llm_processor import process_with_openai
 from utils.rag_engine import RAGEngine
+from utils.context_assembler import ContextAssembler
+from utils.chat_pipeline import ChatPipeline, StageTimings
+from utils.history_manager import HistoryManager
+from utils.lab_extractor import LabValueExtractor
+from utils.llm_processor import render_prompt_metrics, summarize_history
+from utils.llm_provider import configure_llm_provider
+from utils.ingestion import IngestionQueue, IngestionQueueFull
+from utils.response_cache import SemanticResponseCache
+from utils.ml_client import CircuitBreaker, MLClient
+from utils.tracing import REQUEST_ID_HEADER, configure_trace_log, new_request_id, trace_request
 
 
 # 환경 변수 로드
@@ -23,6 +32,41 @@ logger = logging.getLogger(__name__)
 ML_API_URL = os.getenv('ML_API_URL', 'http://ml-backend:8000')
 LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+# OpenAI 호환 서버 주소/모델 (LLM_PROVIDER가 mock 또는 compatible일 때)
+LLM_BASE_URL = os.getenv('LLM_BASE_URL')
+LLM_MODEL = os.getenv('LLM_MODEL', 'gpt-4.1-mini')
+# 채팅 단계(RAG 검색, ML 예측)를 병렬로 실행할 스레드 수
+CHAT_PIPELINE_WORKERS = int(os.getenv('CHAT_PIPELINE_WORKERS', '8'))
+# RAG 컨텍스트: 검색할 청크 수, 프롬프트에 넣을 컨텍스트 토큰 예산, MMR 사용 여부
+RAG_CONTEXT_K = int(os.getenv('RAG_CONTEXT_K', '7'))
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv('RAG_CONTEXT_TOKEN_BUDGET', '2500'))
+RAG_USE_MMR = os.getenv('RAG_USE_MMR', 'false').lower() in ('1', 'true', 'yes')
+# 진료 지침 인제스트(파싱/OCR/임베딩) 백그라운드 스레드 수, 최대 대기 작업 수
+INGESTION_WORKERS = int(os.getenv('INGESTION_WORKERS', '1'))
+INGESTION_MAX_PENDING = int(os.getenv('INGESTION_MAX_PENDING', '16'))
+# 진료 지침 질문 응답 캐시: 최대 항목 수(0이면 사용 안 함), 유효 시간(초), 같은 질문으로 볼 유사도
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv('RESPONSE_CACHE_THRESHOLD', '0.95'))
+# 채팅 기록: 그대로 유지할 최근 대화 토큰 예산, 요약을 갱신할 미요약 대화 토큰 수
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '2000'))
+HISTORY_SUMMARY_REFRESH_TOKENS = int(os.getenv('HISTORY_SUMMARY_REFRESH_TOKENS', '1000'))
+# 검사 결과만 있는 메시지는 LLM 없이 규칙 기반으로 값을 추출해 바로 예측
+LAB_FAST_PATH = os.getenv('LAB_FAST_PATH', 'true').lower() in ('1', 'true', 'yes')
+# /api/chat/batch 한 번에 처리할 최대 환자 수
+CHAT_BATCH_MAX_PATIENTS = int(os.getenv('CHAT_BATCH_MAX_PATIENTS', '60'))
+# /api/chat/batch의 LLM 값 추출을 동시에 실행할 스레드 수 (채팅 파이프라인 스레드와 별도)
+CHAT_BATCH_LLM_WORKERS = int(os.getenv('CHAT_BATCH_LLM_WORKERS', '2'))
+# 요청별 span 기록(JSON 한 줄)을 따로 남길 파일 (없으면 일반 로그에만 출력)
+TRACE_LOG_PATH = os.getenv('TRACE_LOG_PATH')
+# ml-backend 클라이언트: keep-alive 연결 수, 제한 시간(초), 재시도 횟수
+ML_POOL_SIZE = int(os.getenv('ML_POOL_SIZE', str(CHAT_PIPELINE_WORKERS)))
+ML_CONNECT_TIMEOUT = float(os.getenv('ML_CONNECT_TIMEOUT', '1'))
+ML_READ_TIMEOUT = float(os.getenv('ML_READ_TIMEOUT', '5'))
+ML_MAX_RETRIES = int(os.getenv('ML_MAX_RETRIES', '2'))
+# 연속 실패 몇 번에 회로를 열지, 열린 뒤 몇 초 후 다시 시도할지
+ML_BREAKER_THRESHOLD = int(os.getenv('ML_BREAKER_THRESHOLD', '5'))
+ML_BREAKER_RESET = float(os.getenv('ML_BREAKER_RESET', '30'))
 
 # 디렉토리 설정
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'medical_guidelines')
@@ -33,12 +77,37 @@ CORS(app)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024 # 최대 50MB 업로드 제한
 
+# 요청 추적 로그 설정
+configure_trace_log(TRACE_LOG_PATH)
+
+# LLM 제공자 설정 (openai, mock, compatible)
+configure_llm_provider(LLM_PROVIDER, api_key=OPENAI_API_KEY, base_url=LLM_BASE_URL, model=LLM_MODEL)
+
 # RAG Engine initialize
 rag_engine = RAGEngine(
     medical_guidelines_dir = UPLOAD_FOLDER,
     vector_db_dir = os.path.join(os.getcwd(), 'data/vector_db'),
     embedding_model = "local",
-    openai_api_key = OPENAI_API_KEY
+    openai_api_key = OPENAI_API_KEY,
+    context_assembler = ContextAssembler(token_budget=RAG_CONTEXT_TOKEN_BUDGET),
+    use_mmr = RAG_USE_MMR
+)
+
+# 응답 캐시 initialize (진료 지침 파일이 바뀌면 자동 무효화)
+response_cache = SemanticResponseCache(
+    similarity_threshold = RESPONSE_CACHE_THRESHOLD,
+    max_entries = RESPONSE_CACHE_SIZE,
+    ttl = RESPONSE_CACHE_TTL,
+    version = rag_engine.guidelines_version
+) if RESPONSE_CACHE_SIZE > 0 else None
+
+# 진료 지침 인제스트 큐 initialize
+ingestion_queue = IngestionQueue(
+    rag_engine = rag_engine,
+    jobs_dir = os.path.join(os.getcwd(), 'data/ingestion_jobs'),
+    max_workers = INGESTION_WORKERS,
+    max_pending = INGESTION_MAX_PENDING,
+    on_complete = (lambda job: response_cache.invalidate()) if response_cache else None
 )
 
 # 혈액검사 매핑 정보 - 모델이 필요로 하는 입력 필드
@@ -58,122 +127,182 @@ RESULT_MAPPING = {
     "TPNCALCULATEDCALORI": "총 칼로리 공급량"
 }
 
+# 규칙 기반 혈액검사 값 추출기 initialize
+lab_extractor = LabValueExtractor() if LAB_FAST_PATH else None
+
+# ml-backend 클라이언트 initialize
+ml_client = MLClient(
+    ML_API_URL,
+    pool_size = ML_POOL_SIZE,
+    connect_timeout = ML_CONNECT_TIMEOUT,
+    read_timeout = ML_READ_TIMEOUT,
+    max_retries = ML_MAX_RETRIES,
+    breaker = CircuitBreaker(failure_threshold=ML_BREAKER_THRESHOLD, reset_timeout=ML_BREAKER_RESET)
+)
+
+# 채팅 파이프라인 initialize
+chat_pipeline = ChatPipeline(
+    rag_engine = rag_engine,
+    ml_client = ml_client,
+    blood_test_mapping = BLOOD_TEST_MAPPING,
+    result_mapping = RESULT_MAPPING,
+    executor = ThreadPoolExecutor(max_workers=CHAT_PIPELINE_WORKERS, thread_name_prefix="chat-pipeline"),
+    context_k = RAG_CONTEXT_K,
+    response_cache = response_cache,
+    history_manager = HistoryManager(
+        summarize = summarize_history,
+        budget_tokens = HISTORY_TOKEN_BUDGET,
+        refresh_tokens = HISTORY_SUMMARY_REFRESH_TOKENS
+    ),
+    lab_extractor = lab_extractor,
+    batch_executor = ThreadPoolExecutor(max_workers=CHAT_BATCH_LLM_WORKERS, thread_name_prefix="chat-batch")
+)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy"}), 200
+    # 회로가 열려 있어도 채팅(RAG 응답)은 가능하므로 degraded로만 표시
+    ml_state = ml_client.describe()
+    status = "healthy" if ml_state["breaker"]["state"] == CircuitBreaker.CLOSED else "degraded"
+    return jsonify({
+        "status": status,
+        "ml_backend": ml_state,
+        "response_cache": response_cache.describe() if response_cache else None
+    }), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    return Response(ml_client.render_metrics() + render_prompt_metrics() +
+                    (lab_extractor.render_metrics() if lab_extractor else ""), mimetype='text/plain; version=0.0.4')
+
+def debug_requested(data):
+    """
+    응답에 span 기록(trace)을 포함할지 (요청 본문 "debug": true 또는 ?debug=1)
+    """
+    return bool((data or {}).get('debug')) or request.args.get('debug', '').lower() in ('1', 'true', 'yes')
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
+    request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
     try:
         data = request.json
         user_message = data.get('message', '')
         chat_history = data.get('history', [])
 
-        logger.info(f"Received user message: {user_message}")
-
-        # RAG에서 관련 컨텍스트 검색
-        context_docs, combined_context = rag_engine.retrieve_relevant_context(user_message, k=7)
-
-        # 관련 내용이 있으면 로그에 기록
-        if context_docs:
-            logger.info(f"Found {len(context_docs)} relevant documents")
-            for i, doc in enumerate(context_docs):
-                logger.info(f"Document {i+1}: {doc['filename']}")
-
-        # LLM을 사용하여 혈액검사 값 추출
-        extracted_values, llm_response = process_with_openai(
-            user_message,
-            chat_history,
-            BLOOD_TEST_MAPPING,
-            context=combined_context
-        )
-
-        # 추출된 값이 있으면 ML 예측 실행
-        if extracted_values and all(key in extracted_values for key in BLOOD_TEST_MAPPING.keys()):
-            # 모델에 필요한 형식으로 데이터 포맷 변환
-            model_input = [[
-                extracted_values["glucose"],
-                extracted_values["albumin"],
-                extracted_values["bun"],
-                extracted_values["phosphorus"],
-                extracted_values["total_protein"]
-            ]]
-
-            # ML API에 예측 요청
-            try:
-                ml_response = requests.post(
-                    f"{ML_API_URL}/predict",
-                    json={"data": model_input},
-                    timeout=5
-                )
-
-                if ml_response.status_code == 200:
-                    prediction_results = ml_response.json()
-                    logger.info(f"ML prediction results: {prediction_results}")
-
-                    # 결과를 사용자 친화적 형식으로 변환
-                    formatted_results = {}
-                    for result in prediction_results:
-                        for key, value in result.items():
-                            formatted_name = RESULT_MAPPING.get(key, key)
-                            formatted_results[formatted_name] = round(value, 2)
-
-                    # LLM 응답에 예측 결과 추가
-                    final_response = f"{llm_response}\n\n**TPN 처방 계획**\n"
-                    for name, value in formatted_results.items():
-                        unit = "g" if "칼로리" not in name else "kcal"
-                        final_response += f"- {name}: {value} {unit}\n"
-
-                    # 참고 문서 정보 추가
-                    if context_docs:
-                        final_response += "\n\n**참고한 진료 지침**\n"
-                        for i, doc in enumerate(context_docs[:3]): # 최대 3개만 표시
-                            source_name = os.path.basename(doc['source'])
-                            final_response += f"{i+1}. {source_name}\n"
-
-                    return jsonify({
-                        "response": final_response,
-                        "prediction": formatted_results,
-                        "references": context_docs[:3] if context_docs else [] # 최대 3개의 참고 문서 정보 전달
-                    })
-                else:
-                    error_msg = f"ML API 오류: {ml_response.status_code} - {ml_response.text}"
-                    logger.error(error_msg)
-                    return jsonify({
-                        "response": f"{llm_response}\n\n죄송합니다. 예측 과정에서 오류가 발생했습니다. 다시 시도해 주세요.",
-                        "error": error_msg
-                    })
-            except requests.exceptions.RequestException as e:
-                logger.error(f"ML API 연결 오류: {str(e)}")
-                return jsonify({
-                    "response": f"{llm_response}\n\n죄송합니다. 기계 학습 예측 서비스에 연결할 수 없습니다. 잠시 후 다시 시도해 주세요.",
-                    "error": str(e)
-                })
-        else:
-            # 필요한 모든 값이 추출되지 않았을 경우,
-            # 그러나 RAG 문서가 있는 경우 참조 정보는 제공
-            final_response = llm_response
-
-            # 참고 문서 정보 추가
-            if context_docs:
-                final_response += "\n\n**참고한 진료 지침**\n"
-                for i, doc in enumerate(context_docs[:3]): # 최대 3개만 표시
-                    source_name = os.path.basename(doc['source'])
-                    page_info = f" (페이지 {doc.get('page', '?')})" if doc.get('page') else ""
-                    final_response += f"{i+1}. {source_name}{page_info}\n"
+        logger.info(f"Received user message [{request_id}]: {user_message}")
+
+        with trace_request(request_id, "/api/chat") as trace:
+            timings = StageTimings()
+            result, status_code = chat_pipeline.run(user_message, chat_history, timings)
+        if debug_requested(data):
+            result["trace"] = trace.to_dict()
+        response = jsonify(result)
+        response.headers['Server-Timing'] = timings.server_timing()
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response, status_code
 
-            return jsonify({
-                "response": final_response,
-                "references": context_docs[:3] if context_docs else [] # 최대 3개의 참고 문서 정보 전달
-            })
-        
     except Exception as e:
-        logger.exception("처리 중 오류 발생")
+        logger.exception(f"처리 중 오류 발생 [{request_id}]")
         return jsonify({
             "response": "죄송합니다. 요청을 처리하는 동안 오류가 발생했습니다.",
             "error": str(e)
-        }), 500
+        }), 500, {REQUEST_ID_HEADER: request_id}
+
+def format_sse(event, data):
+    """
+    Server-Sent Events 메시지 한 개로 직렬화
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    /api/chat과 같은 처리를 Server-Sent Events로 스트리밍
+    (token -> prediction 또는 error -> references -> done 순서)
+    """
+    data = request.json or {}
+    user_message = data.get('message', '')
+    chat_history = data.get('history', [])
+    request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+    debug = debug_requested(data)
+
+    logger.info(f"Received user message (stream) [{request_id}]: {user_message}")
+
+    def generate():
+        with trace_request(request_id, "/api/chat/stream") as trace:
+            try:
+                for event, payload in chat_pipeline.stream(user_message, chat_history):
+                    if event == "done" and debug:
+                        payload = {**payload, "trace": trace.to_dict()}
+                    yield format_sse(event, payload)
+            except Exception as e:
+                logger.exception(f"스트리밍 처리 중 오류 발생 [{request_id}]")
+                yield format_sse("error", {
+                    "error": str(e),
+                    "text": "죄송합니다. 요청을 처리하는 동안 오류가 발생했습니다."
+                })
+                yield format_sse("done", {"response": None})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # nginx 등 리버스 프록시가 응답을 모아서 보내지 않도록
+        'X-Accel-Buffering': 'no',
+        REQUEST_ID_HEADER: request_id
+    })
     
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    여러 환자의 혈액검사 결과를 한 번에 처리하고 환자별 결과를 Server-Sent Events로 스트리밍
+    (patient 이벤트가 완료되는 대로 -> references -> done)
+
+    요청 본문:
+        {"patients": [{"id": "NICU-3", "message": "Glucose 85, Albumin 3.1, ..."}, ...],
+         "question": "모든 환자에게 공통인 질문 (선택)"}
+    """
+    data = request.json or {}
+    patients = data.get('patients')
+    if not isinstance(patients, list) or not patients:
+        return jsonify({"error": "patients 목록이 필요합니다."}), 400
+    if len(patients) > CHAT_BATCH_MAX_PATIENTS:
+        return jsonify({"error": f"한 번에 최대 {CHAT_BATCH_MAX_PATIENTS}명까지 처리할 수 있습니다."}), 400
+
+    question = data.get('question')
+    if question is not None and not isinstance(question, str):
+        return jsonify({"error": "question은 문자열이어야 합니다."}), 400
+
+    # message/values 검증은 환자별로 하고, 잘못된 환자는 patient 이벤트의 error로 알림
+    normalized = []
+    for i, patient in enumerate(patients):
+        patient = patient if isinstance(patient, dict) else {}
+        normalized.append({**patient, "id": str(patient.get('id') or i + 1)})
+
+    request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+    debug = debug_requested(data)
+
+    logger.info(f"Received batch of {len(normalized)} patients [{request_id}]")
+
+    def generate():
+        with trace_request(request_id, "/api/chat/batch") as trace:
+            try:
+                for event, payload in chat_pipeline.run_batch(normalized, question):
+                    if event == "done" and debug:
+                        payload = {**payload, "trace": trace.to_dict()}
+                    yield format_sse(event, payload)
+            except Exception as e:
+                logger.exception(f"배치 처리 중 오류 발생 [{request_id}]")
+                yield format_sse("error", {
+                    "error": str(e),
+                    "text": "죄송합니다. 요청을 처리하는 동안 오류가 발생했습니다."
+                })
+                yield format_sse("done", {"patients": len(normalized)})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # nginx 등 리버스 프록시가 응답을 모아서 보내지 않도록
+        'X-Accel-Buffering': 'no',
+        REQUEST_ID_HEADER: request_id
+    })
+
 @app.route('/api/guidelines', methods=['GET'])
 def get_guidelines():
     """
@@ -216,34 +345,33 @@ def upload_guideline():
             filename = secure_korean_filename(file.filename)
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
 
-            # 파일 저장
-            file.save(file_path)
-
-            # 파일 유형 확인 및 처리
+            # 파일 유형 확인
             file_extension = os.path.splitext(filename)[1].lower()
-
             if file_extension == '.pdf':
-                # PDF 파일은 그 경로를 RAG 엔진으로 전달
                 file_type = 'pdf'
-                success = rag_engine.add_guideline(filename, "", file_type)
+            elif file_extension in ('.md', '.markdown'):
+                file_type = 'markdown'
             else:
-                # 텍스트 파일 내용 읽기
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                file_type = 'text'
 
-                # RAG 엔진에 추가
-                file_type = 'markdown' if filename.endswith(('.md', '.markdown')) else 'text'
-                success = rag_engine.add_guideline(filename, content, file_type)
+            # 파일 저장
+            file.save(file_path)
 
-            if success:
-                return jsonify({
-                    "message": "진료 지침이 성공적으로 업로드되었습니다.",
-                    "filename": filename
-                })
-            else:
+            # 파싱/임베딩은 백그라운드에서 처리하고 작업 ID를 바로 반환
+            try:
+                job = ingestion_queue.submit(filename, file_type)
+            except IngestionQueueFull:
+                os.remove(file_path)
                 return jsonify({
-                    "error": "진료 지침 처리 중 오류가 발생했습니다."
-                }), 500
+                    "error": "처리 대기 중인 진료 지침이 많습니다. 잠시 후 다시 시도해 주세요."
+                }), 503
+
+            return jsonify({
+                "message": "진료 지침 업로드가 접수되었습니다.",
+                "filename": filename,
+                "job_id": job.id,
+                "job": job.to_dict()
+            }), 202
             
     except Exception as e:
         logger.exception("진료 지침 업로드 중 오류 발생")
@@ -251,6 +379,18 @@ def upload_guideline():
             "error": str(e)
         }), 500
     
+@app.route('/api/guidelines/jobs/<job_id>', methods=['GET'])
+def get_ingestion_job(job_id):
+    """
+    진료 지침 인제스트 작업 상태 조회 (stage, 파싱한 페이지 수, 임베딩한 청크 수)
+    """
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": "해당 작업을 찾을 수 없습니다."
+        }), 404
+    return jsonify(job), 200
+
 @app.route('/api/guidelines/<filename>', methods=['DELETE'])
 def delete_guideline(filename):
     """
@@ -261,6 +401,8 @@ def delete_guideline(filename):
         success = rag_engine.delete_guideline(filename)
 
         if success:
+            if response_cache:
+                response_cache.invalidate()
             return jsonify({
                 "message": f"진료 지침 '{filename}'이 성공적으로 삭제되었습니다."
             })
@@ -297,5 +439,6 @@ def get_guideline(filename):
             "error": str(e)
         }), 500
 
+# 개발용 서버 (운영 환경은 init.sh -> gunicorn -c gunicorn.conf.py app:app)
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+/api/chat 종단 간 부하 테스트
+
+실행 중인 chatbot-backend (RAG + LLM + 실제 ml-backend)에 진료 지침 질문과 혈액검사
+수치 메시지를 섞어 동시성별로 보내고, 클라이언트 측 지연 시간과 응답의 Server-Timing
+헤더(retrieval, history, llm, ml, format 단계)의 p50/p95/p99를 집계한다.
+
+OpenAI 할당량을 쓰지 않도록 LLM은 benchmarks/mock_openai.py 대역 서버를 사용한다.
+
+    python benchmarks/mock_openai.py --port 8100 &
+    LLM_PROVIDER=mock LLM_BASE_URL=http://localhost:8100/v1 RESPONSE_CACHE_SIZE=0 gunicorn -c gunicorn.conf.py app:app &
+    python benchmarks/chat_load_test.py --url http://localhost:5000 --concurrency 1 8 --output run.json
+
+결과는 JSON으로 저장하고, 이전 결과와 비교하여 지연 시간 회귀를 확인할 수 있다
+(--compare, ml-backend/benchmarks/load_test.py와 같은 형식).
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+# 진료 지침 질문 (응답 캐시를 끄지 않으면 반복 질문은 캐시 적중으로 측정됨)
+GUIDELINE_QUESTIONS = (
+    "신생아 지질 시작 용량은 어떻게 되나요?",
+    "극소저체중출생아의 단백질 공급 목표량을 알려주세요.",
+    "TPN 포도당 주입 속도는 어떻게 증량하나요?",
+    "정맥 영양 중 고중성지방혈증이 생기면 어떻게 하나요?",
+    "미숙아의 칼슘과 인 공급 비율은 어떻게 되나요?",
+)
+
+# (이름, 최소, 최대, 소수 자릿수) - llm_processor 프롬프트의 정상 범위
+LAB_RANGES = (
+    ("혈당", 70.0, 100.0, 0),
+    ("알부민", 3.4, 5.4, 1),
+    ("BUN", 7.0, 20.0, 0),
+    ("인", 2.5, 4.5, 1),
+    ("총단백", 6.0, 8.3, 1),
+)
+
+PERCENTILES = (50, 95, 99)
+COMPARED_PERCENTILES = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def lab_message(rng: random.Random) -> str:
+    values = ", ".join(f"{name} {round(rng.uniform(low, high), decimals)}" for name, low, high, decimals in LAB_RANGES)
+    return f"환자 혈액검사 결과입니다: {values}. TPN 처방을 계산해 주세요."
+
+
+def generate_messages(n: int, lab_ratio: float, rng: random.Random) -> List[str]:
+    return [lab_message(rng) if rng.random() < lab_ratio else rng.choice(GUIDELINE_QUESTIONS) for _ in range(n)]
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """
+    "retrieval;dur=12.3, llm;dur=310.0" -> {"retrieval": 12.3, "llm": 310.0} (ms)
+    """
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {f"p{p}_ms": None for p in PERCENTILES}
+    ordered = sorted(values)
+    result = {}
+    for p in PERCENTILES:
+        # nearest-rank 백분위
+        index = max(0, math.ceil(p / 100.0 * len(ordered)) - 1)
+        result[f"p{p}_ms"] = ordered[index]
+    return result
+
+
+def run_case(url: str, messages: List[str], concurrency: int, timeout: float) -> Dict[str, Any]:
+    """
+    메시지를 `concurrency`개 스레드로 보내고 지연 시간/단계별 시간 집계
+    """
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, stage_values, errors, predictions = [], {}, [0], [0]
+
+    def send(message: str):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}/api/chat", json={"message": message, "history": []}, timeout=timeout)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            body = response.json()
+            ok = response.status_code == 200 and "error" not in body
+        except (requests.RequestException, ValueError):
+            with lock:
+                errors[0] += 1
+            return
+
+        with lock:
+            if not ok:
+                errors[0] += 1
+                return
+            latencies.append(elapsed)
+            if body.get("prediction"):
+                predictions[0] += 1
+            for stage, duration in parse_server_timing(response.headers.get("Server-Timing")).items():
+                stage_values.setdefault(stage, []).append(duration)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, messages))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "predictions": predictions[0],
+        "elapsed_s": elapsed,
+        "requests_per_s": len(latencies) / elapsed if elapsed > 0 else None,
+        **percentiles(latencies),
+        "stages": {stage: {"count": len(values), **percentiles(values)} for stage, values in sorted(stage_values.items())},
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    같은 동시성의 종단 간/단계별 백분위 지연 시간이 기준 결과보다 `tolerance` 비율 이상 느려졌는지 확인
+    """
+    baseline_cases = {case["concurrency"]: case for case in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        previous = baseline_cases.get(case["concurrency"])
+        if previous is None:
+            continue
+        pairs = [("end-to-end", case, previous)] + [
+            (stage, stats, previous["stages"][stage])
+            for stage, stats in case["stages"].items() if stage in previous.get("stages", {})
+        ]
+        for label, current, before in pairs:
+            for metric in COMPARED_PERCENTILES:
+                if before.get(metric) and current.get(metric) and current[metric] > before[metric] * (1 + tolerance):
+                    regressions.append(f"concurrency={case['concurrency']} {label} {metric}: "
+                                       f"{before[metric]:.1f}ms -> {current[metric]:.1f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /api/chat end to end and report per-stage latency percentiles")
+    parser.add_argument("--url", default="http://localhost:5000", help="chatbot-backend URL")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=100, help="requests per case")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each case")
+    parser.add_argument("--lab-ratio", type=float, default=0.5, help="fraction of messages carrying lab values")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for generated messages")
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP timeout in seconds")
+    parser.add_argument("--mock-llm-port", type=int,
+                        help="also serve benchmarks/mock_openai.py on this port (chatbot-backend must point LLM_BASE_URL at it)")
+    parser.add_argument("--mock-latency-ms", type=float, default=300.0, help="mock LLM delay before the first token")
+    parser.add_argument("--mock-tokens-per-second", type=float, default=80.0, help="mock LLM generation rate")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON results to check for latency regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before failing --compare")
+    args = parser.parse_args()
+
+    mock_server = None
+    if args.mock_llm_port:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from mock_openai import create_server
+
+        mock_server = create_server("0.0.0.0", args.mock_llm_port, args.mock_latency_ms, args.mock_tokens_per_second, 60)
+        threading.Thread(target=mock_server.serve_forever, daemon=True).start()
+        print(f"Mock LLM on http://localhost:{args.mock_llm_port}/v1")
+
+    rng = random.Random(args.seed)
+    cases = []
+    try:
+        for concurrency in args.concurrency:
+            run_case(args.url, generate_messages(args.warmup, args.lab_ratio, rng), concurrency, args.timeout)
+            case = {"concurrency": concurrency,
+                    **run_case(args.url, generate_messages(args.requests, args.lab_ratio, rng), concurrency, args.timeout)}
+            cases.append(case)
+            print(f"concurrency={concurrency:<3} {case['requests_per_s'] or 0:>6.2f} req/s  "
+                  f"p50={case['p50_ms'] or 0:.1f}ms p95={case['p95_ms'] or 0:.1f}ms p99={case['p99_ms'] or 0:.1f}ms "
+                  f"errors={case['errors']} predictions={case['predictions']}")
+            for stage, stats in case["stages"].items():
+                print(f"    {stage:<12} p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms")
+    finally:
+        if mock_server is not None:
+            mock_server.shutdown()
+
+    results = {
+        "url": args.url,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "requests_per_case": args.requests,
+        "lab_ratio": args.lab_ratio,
+        "seed": args.seed,
+        "mock_llm": {"latency_ms": args.mock_latency_ms, "tokens_per_second": args.mock_tokens_per_second}
+        if args.mock_llm_port else None,
+        "cases": cases,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Latency regressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No latency regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+OpenAI 호환 로컬 LLM 대역 서버 (부하 테스트용)
+
+POST /v1/chat/completions 만 구현한다. 실제 모델 대신
+
+- 마지막 사용자 메시지에 혈액검사 5개 항목 수치가 모두 있고 요청에 tools가 있으면
+  extract_blood_test_values tool call
+- 그 외에는 메시지 해시로 고른 결정적인 한국어 응답 텍스트
+
+를 돌려주며, 첫 토큰까지의 지연(--latency-ms)과 토큰 생성 속도(--tokens-per-second)를
+흉내 낸다. stream=true 요청에는 OpenAI와 같은 SSE 청크로 응답한다.
+
+    python benchmarks/mock_openai.py --port 8100 --latency-ms 300 --tokens-per-second 80
+    LLM_PROVIDER=mock LLM_BASE_URL=http://localhost:8100/v1 python app.py
+"""
+import argparse
+import hashlib
+import json
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# 항목별 이름 패턴 (llm_processor.BLOOD_TEST_TOOLS 인자 이름)
+LAB_PATTERNS = {
+    "glucose": r"(?:glucose|glu|혈당|포도당)",
+    "albumin": r"(?:albumin|alb|알부민)",
+    "bun": r"(?:bun|요소\s*질소|혈중요소질소)",
+    "phosphorus": r"(?:phosphorus|phos|인)",
+    "total_protein": r"(?:total\s*protein|tp|총\s*단백질?)",
+}
+_NUMBER = r"\s*[:=은는이가]?\s*(\d+(?:\.\d+)?)"
+
+RESPONSE_TEMPLATES = (
+    "제공된 진료 지침에 따르면 신생아의 정맥 영양은 체중과 재태 연령을 고려하여 단계적으로 증량합니다. "
+    "지질은 보통 1 g/kg/day로 시작하여 내약성을 확인하며 3 g/kg/day까지 증량합니다.",
+    "진료 지침에서는 단백질 공급을 생후 첫날부터 시작하도록 권고합니다. "
+    "초기 용량은 1.5-2 g/kg/day이며, 이후 3.5-4 g/kg/day까지 증량할 수 있습니다.",
+    "포도당 주입 속도는 4-6 mg/kg/min으로 시작하고 혈당을 확인하며 조절합니다. "
+    "고혈당이 지속되면 주입 속도를 줄이고 인슐린 사용을 고려합니다.",
+)
+
+
+def extract_lab_values(text: str) -> Dict[str, float]:
+    values = {}
+    for name, pattern in LAB_PATTERNS.items():
+        match = re.search(pattern + _NUMBER, text, re.IGNORECASE)
+        if match:
+            values[name] = float(match.group(1))
+    return values
+
+
+def split_tokens(text: str) -> List[str]:
+    """
+    응답 텍스트를 토큰 비슷한 조각(단어 + 뒤 공백)으로 분할
+    """
+    return re.findall(r"\S+\s*", text)
+
+
+class MockCompletion:
+    """
+    요청 하나에 대한 결정적인 응답 (텍스트 또는 tool call)
+    """
+
+    def __init__(self, request: Dict[str, Any], response_words: int):
+        messages = request.get("messages", [])
+        user_messages = [m.get("content") or "" for m in messages if m.get("role") == "user"]
+        last_user = user_messages[-1] if user_messages else ""
+
+        self.model = request.get("model", "mock")
+        self.prompt_tokens = sum(len(split_tokens(m.get("content") or "")) + 4 for m in messages)
+        self.tool_arguments: Optional[str] = None
+        self.text = ""
+
+        values = extract_lab_values(last_user)
+        if request.get("tools") and len(values) == len(LAB_PATTERNS):
+            self.tool_arguments = json.dumps(values)
+        else:
+            digest = int(hashlib.sha256(last_user.encode("utf-8")).hexdigest(), 16)
+            words = split_tokens(RESPONSE_TEMPLATES[digest % len(RESPONSE_TEMPLATES)])
+            # 템플릿을 반복해서 원하는 길이로 맞춤
+            self.text = "".join((words * (response_words // len(words) + 1))[:response_words]).strip()
+
+    @property
+    def completion_tokens(self) -> int:
+        return len(split_tokens(self.text)) if self.text else len(split_tokens(self.tool_arguments or ""))
+
+    def usage(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+        }
+
+    def tool_call(self, arguments: str) -> Dict[str, Any]:
+        return {
+            "index": 0,
+            "id": "call_mock",
+            "type": "function",
+            "function": {"name": "extract_blood_test_values", "arguments": arguments},
+        }
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 서버 인스턴스에서 설정
+    latency = 0.3
+    tokens_per_second = 80.0
+    response_words = 60
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        completion = MockCompletion(request, self.response_words)
+
+        time.sleep(self.latency)
+        if request.get("stream"):
+            self._stream(completion, include_usage=bool((request.get("stream_options") or {}).get("include_usage")))
+        else:
+            self._complete(completion)
+
+    def _token_delay(self, n_tokens: int):
+        if self.tokens_per_second > 0:
+            time.sleep(n_tokens / self.tokens_per_second)
+
+    def _complete(self, completion: MockCompletion):
+        self._token_delay(completion.completion_tokens)
+        message = {"role": "assistant", "content": completion.text or None}
+        if completion.tool_arguments:
+            message["tool_calls"] = [completion.tool_call(completion.tool_arguments)]
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": completion.model,
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if completion.tool_arguments else "stop",
+            }],
+            "usage": completion.usage(),
+        })
+
+    def _stream(self, completion: MockCompletion, include_usage: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def send(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage=None):
+            chunk = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": completion.model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        if completion.tool_arguments:
+            # 인자를 여러 조각으로 나눠 보냄 (실제 API와 같이 클라이언트가 이어 붙여야 함)
+            arguments = completion.tool_arguments
+            step = max(1, len(arguments) // 4)
+            for start in range(0, len(arguments), step):
+                piece = arguments[start:start + step]
+                call = completion.tool_call(piece)
+                if start:
+                    call = {"index": 0, "function": {"arguments": piece}}
+                send({"tool_calls": [call]})
+                self._token_delay(1)
+            send({}, finish_reason="tool_calls")
+        else:
+            for token in split_tokens(completion.text):
+                send({"content": token})
+                self._token_delay(1)
+            send({}, finish_reason="stop")
+
+        if include_usage:
+            send({}, usage=completion.usage())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(host: str, port: int, latency_ms: float, tokens_per_second: float,
+                  response_words: int) -> ThreadingHTTPServer:
+    handler = type("ConfiguredMockOpenAIHandler", (MockOpenAIHandler,), {
+        "latency": latency_ms / 1000.0,
+        "tokens_per_second": tokens_per_second,
+        "response_words": response_words,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a deterministic OpenAI-compatible chat completions stand-in")
+    parser.add_argument("--host", default="0.0.0.0", help="bind address")
+    parser.add_argument("--port", type=int, default=8100, help="bind port")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="generation rate (0 for no delay)")
+    parser.add_argument("--response-words", type=int, default=60, help="length of text responses in words")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency_ms, args.tokens_per_second, args.response_words)
+    print(f"Mock OpenAI server on http://{args.host}:{args.port}/v1 "
+          f"(latency={args.latency_ms:.0f}ms, {args.tokens_per_second:.0f} tokens/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
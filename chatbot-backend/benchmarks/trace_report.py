@@ -0,0 +1,133 @@
+"""
+요청 추적 로그 집계 (로컬 수집기)
+
+chatbot-backend(TRACE_LOG_PATH 또는 일반 로그)와 ml-backend 로그에서 요청별 span 기록
+JSON 줄을 읽어, 서비스/span 이름별 호출 수와 p50/p95/p99 소요 시간, 그리고 요청 전체
+시간에서 각 span이 차지하는 비율을 출력한다. 두 서비스의 기록은 request_id로 연결된다.
+
+    TRACE_LOG_PATH=traces.jsonl gunicorn -c gunicorn.conf.py app:app
+    docker compose logs ml-backend > ml.log
+    python benchmarks/trace_report.py traces.jsonl ml.log
+    python benchmarks/trace_report.py traces.jsonl --request-id 3f2c...   # 요청 하나의 span 트리
+"""
+import argparse
+import json
+import math
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+PERCENTILES = (50, 95, 99)
+
+
+def read_traces(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    로그 파일에서 span 기록 JSON 줄만 읽음 (로거 접두어가 붙은 줄도 허용)
+    """
+    traces = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                start = line.find("{")
+                if start < 0 or '"request_id"' not in line or '"spans"' not in line:
+                    continue
+                try:
+                    record = json.loads(line[start:])
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and "request_id" in record and "spans" in record:
+                    traces.append(record)
+    return traces
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    ordered = sorted(values)
+    # nearest-rank 백분위
+    return {f"p{p}": ordered[max(0, math.ceil(p / 100.0 * len(ordered)) - 1)] for p in PERCENTILES}
+
+
+def summarize(traces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    (서비스, 요청 이름, span 이름)별 소요 시간 백분위와 요청 전체 시간 대비 비율
+    """
+    groups: Dict[tuple, List[float]] = {}
+    totals: Dict[tuple, float] = {}
+    for trace in traces:
+        service, name = trace.get("service", "?"), trace.get("name", "?")
+        groups.setdefault((service, name, "(request)"), []).append(trace.get("duration_ms") or 0.0)
+        totals[(service, name)] = totals.get((service, name), 0.0) + (trace.get("duration_ms") or 0.0)
+        for span in trace["spans"]:
+            if span.get("duration_ms") is not None:
+                groups.setdefault((service, name, span["name"]), []).append(span["duration_ms"])
+
+    rows = []
+    for (service, name, span_name), durations in sorted(groups.items()):
+        total = totals.get((service, name)) or 0.0
+        rows.append({
+            "service": service,
+            "request": name,
+            "span": span_name,
+            "count": len(durations),
+            **percentiles(durations),
+            "share": sum(durations) / total if total and span_name != "(request)" else None,
+        })
+    return rows
+
+
+def print_tree(traces: List[Dict[str, Any]], request_id: str):
+    """
+    요청 하나의 span을 부모-자식 순서로 출력 (ml-backend 기록은 같은 request_id로 덧붙임)
+    """
+    matched = [trace for trace in traces if trace["request_id"] == request_id]
+    if not matched:
+        print(f"No trace for request_id {request_id}")
+        sys.exit(1)
+
+    for trace in matched:
+        print(f"[{trace.get('service', '?')}] {trace.get('name', '?')} {trace.get('duration_ms', 0):.1f}ms")
+        children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+        for span in trace["spans"]:
+            children.setdefault(span.get("parent"), []).append(span)
+
+        def walk(parent: Optional[int], depth: int):
+            for span in sorted(children.get(parent, []), key=lambda s: s.get("start_ms") or 0.0):
+                start = f"+{span['start_ms']:.1f}ms " if span.get("start_ms") is not None else ""
+                attributes = f" {span['attributes']}" if span.get("attributes") else ""
+                error = f" error={span['error']}" if span.get("error") else ""
+                print(f"{'  ' * (depth + 1)}{start}{span['name']} {span.get('duration_ms') or 0:.1f}ms{attributes}{error}")
+                if "id" in span:
+                    walk(span["id"], depth + 1)
+
+        walk(None, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate request trace JSON lines from chatbot-backend and ml-backend logs")
+    parser.add_argument("logs", nargs="+", help="log files containing trace JSON lines")
+    parser.add_argument("--request-id", help="print the span tree of a single request instead of the summary")
+    parser.add_argument("--output", help="write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    traces = read_traces(args.logs)
+    if args.request_id:
+        print_tree(traces, args.request_id)
+        return
+
+    rows = summarize(traces)
+    requests = len({trace["request_id"] for trace in traces})
+    print(f"{len(traces)} traces, {requests} request ids")
+    print(f"{'service':<16} {'request':<18} {'span':<22} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'share':>6}")
+    for row in rows:
+        share = f"{row['share']:.0%}" if row["share"] is not None else ""
+        print(f"{row['service']:<16} {row['request']:<18} {row['span']:<22} {row['count']:>6} "
+              f"{row['p50']:>7.1f}ms {row['p95']:>7.1f}ms {row['p99']:>7.1f}ms {share:>6}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"traces": len(traces), "requests": requests, "spans": rows}, f, indent=2, ensure_ascii=False)
+        print(f"Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
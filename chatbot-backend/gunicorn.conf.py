@@ -0,0 +1,48 @@
+"""
+chatbot-backend 운영용 gunicorn 설정
+
+    gunicorn -c gunicorn.conf.py app:app
+
+- preload_app: 마스터 프로세스가 app.py를 한 번만 import해서 임베딩 모델과 RAGEngine을
+  로드하고 진료 지침 인덱싱도 한 번만 실행한 뒤 워커를 fork (워커는 모델 메모리를
+  copy-on-write로 공유)
+- gthread 워커: 워커 하나가 여러 요청(스트리밍 응답 포함)을 스레드로 동시에 처리
+- 워커는 1개로 고정: 진료 지침 벡터 저장소(로컬 Chroma)는 프로세스마다 HNSW 인덱스를
+  메모리에 따로 올리므로, 워커가 여러 개면 한 워커에서 추가/삭제한 지침이 다른 워커의
+  검색에 재시작 전까지 반영되지 않음. 동시 요청은 CHATBOT_THREADS로 늘림
+"""
+import gc
+import os
+
+# fork 이후 tokenizers 병렬 처리가 교착되지 않도록 (import 전에 설정)
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = os.getenv("CHATBOT_BIND", "0.0.0.0:5000")
+# 벡터 저장소를 여러 프로세스가 공유할 수 없으므로 CHATBOT_WORKERS와 관계없이 1개
+requested_workers = int(os.getenv("CHATBOT_WORKERS", "1"))
+workers = 1
+worker_class = "gthread"
+threads = int(os.getenv("CHATBOT_THREADS", "8"))
+# LLM 응답과 문서 업로드(OCR)는 오래 걸릴 수 있음
+timeout = int(os.getenv("CHATBOT_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+accesslog = "-"
+
+
+def when_ready(server):
+    # 모델 로드가 끝난 객체들을 GC 추적 대상에서 빼서, 워커의 GC가 참조 카운트 영역을
+    # 건드려 공유 페이지를 복사하는 일을 줄임
+    gc.freeze()
+    if requested_workers > workers:
+        server.log.warning(f"CHATBOT_WORKERS={requested_workers} ignored: the local Chroma vector store "
+                           f"supports a single worker process, raise CHATBOT_THREADS instead")
+    server.log.info(f"Preloaded app, forking {workers} workers x {threads} threads")
+
+
+def post_fork(server, worker):
+    # 마스터에서 연 Chroma(SQLite) 연결은 프로세스 간에 공유하면 안 되므로 워커에서 다시 연결
+    import app as chatbot_app
+
+    chatbot_app.rag_engine.embedding_manager.reopen_vector_store()
@@ -0,0 +1,3 @@
+#!/bin/bash
+
+exec gunicorn -c gunicorn.conf.py app:app
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# chatbot-backend의 utils 패키지를 테스트에서 바로 import할 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
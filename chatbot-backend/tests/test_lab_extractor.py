@@ -0,0 +1,95 @@
+"""
+규칙 기반 혈액검사 값 추출기(LabValueExtractor) 테스트
+
+추출 결과가 확실하면 LLM 없이 바로 TPN 예측에 쓰이므로, 애매한 입력은 반드시
+confident가 아니어야 한다.
+
+    cd chatbot-backend && python -m pytest tests
+"""
+import pytest
+
+from utils.lab_extractor import LabValueExtractor
+
+FULL_PANEL = {"glucose": 85.0, "albumin": 3.1, "bun": 12.0, "phosphorus": 5.2, "total_protein": 5.4}
+
+
+@pytest.fixture
+def extractor():
+    return LabValueExtractor()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Glucose 85, Albumin 3.1, BUN 12, P 5.2, TP 5.4", FULL_PANEL),
+    ("glucose: 85 / alb = 3.1 / bun 12 / phos 5.2 / total protein 5.4", FULL_PANEL),
+    ("혈당 85 알부민 3.1 BUN 12 인 5.2 총단백 5.4", FULL_PANEL),
+    ("혈당은 85, 알부민은 3.1, 요소질소 12, 인 5.2, 총 단백질 5.4 입니다.", FULL_PANEL),
+    ("Glucose 85 mg/dL, Albumin 3.1 g/dL, BUN 12 mg/dL, Phosphorus 5.2 mg/dL, Total protein 5.4 g/dL", FULL_PANEL),
+    # mmol/L, g/L은 모델 입력 단위(mg/dL, g/dL)로 환산
+    ("Glucose 4.7 mmol/L, Albumin 31 g/L, BUN 4.3 mmol/L, Phosphorus 1.7 mmol/L, Total protein 54 g/L",
+     {"glucose": 84.68, "albumin": 3.1, "bun": 12.04, "phosphorus": 5.26, "total_protein": 5.4}),
+])
+def test_full_panel_is_confident(extractor, text, expected):
+    extraction = extractor.extract(text)
+    assert extraction.values == pytest.approx(expected)
+    assert extraction.issues == []
+    assert extraction.confident
+
+
+@pytest.mark.parametrize("text, expected", [
+    # "TP"의 "P"를 인으로, "확인"의 "인"을 인으로 읽지 않음
+    ("TP 5.4", {"total_protein": 5.4}),
+    ("P 5.2", {"phosphorus": 5.2}),
+    ("결과 확인 5번 부탁", {}),
+    # 다른 검사 항목(pH, PO2)은 인으로 읽지 않음
+    ("pH 7.35, PO2 80", {}),
+    # 문장 끝 마침표는 숫자의 일부가 아님
+    ("Albumin 3.1.", {"albumin": 3.1}),
+    # 같은 값이 두 번 나오면 문제 없음
+    ("Glucose 85, glucose 85", {"glucose": 85.0}),
+])
+def test_partial_matches(extractor, text, expected):
+    extraction = extractor.extract(text)
+    assert extraction.values == pytest.approx(expected)
+    assert extraction.issues == []
+    assert not extraction.confident
+
+
+@pytest.mark.parametrize("text, issue", [
+    ("Glucose 85-90", "glucose: value range"),
+    ("Glucose 85 ~ 90", "glucose: value range"),
+    ("Glucose 85, glucose 90", "glucose: conflicting values"),
+    ("Glucose 85 g/L", "glucose: unexpected unit"),
+    # mg/dL 값에 mmol/L 단위를 붙이면 범위를 벗어나므로 거부
+    ("Glucose 85 mmol/L", "glucose: 1531.36 mg/dL outside plausible range"),
+    ("Albumin 31", "albumin: 31.0 g/dL outside plausible range"),
+])
+def test_ambiguous_values_are_reported(extractor, text, issue):
+    # 나머지 항목이 모두 정상이어도 문제가 있는 항목 하나 때문에 LLM으로 넘겨야 함
+    extraction = extractor.extract(f"{text}, BUN 12, P 5.2, TP 5.4")
+    assert any(found.startswith(issue) for found in extraction.issues), extraction.issues
+    assert not extraction.confident
+
+
+@pytest.mark.parametrize("suffix, has_question", [
+    ("", False),
+    (" 입니다.", False),
+    ("?", True),
+    (" 어떻게 하나요", True),
+    (" TPN 처방 알려줘", True),
+    (" 왜 이렇게 나왔을까요", True),
+])
+def test_question_detection(extractor, suffix, has_question):
+    extraction = extractor.extract("Glucose 85, Albumin 3.1, BUN 12, P 5.2, TP 5.4" + suffix)
+    assert extraction.complete
+    assert extraction.has_question is has_question
+    assert extraction.confident is not has_question
+
+
+def test_metrics_count_results(extractor):
+    extractor.extract("Glucose 85, Albumin 3.1, BUN 12, P 5.2, TP 5.4")
+    extractor.extract("Glucose 85")
+    extractor.extract("안녕하세요")
+    metrics = extractor.render_metrics()
+    assert 'lab_extractor_messages_total{result="fast_path"} 1' in metrics
+    assert 'lab_extractor_messages_total{result="partial"} 1' in metrics
+    assert 'lab_extractor_messages_total{result="none"} 1' in metrics
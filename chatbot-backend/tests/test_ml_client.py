@@ -0,0 +1,132 @@
+"""
+ml-backend 클라이언트의 회로 차단기(CircuitBreaker)와 재시도 테스트
+
+    cd chatbot-backend && python -m pytest tests
+"""
+import pytest
+import requests
+
+from utils.ml_client import CircuitBreaker, CircuitOpenError, MLClient
+
+
+def make_response(status_code: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+class FakeSession:
+    """
+    session.post 대신 미리 정한 결과(응답 또는 예외)를 순서대로 돌려줌
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def make_client(*outcomes, breaker=None, max_retries=2):
+    client = MLClient("http://ml-backend:8000", max_retries=max_retries, backoff=0,
+                      breaker=breaker or CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    client.session = FakeSession(*outcomes)
+    return client
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.describe()["rejected_count"] == 1
+    assert breaker.describe()["opened_count"] == 1
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("trial_succeeds, final_state", [
+    (True, CircuitBreaker.CLOSED),
+    (False, CircuitBreaker.OPEN),
+])
+def test_half_open_allows_a_single_trial(trial_succeeds, final_state):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    assert breaker.allow()
+    # 시험 호출이 끝나기 전의 다른 호출은 거부
+    assert not breaker.allow()
+
+    if trial_succeeds:
+        breaker.record_success()
+    else:
+        breaker.reset_timeout = 60
+        breaker.record_failure()
+    assert breaker.state == final_state
+
+
+def test_client_retries_connection_errors_then_raises():
+    client = make_client(*[requests.exceptions.ConnectionError("refused")] * 3)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.predict([[85, 3.1, 12, 5.2, 5.4]])
+    assert client.session.calls == 3
+    assert client.describe()["retries"] == 2
+    assert client.describe()["failures"] == 1
+
+
+def test_client_retries_503_then_returns_success():
+    client = make_client(make_response(503), make_response(200))
+    assert client.predict([[85, 3.1, 12, 5.2, 5.4]]).status_code == 200
+    assert client.session.calls == 2
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_treats_4xx_as_backend_alive():
+    client = make_client(make_response(400), max_retries=0)
+    assert client.predict([[1]]).status_code == 400
+    assert client.describe()["failures"] == 0
+
+
+def test_open_circuit_rejects_without_calling_backend():
+    client = make_client(requests.exceptions.Timeout(), requests.exceptions.Timeout(), max_retries=0)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.Timeout):
+            client.predict([[1]])
+    with pytest.raises(CircuitOpenError):
+        client.predict([[1]])
+    assert client.session.calls == 2
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ChunkedEncodingError("truncated"),
+    requests.exceptions.InvalidURL("bad url"),
+    ValueError("unexpected"),
+])
+def test_non_retryable_error_releases_half_open_trial(error):
+    # 재시도하지 않는 오류로 시험 호출이 끝나도 슬롯이 풀려 회로가 다시 열려야 함
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    client = make_client(error, make_response(200), breaker=breaker, max_retries=0)
+
+    with pytest.raises(type(error)):
+        client.predict([[1]])
+    assert client.session.calls == 1
+
+    # reset_timeout이 0이므로 바로 half_open이 되어 다음 시험 호출이 가능
+    assert client.predict([[1]]).status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,643 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from utils.llm_processor import (
+    EMPTY_RESPONSE_TEXT, ERROR_RESPONSE_TEXT, build_history_messages, process_with_openai, stream_with_openai
+)
+from utils.history_manager import HistoryManager
+from utils.lab_extractor import ANALYTES, LabValueExtractor
+from utils.ml_client import CircuitOpenError, MLClient
+from utils.response_cache import CachedResponse, SemanticResponseCache, contains_lab_values, context_digest
+from utils.tracing import bind_context, span
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 배치 요청에 공통 질문이 없을 때 참고 문서 검색에 쓸 질문
+BATCH_RETRIEVAL_QUERY = "혈액검사 결과에 따른 신생아 TPN 처방 지침"
+
+
+class MLPredictionError(Exception):
+    """
+    ML 예측 실패 (응답에 붙일 안내 문구 포함)
+    """
+
+    def __init__(self, error: str, text: str):
+        super().__init__(error)
+        self.error = error
+        self.text = text
+
+
+class StageTimings:
+    """
+    채팅 한 턴의 단계별 소요 시간 기록
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.stages = {}
+
+    def mark(self, stage: str):
+        """
+        턴 시작부터 지금까지의 경과 시간을 `stage`로 기록 (첫 토큰 시각 등)
+        """
+        self.stages[stage] = time.perf_counter() - self._start
+
+    def measure(self, stage: str, fn: Callable, *args, **kwargs):
+        """
+        함수를 실행하고 소요 시간을 `stage`로 기록 (워커 스레드에서 호출해도 됨)
+
+        요청 Trace가 있으면 같은 이름의 span으로도 기록
+        """
+        start = time.perf_counter()
+        try:
+            with span(stage):
+                return fn(*args, **kwargs)
+        finally:
+            self.stages[stage] = time.perf_counter() - start
+
+    def server_timing(self) -> str:
+        """
+        HTTP Server-Timing 헤더 값 (부하 테스트에서 단계별 지연 시간 집계용)
+        """
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+    def summary(self) -> str:
+        stages = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in self.stages.items())
+        return f"{stages} total={(time.perf_counter() - self._start) * 1000:.1f}ms"
+
+
+class ChatPipeline:
+    """
+    채팅 한 턴(RAG 검색 -> LLM -> ML 예측)을 단계 간 대기 없이 겹쳐서 실행하는 파이프라인
+
+    - RAG 검색은 요청을 받자마자 워커 스레드에서 시작하고, 그동안 채팅 기록을 변환
+    - LLM 응답에서 혈액검사 값이 파싱되면 즉시 ML 예측을 시작하고, 예측이 진행되는
+      동안 LLM 응답과 참고 문서 목록을 정리
+    - 메시지에서 5개 혈액검사 값을 규칙 기반으로 확실하게 추출할 수 있으면 LLM을 건너뛰고
+      바로 ML 예측을 시작하며, 그동안 참고 문서를 검색
+    """
+
+    def __init__(self, rag_engine, ml_client: MLClient, blood_test_mapping: Dict[str, int],
+                 result_mapping: Dict[str, str], executor: ThreadPoolExecutor,
+                 context_k: int = 7, response_cache: Optional[SemanticResponseCache] = None,
+                 history_manager: Optional[HistoryManager] = None,
+                 lab_extractor: Optional[LabValueExtractor] = None,
+                 batch_executor: Optional[ThreadPoolExecutor] = None):
+        """
+        ChatPipeline 초기화
+
+        Args:
+            rag_engine: RAGEngine 인스턴스
+            ml_client: ml-backend 클라이언트 (연결 풀, 회로 차단기)
+            blood_test_mapping: 혈액검사 필드 이름 -> 모델 입력 위치
+            result_mapping: ML 출력 이름 -> 사용자에게 보일 이름
+            executor: 단계를 병렬로 실행할 스레드 풀
+            context_k: 검색할 문서 수
+            response_cache: 진료 지침 질문 응답 캐시 (없으면 캐시하지 않음)
+            history_manager: 채팅 기록 압축기 (없으면 채팅 기록 전체를 그대로 전달)
+            lab_extractor: 규칙 기반 혈액검사 값 추출기 (없으면 항상 LLM으로 추출)
+            batch_executor: 일괄 처리의 LLM 값 추출을 실행할 스레드 풀 (없으면 `executor` 사용).
+                일괄 처리가 채팅 요청의 워커를 모두 차지하지 않도록 따로 둠
+        """
+        self.rag_engine = rag_engine
+        self.ml_client = ml_client
+        self.blood_test_mapping = blood_test_mapping
+        self.result_mapping = result_mapping
+        self.executor = executor
+        self.context_k = context_k
+        self.response_cache = response_cache
+        self.history_manager = history_manager
+        self.lab_extractor = lab_extractor
+        self.batch_executor = batch_executor or executor
+
+    def run(self, user_message: str, chat_history: List[Dict[str, Any]],
+            timings: Optional[StageTimings] = None) -> Tuple[Dict[str, Any], int]:
+        """
+        채팅 한 턴 처리
+
+        Args:
+            user_message: 사용자 메시지
+            chat_history: 채팅 기록
+            timings: 단계별 소요 시간을 기록할 객체 (호출자가 응답 헤더 등에 사용)
+
+        Returns:
+            (응답 JSON 딕셔너리, HTTP 상태 코드) 튜플
+        """
+        timings = timings or StageTimings()
+        fast_values = self._fast_path_values(user_message, timings)
+        if fast_values is not None:
+            try:
+                prediction, llm_response, references, context_docs = self._start_fast_path(user_message, fast_values, timings)
+                return self._prediction_response(prediction, llm_response, references, context_docs)
+            finally:
+                logger.info(f"Chat pipeline timings (fast path): {timings.summary()}")
+
+        history_messages, context_docs, combined_context, cache_key = self._prepare(user_message, chat_history, timings)
+
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"Chat pipeline timings (cached): {timings.summary()}")
+            return {
+                "response": cached.llm_response + cached.references_text,
+                "references": cached.references
+            }, 200
+
+        # LLM을 사용하여 혈액검사 값 추출
+        extracted_values, llm_response = timings.measure(
+            "llm", process_with_openai,
+            user_message,
+            chat_history,
+            self.blood_test_mapping,
+            context=combined_context,
+            history_messages=history_messages
+        )
+
+        try:
+            # 추출된 값이 있으면 ML 예측을 바로 시작하고, 그동안 응답 텍스트를 정리
+            if self._has_all_values(extracted_values):
+                prediction = self.executor.submit(bind_context(timings.measure), "ml", self._request_prediction, extracted_values)
+                references = timings.measure("format", self._format_references, context_docs, with_pages=False)
+                return self._prediction_response(prediction, llm_response, references, context_docs)
+
+            # 필요한 모든 값이 추출되지 않았을 경우,
+            # 그러나 RAG 문서가 있는 경우 참조 정보는 제공
+            references = timings.measure("format", self._format_references, context_docs, with_pages=True)
+            reference_docs = context_docs[:3] if context_docs else [] # 최대 3개의 참고 문서 정보 전달
+            self._store_response(cache_key, extracted_values, llm_response, references, reference_docs)
+            return {
+                "response": llm_response + references,
+                "references": reference_docs
+            }, 200
+        finally:
+            logger.info(f"Chat pipeline timings: {timings.summary()}")
+
+    def stream(self, user_message: str, chat_history: List[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        채팅 한 턴을 이벤트 단위로 처리 (Server-Sent Events 응답용)
+
+        - ("token", {"text"}): LLM 응답 토큰 (받는 대로)
+        - ("prediction", {"prediction", "text"}): TPN 예측 결과와 응답에 덧붙일 처방 계획 텍스트
+        - ("error", {"error", "text"}): ML 예측 실패
+        - ("references", {"references", "text"}): 참고 문서와 응답에 덧붙일 목록 텍스트
+        - ("done", {"response"}): 최종 응답 전체 (비스트리밍 응답의 "response"와 같음)
+
+        Args:
+            user_message: 사용자 메시지
+            chat_history: 채팅 기록
+
+        Yields:
+            (이벤트 이름, 데이터 딕셔너리) 튜플
+        """
+        timings = StageTimings()
+        try:
+            fast_values = self._fast_path_values(user_message, timings)
+            if fast_values is not None:
+                yield from self._stream_fast_path(user_message, fast_values, timings)
+                return
+
+            history_messages, context_docs, combined_context, cache_key = self._prepare(user_message, chat_history, timings)
+
+            cached = self._cached_response(cache_key)
+            if cached is not None:
+                yield "token", {"text": cached.llm_response}
+                yield "references", {"references": cached.references, "text": cached.references_text}
+                yield "done", {"response": cached.llm_response + cached.references_text}
+                return
+
+            response_text = ""
+            extracted_values = {}
+            prediction = None
+            reference_docs = context_docs[:3] if context_docs else [] # 최대 3개의 참고 문서 정보 전달
+            llm_start = time.perf_counter()
+
+            for kind, value in stream_with_openai(user_message, chat_history, self.blood_test_mapping,
+                                                  context=combined_context, history_messages=history_messages):
+                if kind == "token":
+                    if not response_text:
+                        timings.mark("first_token")
+                    response_text += value
+                    yield "token", {"text": value}
+                elif kind == "values":
+                    extracted_values = value
+                    # tool call 인자가 완성되는 즉시 ML 예측 시작
+                    if self._has_all_values(extracted_values):
+                        prediction = self.executor.submit(bind_context(timings.measure), "ml", self._request_prediction, extracted_values)
+            timings.stages["llm"] = time.perf_counter() - llm_start
+
+            if prediction is not None:
+                references = timings.measure("format", self._format_references, context_docs, with_pages=False)
+                try:
+                    formatted_results, plan = self._format_prediction(prediction.result())
+                    response_text += plan
+                    yield "prediction", {"prediction": formatted_results, "text": plan}
+                except MLPredictionError as e:
+                    response_text += e.text
+                    yield "error", {"error": e.error, "text": e.text}
+                    # 비스트리밍 응답과 같이 예측 실패 시 참고 문서는 생략
+                    references, reference_docs = "", []
+            else:
+                references = timings.measure("format", self._format_references, context_docs, with_pages=True)
+                self._store_response(cache_key, extracted_values, response_text, references, reference_docs)
+
+            response_text += references
+            yield "references", {"references": reference_docs, "text": references}
+            yield "done", {"response": response_text}
+        finally:
+            logger.info(f"Chat pipeline timings (stream): {timings.summary()}")
+
+    def _fast_path_values(self, user_message: str, timings: StageTimings) -> Optional[Dict[str, float]]:
+        """
+        규칙 기반으로 5개 혈액검사 값을 확실하게 추출했으면 그 값, 아니면 None (LLM으로 처리)
+        """
+        if self.lab_extractor is None:
+            return None
+        extraction = timings.measure("extract", self.lab_extractor.extract, user_message)
+        if not extraction.confident or not self._has_all_values(extraction.values):
+            return None
+        logger.info(f"Lab values extracted without LLM: {extraction.values}")
+        return extraction.values
+
+    def _start_fast_path(self, user_message: str, extracted_values: Dict[str, float], timings: StageTimings):
+        """
+        ML 예측을 시작하고, 예측이 진행되는 동안 참고 문서를 검색해 응답 텍스트 준비
+
+        Returns:
+            (ML 예측 Future, 템플릿 응답 텍스트, 참고 문서 목록 텍스트, 관련 문서 리스트) 튜플
+        """
+        prediction = self.executor.submit(bind_context(timings.measure), "ml", self._request_prediction, extracted_values)
+        context_docs, _, _ = timings.measure("retrieval", self._retrieve, user_message, False)
+        references = timings.measure("format", self._format_references, context_docs, with_pages=False)
+        return prediction, self.lab_extractor.format_response(extracted_values), references, context_docs
+
+    def _stream_fast_path(self, user_message: str, extracted_values: Dict[str, float],
+                          timings: StageTimings) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        prediction, response_text, references, context_docs = self._start_fast_path(user_message, extracted_values, timings)
+        reference_docs = context_docs[:3] if context_docs else []
+        yield "token", {"text": response_text}
+        try:
+            formatted_results, plan = self._format_prediction(prediction.result())
+            response_text += plan
+            yield "prediction", {"prediction": formatted_results, "text": plan}
+        except MLPredictionError as e:
+            response_text += e.text
+            yield "error", {"error": e.error, "text": e.text}
+            references, reference_docs = "", []
+        response_text += references
+        yield "references", {"references": reference_docs, "text": references}
+        yield "done", {"response": response_text}
+
+    def run_batch(self, patients: List[Dict[str, Any]],
+                  question: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        여러 환자의 혈액검사 결과를 한 번에 처리 (병동 회진 시 일괄 TPN 처방용)
+
+        - 참고 문서 검색은 공통 질문으로 한 번만 수행하고 모든 환자가 공유
+        - 규칙 기반으로 값이 추출된 환자는 모아서 여러 행 ml-backend 요청 한 번으로 예측
+        - 규칙으로 추출되지 않은 환자는 LLM으로 병렬 추출한 뒤 다시 한 번에 예측
+        - 환자별 결과는 예측이 끝나는 대로 내보냄
+
+        Args:
+            patients: [{"id": 환자 식별자, "message": 혈액검사 메시지}]
+                ("message" 대신 "values"에 필드 이름별 값을 직접 줄 수 있음)
+            question: 모든 환자에게 공통인 질문 (없으면 기본 TPN 처방 질문으로 검색)
+
+        Yields:
+            - ("patient", {"id", "source", "values", "prediction", "text"}): 환자별 예측 결과
+            - ("patient", {"id", "error", "text"}): 값 추출 또는 예측 실패
+            - ("references", {"references", "text"}): 공유 참고 문서
+            - ("done", {"patients", "predicted", "failed"})
+        """
+        timings = StageTimings()
+        counts = {"predicted": 0, "failed": 0}
+        try:
+            retrieval = self.executor.submit(
+                bind_context(timings.measure), "retrieval", self._retrieve, question or BATCH_RETRIEVAL_QUERY, False
+            )
+
+            extractor = self.lab_extractor or LabValueExtractor()
+            extracted, needs_llm, invalid = timings.measure("extract", self._extract_batch, patients, extractor)
+
+            # 규칙 기반으로 추출된 환자는 LLM을 기다리지 않고 바로 예측
+            first_wave = self._submit_batch_prediction(extracted, timings, "ml.rules")
+            llm_futures = {
+                self.batch_executor.submit(
+                    bind_context(timings.measure), "llm", self._extract_with_llm, patient["message"]
+                ): patient
+                for patient in needs_llm
+            }
+
+            for patient_id, reason in invalid:
+                yield "patient", self._batch_error(patient_id, reason, counts)
+            yield from self._batch_results(extracted, first_wave, counts)
+
+            llm_extracted = []
+            for future in as_completed(llm_futures):
+                patient = llm_futures[future]
+                values, reason = self._validate_values(future.result())
+                if values is not None:
+                    llm_extracted.append((patient["id"], values, "llm"))
+                else:
+                    yield "patient", self._batch_error(patient["id"], reason, counts)
+            yield from self._batch_results(
+                llm_extracted, self._submit_batch_prediction(llm_extracted, timings, "ml.llm"), counts
+            )
+
+            context_docs, _, _ = retrieval.result()
+            references = timings.measure("format", self._format_references, context_docs, with_pages=True)
+            yield "references", {"references": context_docs[:3] if context_docs else [], "text": references}
+            yield "done", {"patients": len(patients), **counts}
+        finally:
+            logger.info(f"Chat pipeline timings (batch of {len(patients)}): {timings.summary()}")
+
+    def _extract_batch(self, patients: List[Dict[str, Any]], extractor: LabValueExtractor):
+        """
+        환자별 값 추출 (직접 준 값 또는 규칙 기반)
+
+        잘못된 입력은 여러 행 ml-backend 요청 전체를 실패시키므로 여기서 환자별로 걸러냄
+
+        Returns:
+            (추출된 (id, 값, 출처) 리스트, LLM 추출이 필요한 환자 리스트, (id, 사유) 리스트) 튜플
+        """
+        extracted, needs_llm, invalid = [], [], []
+        for patient in patients:
+            if patient.get("values") is not None:
+                values, reason = self._validate_values(patient["values"])
+                if values is not None:
+                    extracted.append((patient["id"], values, "values"))
+                else:
+                    invalid.append((patient["id"], reason))
+                continue
+
+            message = patient.get("message")
+            if not isinstance(message, str) or not message.strip():
+                invalid.append((patient["id"], "message (string) or values is required"))
+                continue
+
+            extraction = extractor.extract(message)
+            if extraction.confident and self._has_all_values(extraction.values):
+                extracted.append((patient["id"], extraction.values, "rules"))
+            else:
+                needs_llm.append(patient)
+        return extracted, needs_llm, invalid
+
+    def _validate_values(self, values: Any) -> Tuple[Optional[Dict[str, float]], Optional[str]]:
+        """
+        필드 이름별 값을 숫자로 변환하고 측정값으로 가능한 범위인지 확인
+
+        Returns:
+            (모델 입력 필드만 남긴 값 딕셔너리, None) 또는 (None, 사유)
+        """
+        if not isinstance(values, dict):
+            return None, "values must be an object"
+        missing = [key for key in self.blood_test_mapping if key not in values]
+        if missing:
+            return None, f"missing values: {', '.join(missing)}"
+
+        normalized, problems = {}, []
+        for key in self.blood_test_mapping:
+            value = values[key]
+            try:
+                if isinstance(value, bool):
+                    raise TypeError
+                number = float(value)
+            except (TypeError, ValueError):
+                problems.append(f"{key}: not a number ({value!r})")
+                continue
+            low, high = ANALYTES[key]["plausible"] if key in ANALYTES else (float("-inf"), float("inf"))
+            # NaN은 비교가 항상 거짓이므로 여기서 걸러짐
+            if not low <= number <= high:
+                problems.append(f"{key}: {number:g} outside plausible range {low:g}-{high:g}")
+                continue
+            normalized[key] = number
+
+        if problems:
+            return None, "; ".join(problems)
+        return normalized, None
+
+    def _extract_with_llm(self, message: str) -> Dict[str, float]:
+        """
+        규칙으로 추출되지 않은 메시지의 값을 LLM function calling으로 추출 (응답 텍스트는 사용하지 않음)
+        """
+        extracted_values, _ = process_with_openai(message, [], self.blood_test_mapping)
+        return extracted_values
+
+    def _submit_batch_prediction(self, extracted: List[Tuple[str, Dict[str, float], str]],
+                                 timings: StageTimings, stage: str):
+        if not extracted:
+            return None
+        return self.executor.submit(
+            bind_context(timings.measure), stage, self._request_prediction, [values for _, values, _ in extracted]
+        )
+
+    def _batch_results(self, extracted: List[Tuple[str, Dict[str, float], str]], prediction,
+                       counts: Dict[str, int]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        여러 행 예측 결과를 환자별 이벤트로 변환 (ml-backend는 입력 행 순서대로 결과를 반환)
+        """
+        if prediction is None:
+            return
+        try:
+            rows = self._prediction_rows(prediction.result())
+            if len(rows) != len(extracted):
+                raise MLPredictionError(f"ML API 오류: {len(extracted)}개 입력에 {len(rows)}개 결과",
+                                        "\n\n죄송합니다. 예측 과정에서 오류가 발생했습니다. 다시 시도해 주세요.")
+        except MLPredictionError as e:
+            for patient_id, _, _ in extracted:
+                yield "patient", self._batch_error(patient_id, e.error, counts, e.text)
+            return
+
+        for (patient_id, values, source), row in zip(extracted, rows):
+            formatted_results, plan = self._format_rows([row])
+            counts["predicted"] += 1
+            yield "patient", {
+                "id": patient_id,
+                "source": source,
+                "values": values,
+                "prediction": formatted_results,
+                "text": LabValueExtractor.format_response(values) + plan
+            }
+
+    @staticmethod
+    def _batch_error(patient_id: str, error: str, counts: Dict[str, int], text: Optional[str] = None) -> Dict[str, Any]:
+        counts["failed"] += 1
+        return {
+            "id": patient_id,
+            "error": error,
+            "text": text or "혈액검사 5개 항목(혈당, 알부민, BUN, 인, 총단백)의 값을 모두 확인할 수 없습니다."
+        }
+
+    def _prepare(self, user_message: str, chat_history: List[Dict[str, Any]], timings: StageTimings):
+        """
+        RAG 검색을 먼저 시작하고, 그동안 채팅 기록을 LLM 메시지로 변환
+
+        Returns:
+            (채팅 기록 메시지, 관련 문서 리스트, 결합된 컨텍스트, 응답 캐시 키) 튜플
+            (캐시 대상이 아니면 캐시 키는 None)
+        """
+        use_cache = self._cacheable(user_message, chat_history)
+        retrieval = self.executor.submit(
+            bind_context(timings.measure), "retrieval", self._retrieve, user_message, use_cache
+        )
+        # 이전 대화 요약이 필요하면 LLM을 호출하므로 검색과 겹쳐서 실행
+        build_history = self.history_manager.compact if self.history_manager else build_history_messages
+        history_messages = timings.measure("history", build_history, chat_history)
+        context_docs, combined_context, cache_key = retrieval.result()
+
+        # 관련 내용이 있으면 로그에 기록
+        if context_docs:
+            logger.info(f"Found {len(context_docs)} relevant documents")
+            for i, doc in enumerate(context_docs):
+                logger.info(f"Document {i+1}: {doc['filename']}")
+
+        return history_messages, context_docs, combined_context, cache_key
+
+    def _retrieve(self, user_message: str, use_cache: bool):
+        """
+        관련 문서 검색 (캐시 대상이면 쿼리 임베딩을 한 번만 계산해 검색과 캐시 키에 함께 사용)
+        """
+        if not use_cache:
+            context_docs, combined_context = self.rag_engine.retrieve_relevant_context(user_message, k=self.context_k)
+            return context_docs, combined_context, None
+
+        embedding = self.rag_engine.embed_query(user_message)
+        context_docs, combined_context = self.rag_engine.retrieve_relevant_context(
+            user_message, k=self.context_k, query_embedding=embedding
+        )
+        return context_docs, combined_context, (embedding, context_digest(context_docs))
+
+    def _cacheable(self, user_message: str, chat_history: List[Dict[str, Any]]) -> bool:
+        """
+        이전 대화가 없는 단독 질문만 캐시 (검사 수치가 들어 있는 환자별 질문 제외)
+
+        캐시 키는 질문과 검색된 청크만 반영하므로, "그럼 미숙아는?" 같은 후속 질문은
+        이전 대화에 따라 답이 달라져 다른 대화의 응답을 재사용하면 안 됨
+        """
+        if self.response_cache is None or chat_history:
+            return False
+        return not contains_lab_values(user_message)
+
+    def _cached_response(self, cache_key) -> Optional[CachedResponse]:
+        if cache_key is None:
+            return None
+        embedding, context_key = cache_key
+        return self.response_cache.lookup(embedding, context_key)
+
+    def _store_response(self, cache_key, extracted_values: Dict[str, float], llm_response: str,
+                        references: str, reference_docs: List[Dict[str, Any]]):
+        # 검사 수치를 추출한 응답과 오류 응답은 저장하지 않음
+        if cache_key is None or extracted_values:
+            return
+        if llm_response == EMPTY_RESPONSE_TEXT or llm_response.endswith(ERROR_RESPONSE_TEXT):
+            return
+        embedding, context_key = cache_key
+        self.response_cache.store(embedding, context_key, CachedResponse(llm_response, references, reference_docs))
+
+    def _has_all_values(self, extracted_values: Dict[str, float]) -> bool:
+        return bool(extracted_values) and all(key in extracted_values for key in self.blood_test_mapping.keys())
+
+    def _request_prediction(self, extracted_values) -> requests.Response:
+        """
+        ml-backend에 TPN 예측 요청 (값 딕셔너리 하나 또는 여러 환자의 값 리스트를 한 요청으로)
+        """
+        rows = extracted_values if isinstance(extracted_values, list) else [extracted_values]
+
+        # 모델에 필요한 형식으로 데이터 포맷 변환
+        model_input = [[0.0] * len(self.blood_test_mapping) for _ in rows]
+        for row, values in zip(model_input, rows):
+            for key, index in self.blood_test_mapping.items():
+                row[index] = values[key]
+
+        try:
+            return self.ml_client.predict(model_input)
+        except (CircuitOpenError, requests.exceptions.RequestException) as e:
+            logger.error(f"ML API 연결 오류: {str(e)}")
+            raise MLPredictionError(str(e), "\n\n죄송합니다. 기계 학습 예측 서비스에 연결할 수 없습니다. 잠시 후 다시 시도해 주세요.")
+
+    def _prediction_response(self, prediction, llm_response: str, references: str,
+                             context_docs: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+        """
+        ML 예측 결과를 기다려 최종 응답 구성
+        """
+        try:
+            formatted_results, plan = self._format_prediction(prediction.result())
+        except MLPredictionError as e:
+            return {
+                "response": f"{llm_response}{e.text}",
+                "error": e.error
+            }, 200
+
+        # LLM 응답에 예측 결과와 참고 문서 정보 추가
+        return {
+            "response": f"{llm_response}{plan}{references}",
+            "prediction": formatted_results,
+            "references": context_docs[:3] if context_docs else [] # 최대 3개의 참고 문서 정보 전달
+        }, 200
+
+    def _format_prediction(self, ml_response: requests.Response) -> Tuple[Dict[str, float], str]:
+        """
+        ML API 응답을 사용자 친화적 형식과 처방 계획 텍스트로 변환
+
+        Args:
+            ml_response: ML API 응답
+
+        Returns:
+            (출력 이름별 예측값, 응답에 덧붙일 처방 계획 텍스트) 튜플
+
+        Raises:
+            MLPredictionError: ML API 연결 실패 또는 오류 응답
+        """
+        return self._format_rows(self._prediction_rows(ml_response))
+
+    @staticmethod
+    def _prediction_rows(ml_response: requests.Response) -> List[Dict[str, float]]:
+        """
+        ML API 응답의 행별 예측 결과
+
+        Raises:
+            MLPredictionError: ML API 오류 응답
+        """
+        if ml_response.status_code != 200:
+            error_msg = f"ML API 오류: {ml_response.status_code} - {ml_response.text}"
+            logger.error(error_msg)
+            raise MLPredictionError(error_msg, "\n\n죄송합니다. 예측 과정에서 오류가 발생했습니다. 다시 시도해 주세요.")
+
+        prediction_results = ml_response.json()
+        logger.info(f"ML prediction results: {prediction_results}")
+        return prediction_results
+
+    def _format_rows(self, prediction_results: List[Dict[str, float]]) -> Tuple[Dict[str, float], str]:
+        # 결과를 사용자 친화적 형식으로 변환
+        formatted_results = {}
+        for result in prediction_results:
+            for key, value in result.items():
+                formatted_name = self.result_mapping.get(key, key)
+                formatted_results[formatted_name] = round(value, 2)
+
+        plan = "\n\n**TPN 처방 계획**\n"
+        for name, value in formatted_results.items():
+            unit = "g" if "칼로리" not in name else "kcal"
+            plan += f"- {name}: {value} {unit}\n"
+
+        return formatted_results, plan
+
+    @staticmethod
+    def _format_references(context_docs: Optional[List[Dict[str, Any]]], with_pages: bool) -> str:
+        """
+        응답 끝에 붙일 참고 문서 목록 (최대 3개)
+        """
+        if not context_docs:
+            return ""
+
+        references = "\n\n**참고한 진료 지침**\n"
+        for i, doc in enumerate(context_docs[:3]):
+            source_name = os.path.basename(doc['source'])
+            page_info = f" (페이지 {doc.get('page', '?')})" if with_pages and doc.get('page') else ""
+            references += f"{i+1}. {source_name}{page_info}\n"
+        return references
@@ -0,0 +1,134 @@
+import logging
+from typing import List, Optional, Set
+
+from langchain.schema import Document
+
+from utils.history_manager import count_tokens
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ContextAssembler:
+    """
+    검색된 청크를 LLM 프롬프트용 컨텍스트로 조립
+
+    1. 같은 출처/페이지에서 겹치는(청크 분할 시 overlap) 청크를 하나로 합침
+    2. 내용이 거의 같은 청크는 순위가 높은 것만 남김
+    3. 관련도 순서대로 `token_budget` 안에 들어가는 청크만 사용
+    """
+
+    def __init__(self, token_budget: int = 2500, min_overlap: int = 20, max_overlap: int = 400,
+                 duplicate_threshold: float = 0.9, shingle_size: int = 5):
+        """
+        ContextAssembler 초기화
+
+        Args:
+            token_budget: 컨텍스트 전체 토큰 예산
+            min_overlap: 두 청크를 이어 붙일 최소 겹침 길이 (문자)
+            max_overlap: 겹침을 찾을 최대 길이 (문자, DocumentLoader chunk_overlap 이상)
+            duplicate_threshold: 중복으로 볼 문자 n-gram 겹침 비율 (짧은 쪽 기준, 포함 관계도 중복)
+            shingle_size: 중복 판정에 쓸 문자 n-gram 길이
+        """
+        self.token_budget = token_budget
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+        self.duplicate_threshold = duplicate_threshold
+        self.shingle_size = shingle_size
+
+    def assemble(self, docs: List[Document]) -> List[Document]:
+        """
+        관련도 순서로 정렬된 검색 결과를 합치고 중복을 제거해 토큰 예산만큼 반환
+
+        Args:
+            docs: 검색된 문서 (관련도 높은 순)
+
+        Returns:
+            조립된 문서 리스트 (관련도 높은 순, 합쳐진 청크는 더 높은 순위 위치)
+        """
+        merged = self._merge_overlapping(docs)
+        unique = self._drop_near_duplicates(merged)
+
+        selected, used = [], 0
+        for doc in unique:
+            tokens = count_tokens(doc.page_content)
+            if used + tokens > self.token_budget:
+                continue
+            selected.append(doc)
+            used += tokens
+
+        logger.info(f"Context assembled: {len(docs)} chunks -> merged {len(merged)} -> "
+                    f"unique {len(unique)} -> selected {len(selected)} ({used}/{self.token_budget} tokens)")
+        return selected
+
+    def _merge_overlapping(self, docs: List[Document]) -> List[Document]:
+        merged: List[Document] = []
+        for doc in docs:
+            content = doc.page_content.strip()
+            if not content:
+                continue
+            for index, existing in enumerate(merged):
+                if not self._same_page(existing, doc):
+                    continue
+                combined = self._merge_text(existing.page_content, content)
+                if combined is not None:
+                    merged[index] = Document(page_content=combined, metadata=existing.metadata)
+                    break
+            else:
+                merged.append(Document(page_content=content, metadata=doc.metadata))
+        return merged
+
+    @staticmethod
+    def _same_page(a: Document, b: Document) -> bool:
+        return (a.metadata.get("source"), a.metadata.get("page")) == (b.metadata.get("source"), b.metadata.get("page"))
+
+    def _merge_text(self, a: str, b: str) -> Optional[str]:
+        """
+        한쪽이 다른 쪽을 포함하거나 끝과 앞이 겹치면 합친 텍스트, 아니면 None
+        """
+        if b in a:
+            return a
+        if a in b:
+            return b
+        overlap = self._overlap(a, b)
+        if overlap:
+            return a + b[overlap:]
+        overlap = self._overlap(b, a)
+        if overlap:
+            return b + a[overlap:]
+        return None
+
+    def _overlap(self, first: str, second: str) -> int:
+        """
+        `first`의 끝과 `second`의 앞이 겹치는 가장 긴 길이 (`min_overlap` 미만이면 0)
+        """
+        limit = min(len(first), len(second), self.max_overlap)
+        for length in range(limit, self.min_overlap - 1, -1):
+            if first.endswith(second[:length]):
+                return length
+        return 0
+
+    def _drop_near_duplicates(self, docs: List[Document]) -> List[Document]:
+        kept: List[Document] = []
+        kept_shingles: List[Set[str]] = []
+        for doc in docs:
+            shingles = self._shingles(doc.page_content)
+            if any(self._containment(shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                continue
+            kept.append(doc)
+            kept_shingles.append(shingles)
+        return kept
+
+    def _shingles(self, text: str) -> Set[str]:
+        normalized = " ".join(text.split())
+        size = self.shingle_size
+        if len(normalized) <= size:
+            return {normalized}
+        return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+    @staticmethod
+    def _containment(a: Set[str], b: Set[str]) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / min(len(a), len(b))
@@ -1,7 +1,7 @@
 import os
 import logging
 import re
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from langchain_community.document_loaders import TextLoader, Docx2txtLoader, UnstructuredMarkdownLoader, UnstructuredPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.document_loaders import PyPDFLoader
@@ -16,6 +16,9 @@ from pdf2image import convert_from_path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 색인 대상 파일 확장자
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf', '.doc', '.docx', '.md', '.markdown')
+
 class DocumentLoader:
     """
     다양한 형식의 문서를 로드하고 처리하는 클래스
@@ -37,12 +40,13 @@ class DocumentLoader:
             length_function=len,
             is_separator_regex=False,
         )
-    def load_document(self, file_path: str) -> Optional[List[Document]]:
+    def load_document(self, file_path: str, on_page: Optional[Callable[[int, int], None]] = None) -> Optional[List[Document]]:
         """
         파일 유형에 따라 적절한 로더를 사용하여 문서를 로드
         
         Args:
             file_path (str): 로드할 파일의 경로
+            on_page: PDF 페이지를 하나 처리할 때마다 (처리한 페이지 수, 전체 페이지 수)로 호출
             
         Returns:
             LangChain Document: 객체 리스트 또는 로딩에 실패한 경우 None
@@ -68,6 +72,8 @@ class DocumentLoader:
                                 page_content=text.strip(),
                                 metadata={"source": file_path, "page": i+1, "filename": os.path.basename(file_path)}
                             ))
+                            if on_page:
+                                on_page(i+1, len(pdf.pages))
                         logger.info(f"pdfplumber로 {len(documents)}개 페이지 추출 완료")
 
                 except Exception as pdf_err:
@@ -83,6 +89,8 @@ class DocumentLoader:
                                     page_content = text,
                                     metadata = {"source": file_path, "page": i+1, "filename": os.path.basename(file_path)}
                                 ))
+                            if on_page:
+                                on_page(i+1, len(images))
                     except Exception as ocr_err:
                         logger.error(f"OCR 처리 실패: {str(ocr_err)}")
                 except Exception as all_err:
@@ -127,6 +135,28 @@ class DocumentLoader:
             logger.error(f"문서 분할 중 오류 발생: {str(e)}")
             return documents
         
+    def process_file(self, file_path: str) -> List[Document]:
+        """
+        파일 하나를 로드하고 분할 (메타데이터에 파일 이름과 경로 추가)
+
+        Args:
+            file_path: 처리할 파일 경로
+
+        Returns:
+            분할된 청크 리스트 (지원하지 않는 형식이거나 로드 실패 시 빈 리스트)
+        """
+        if os.path.splitext(file_path)[1].lower() not in SUPPORTED_EXTENSIONS:
+            return []
+
+        documents = self.load_document(file_path)
+        if not documents:
+            return []
+
+        for doc in documents:
+            doc.metadata['source'] = file_path
+            doc.metadata['filename'] = os.path.basename(file_path)
+        return self.split_documents(documents)
+
     def process_dictionary(self, directory_path: str) -> List[Document]:
         """
         디렉토리 내의 모든 지원되는 문서 파일을 로드하고 분할
@@ -146,7 +176,7 @@ class DocumentLoader:
                     file_extension = os.path.splitext(file)[1].lower()
 
                     # 지원되는 파일 형식인지 확인
-                    if file_extension in ['.txt', '.pdf', '.doc', '.docx', '.md', '.markdown']:
+                    if file_extension in SUPPORTED_EXTENSIONS:
                         documents = self.load_document(file_path)
 
                         if documents:
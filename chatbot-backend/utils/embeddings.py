@@ -1,10 +1,12 @@
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 from langchain.embeddings import HuggingFaceEmbeddings, OpenAIEmbeddings
 from langchain.vectorstores import Chroma
 from langchain.schema import Document
 
+from utils.tracing import span
+
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -83,13 +85,32 @@ class EmbeddingManager:
             )
             self.vector_store = self.vectorstore
     
-    def add_documents(self, documents: List[Document], collection_name: str = "medical_guidelines"):
+    def reopen_vector_store(self):
+        """
+        벡터 저장소 연결을 다시 열기 (gunicorn 워커 fork 직후 호출, 임베딩 모델은 그대로 공유)
+        """
+        # chromadb는 저장 경로별 클라이언트(SQLite 연결, HNSW 세그먼트)를 클래스 수준에서
+        # 캐시하므로, 비우지 않으면 마스터에서 상속한 연결을 그대로 다시 돌려받음
+        try:
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        except ImportError:
+            # 클라이언트 캐시가 없는 이전 버전 chromadb
+            pass
+        self._initialize_vector_store()
+
+    def add_documents(self, documents: List[Document], collection_name: str = "medical_guidelines",
+                      batch_size: int = 64, on_batch: Optional[Callable[[int, int], None]] = None,
+                      ids: Optional[List[str]] = None):
         """
         문서를 벡터 저장소에 추가
         
         Args:
             documents: 추가할 문서 리스트
             collection_name: 저장할 컬렉션 이름
+            batch_size: 한 번에 임베딩할 문서 수
+            on_batch: 배치 하나를 추가할 때마다 (추가한 문서 수, 전체 문서 수)로 호출
+            ids: 문서별 청크 ID (색인 manifest에 기록해 두고 파일이 바뀌거나 삭제되면 이 ID로 삭제)
         
         Returns:
             성공 여부
@@ -98,7 +119,9 @@ class EmbeddingManager:
             logger.info(f"벡터 저장소에 {len(documents)}개의 문서 추가 중...")
 
             # 빈 문서 필터링
-            valid_documents = [doc for doc in documents if doc.page_content and doc.page_content.strip()]
+            valid = [i for i, doc in enumerate(documents) if doc.page_content and doc.page_content.strip()]
+            valid_documents = [documents[i] for i in valid]
+            valid_ids = [ids[i] for i in valid] if ids is not None else None
 
             if not valid_documents:
                 logger.warning("추가할 유효한 문서가 없음")
@@ -106,8 +129,12 @@ class EmbeddingManager:
             
             logger.info(f"유효한 문서 {len(valid_documents)}개 추가 중...")
 
-            # 문서 추가
-            self.vectorstore.add_documents(valid_documents)
+            # 문서 추가 (배치 단위로 임베딩해 진행 상황을 알림)
+            for start in range(0, len(valid_documents), batch_size):
+                batch_ids = valid_ids[start:start + batch_size] if valid_ids is not None else None
+                self.vectorstore.add_documents(valid_documents[start:start + batch_size], ids=batch_ids)
+                if on_batch:
+                    on_batch(min(start + batch_size, len(valid_documents)), len(valid_documents))
 
             # 변경사항 저장
             self.vectorstore.persist()
@@ -125,16 +152,28 @@ class EmbeddingManager:
         except Exception as e:
             logger.error(f"문서 추가 중 오류 발생: {str(e)}")
             import traceback
-            logger.error(traceback.foamat_exc())
+            logger.error(traceback.format_exc())
             return False
 
-    def search_documents(self, query: str, k: int = 5) -> List[Document]:
+    def embed_query(self, query: str) -> List[float]:
+        """
+        검색 쿼리 임베딩 (응답 캐시 키로도 사용)
+        """
+        with span("embedding.query", model=self.embedding_model):
+            return self.embeddings.embed_query(query)
+
+    def search_documents(self, query: str, k: int = 5, query_embedding: Optional[List[float]] = None,
+                         mmr: bool = False, fetch_k: int = 20, mmr_lambda: float = 0.5) -> List[Document]:
         """
         query와 관련된 문서 검색
         
         Args: 
             query: 검색 쿼리
             k: 반환할 문서 수
+            query_embedding: 미리 계산한 쿼리 임베딩 (있으면 다시 임베딩하지 않음)
+            mmr: MMR(Maximal Marginal Relevance)로 `fetch_k`개 후보 중 서로 덜 겹치는 `k`개 선택
+            fetch_k: MMR 후보 수
+            mmr_lambda: MMR 관련도 가중치 (1이면 관련도만, 0이면 다양성만)
             
         Returns:
             검색된, 유사도가 높은 문서 리스트
@@ -144,7 +183,8 @@ class EmbeddingManager:
 
             # 벡터 저장소에 문서가 있는지 확인
             try:
-                all_docs = self.vectorstore.get()
+                with span("chroma.count"):
+                    all_docs = self.vectorstore.get()
                 if not all_docs['ids']:
                     logger.warning("벡터 저장소에 문서가 없음")
                     return []
@@ -153,7 +193,19 @@ class EmbeddingManager:
                 logger.warning(f"문서 존재 확인 실패: {str(check_err)}")
 
             # 유사도 검색 실행
-            docs = self.vector_store.similarity_search(query, k=k)
+            if mmr and query_embedding is None:
+                query_embedding = self.embed_query(query)
+            # 쿼리 임베딩이 없으면 similarity_search가 내부에서 임베딩까지 수행
+            with span("chroma.search", k=k, mmr=mmr, embeds_query=query_embedding is None) as attrs:
+                if mmr:
+                    docs = self.vector_store.max_marginal_relevance_search_by_vector(
+                        query_embedding, k=k, fetch_k=max(fetch_k, k), lambda_mult=mmr_lambda
+                    )
+                elif query_embedding is not None:
+                    docs = self.vector_store.similarity_search_by_vector(query_embedding, k=k)
+                else:
+                    docs = self.vector_store.similarity_search(query, k=k)
+                attrs["results"] = len(docs)
             logger.info(f"검색 완료: {len(docs)}개의 문서 검색됨")
 
             # 검색 결과 로깅 (디버깅용)
@@ -167,6 +219,31 @@ class EmbeddingManager:
             logger.error(traceback.format_exc())
             return []
         
+    def delete_documents(self, ids: List[str]) -> bool:
+        """
+        청크 ID로 문서 삭제 (없는 ID는 무시)
+        """
+        if not ids:
+            return True
+        try:
+            self.vectorstore._collection.delete(ids=ids)
+            self.vectorstore.persist()
+            logger.info(f"벡터 저장소에서 {len(ids)}개 청크 삭제")
+            return True
+        except Exception as e:
+            logger.error(f"문서 삭제 중 오류 발생: {str(e)}")
+            return False
+
+    def document_count(self) -> int:
+        """
+        벡터 저장소의 청크 수
+        """
+        try:
+            return self.vectorstore._collection.count()
+        except Exception as e:
+            logger.warning(f"문서 개수 확인 실패: {str(e)}")
+            return 0
+
     def clear_collection(self):
         """
         벡터 저장소의 모든 문서 삭제
@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.response_cache import contains_lab_values
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken이 없으면 문자 수 기반 추정
+    tiktoken = None
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 메시지 하나당 역할/구분자 토큰 (OpenAI chat 형식 기준 근사치)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+if tiktoken is not None:
+    try:
+        # gpt-4.1 계열 토크나이저
+        _encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken 인코딩 로드 실패, 문자 수로 토큰 수 추정: {str(e)}")
+
+
+def count_tokens(text: str) -> int:
+    """
+    텍스트의 토큰 수 (tiktoken이 없으면 근사치: 한글은 글자당 약 1토큰, 영문은 4글자당 약 1토큰)
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """
+    OpenAI 메시지 리스트의 프롬프트 토큰 수
+    """
+    return sum(count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+class HistoryManager:
+    """
+    토큰 예산 안에서 채팅 기록을 LLM 메시지로 압축
+
+    - 최근 대화는 `budget_tokens` 안에서 그대로 유지
+    - 예산을 넘는 이전 대화는 요약 메시지 하나로 접음. 요약은 대화 앞부분(prefix)의 해시로
+      캐시하고, 요약 이후 쌓인 대화가 `refresh_tokens`를 넘을 때만 이전 요약에 이어서 다시 요약
+    - 혈액검사 수치가 들어 있는 이전 사용자 메시지는 요약하지 않고 원문 그대로 유지
+      (예측에 필요한 값이 요약 과정에서 바뀌거나 빠지지 않도록)
+    """
+
+    def __init__(self, summarize: Callable[[Optional[str], List[Dict[str, str]]], str],
+                 budget_tokens: int = 2000, refresh_tokens: int = 1000, cache_size: int = 256):
+        """
+        HistoryManager 초기화
+
+        Args:
+            summarize: (이전 요약, 새로 접을 메시지) -> 새 요약 (llm_processor.summarize_history)
+            budget_tokens: 그대로 유지할 최근 대화의 토큰 예산
+            refresh_tokens: 요약되지 않은 채 예산을 넘은 대화가 이만큼 쌓이면 요약을 갱신
+            cache_size: 캐시할 요약 수
+        """
+        self.summarize = summarize
+        self.budget_tokens = budget_tokens
+        self.refresh_tokens = refresh_tokens
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        # 대화 앞부분 해시 -> 그 부분의 요약
+        self._summaries = OrderedDict()
+
+    def compact(self, chat_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        채팅 기록을 (요약 메시지 + 원문 유지 메시지 + 최근 대화) OpenAI 메시지 리스트로 변환
+        """
+        messages = [
+            {"role": "user" if message["type"] == "user" else "assistant", "content": message["content"]}
+            for message in chat_history
+        ]
+        tokens = [count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages]
+
+        # 최근 대화부터 예산 안에 들어가는 만큼 원문 유지
+        cut, used = len(messages), 0
+        while cut > 0 and used + tokens[cut - 1] <= self.budget_tokens:
+            cut -= 1
+            used += tokens[cut]
+        if cut == 0:
+            return messages
+
+        prefix_digests = self._prefix_digests(messages, cut)
+        summarized, summary = self._cached_summary(prefix_digests)
+
+        # 요약 이후 쌓인 대화가 적으면 기존 요약을 그대로 쓰고 그 대화는 원문 유지
+        pending = sum(tokens[summarized:cut])
+        if summary is None or pending > self.refresh_tokens:
+            folded = [message for message in messages[summarized:cut] if not self._pinned(message)]
+            new_summary = self.summarize(summary, folded) if folded else summary
+            if folded and (not new_summary or new_summary == summary):
+                # 요약 실패(빈 요약 또는 기존 요약 그대로): 저장하지 않고 접으려던 대화를 원문 그대로 유지
+                logger.warning(f"Chat history summary failed, keeping {len(folded)} messages verbatim")
+            else:
+                if folded:
+                    logger.info(f"Chat history summarized: {cut} messages, {sum(tokens[:cut])} tokens -> "
+                                f"{count_tokens(new_summary)} tokens")
+                summary = new_summary
+                self._store_summary(prefix_digests[cut], summary)
+                summarized = cut
+
+        pinned = [message for message in messages[:summarized] if self._pinned(message)]
+        compacted = []
+        if summary:
+            compacted.append({"role": "system", "content": f"이전 대화 요약:\n{summary}"})
+        compacted.extend(pinned)
+        compacted.extend(messages[summarized:])
+        return compacted
+
+    @staticmethod
+    def _pinned(message: Dict[str, str]) -> bool:
+        return message["role"] == "user" and contains_lab_values(message["content"])
+
+    @staticmethod
+    def _prefix_digests(messages: List[Dict[str, str]], length: int) -> List[str]:
+        """
+        길이 0..length인 대화 앞부분 각각의 해시 (체인 해시라 한 번 순회로 계산)
+        """
+        digests = [hashlib.sha256(b"").hexdigest()]
+        for message in messages[:length]:
+            digest = hashlib.sha256(digests[-1].encode("ascii"))
+            digest.update(f"{message['role']}\0{message['content']}".encode("utf-8"))
+            digests.append(digest.hexdigest())
+        return digests
+
+    def _cached_summary(self, prefix_digests: List[str]) -> Tuple[int, Optional[str]]:
+        """
+        캐시된 요약 중 가장 긴 대화 앞부분의 요약 ((요약한 메시지 수, 요약), 없으면 (0, None))
+        """
+        with self._lock:
+            for length in range(len(prefix_digests) - 1, 0, -1):
+                summary = self._summaries.get(prefix_digests[length])
+                if summary is not None:
+                    self._summaries.move_to_end(prefix_digests[length])
+                    return length, summary
+        return 0, None
+
+    def _store_summary(self, digest: str, summary: Optional[str]):
+        if summary is None:
+            return
+        with self._lock:
+            self._summaries[digest] = summary
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
@@ -0,0 +1,99 @@
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    파일 내용의 SHA-256 해시
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """
+    벡터 저장소에 색인된 진료 지침 파일 목록 (JSON 파일로 저장)
+
+    파일별로 크기, 수정 시각, 내용 해시, 벡터 저장소의 청크 ID를 기록해 두고,
+    시작할 때 바뀐 파일만 다시 색인하고 사라진 파일의 청크만 삭제하는 데 사용한다.
+
+        {"version": 1, "files": {"지침.pdf": {"size": ..., "mtime_ns": ..., "sha256": ..., "chunk_ids": [...]}}}
+
+    gunicorn 워커들이 같은 파일을 갱신할 수 있으므로 갱신할 때마다 파일 잠금을 잡고
+    디스크의 최신 내용을 다시 읽어서 수정한다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        파일 경로(진료 지침 디렉토리 기준 상대 경로) -> 색인 정보
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"색인 manifest를 읽을 수 없음, 새로 작성: {str(e)}")
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            logger.warning(f"색인 manifest 버전이 다름 ({data.get('version')}), 새로 작성")
+            return {}
+        return data.get("files", {})
+
+    def get(self, relative_path: str) -> Optional[Dict[str, Any]]:
+        return self.load().get(relative_path)
+
+    def set(self, relative_path: str, entry: Dict[str, Any]):
+        with self._locked() as files:
+            files[relative_path] = entry
+
+    def remove(self, relative_path: str) -> Optional[Dict[str, Any]]:
+        with self._locked() as files:
+            return files.pop(relative_path, None)
+
+    def reset(self):
+        """
+        빈 manifest로 초기화 (벡터 저장소를 비운 뒤 호출)
+        """
+        with self._locked() as files:
+            files.clear()
+
+    @contextmanager
+    def _locked(self):
+        """
+        잠금을 잡고 최신 목록을 읽어 넘겨준 뒤, 블록이 끝나면 원자적으로 저장
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                files = self.load()
+                yield files
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": MANIFEST_VERSION, "files": files}, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
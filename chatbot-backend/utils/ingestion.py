@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 작업 단계: queued -> parsing -> chunking -> embedding -> done (또는 failed)
+STAGE_QUEUED = "queued"
+STAGE_PARSING = "parsing"
+STAGE_CHUNKING = "chunking"
+STAGE_EMBEDDING = "embedding"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+FINISHED_STAGES = (STAGE_DONE, STAGE_FAILED)
+
+
+class IngestionQueueFull(Exception):
+    """
+    대기 중인 인제스트 작업이 너무 많음
+    """
+
+
+class IngestionJob:
+    """
+    진료 지침 파일 하나의 인제스트(파싱 -> 청크 분할 -> 임베딩) 작업 상태
+
+    상태는 변경될 때마다 작업 디렉토리에 JSON으로 저장되므로, gunicorn 워커가 여러 개여도
+    업로드를 받은 워커와 다른 워커에서 조회할 수 있음
+    """
+
+    FIELDS = ("id", "filename", "file_type", "stage", "pages_parsed", "pages_total",
+              "chunks_total", "chunks_embedded", "error", "created_at", "updated_at")
+
+    def __init__(self, job_id: str, filename: str, file_type: str, jobs_dir: str):
+        self.id = job_id
+        self.filename = filename
+        self.file_type = file_type
+        self.stage = STAGE_QUEUED
+        self.pages_parsed = 0
+        self.pages_total = None
+        self.chunks_total = None
+        self.chunks_embedded = 0
+        self.error = None
+        self.created_at = self.updated_at = time.time()
+        self._path = os.path.join(jobs_dir, f"{job_id}.json")
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        """
+        작업 상태 갱신 후 저장 (RAGEngine.add_guideline의 on_progress 콜백)
+        """
+        with self._lock:
+            for key, value in fields.items():
+                if key not in self.FIELDS:
+                    raise ValueError(f"Unknown job field: {key}")
+                setattr(self, key, value)
+            self.updated_at = time.time()
+            self._save()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def _save(self):
+        # 조회 중인 다른 프로세스가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, self._path)
+
+
+class IngestionQueue:
+    """
+    진료 지침 인제스트 작업을 백그라운드 스레드 풀에서 처리하는 큐
+
+    업로드 요청은 파일 저장 후 작업 ID만 받아 바로 응답하고, 파싱/OCR/임베딩은
+    `max_workers`개 스레드가 순서대로 처리한다. 대기 작업이 `max_pending`개를 넘으면
+    새 업로드를 거부한다.
+    """
+
+    def __init__(self, rag_engine, jobs_dir: str, max_workers: int = 1, max_pending: int = 16,
+                 job_ttl: float = 24 * 60 * 60, on_complete: Optional[Callable[[IngestionJob], None]] = None):
+        """
+        IngestionQueue 초기화
+
+        Args:
+            rag_engine: RAGEngine 인스턴스
+            jobs_dir: 작업 상태 JSON 저장 디렉토리
+            max_workers: 동시에 처리할 작업 수
+            max_pending: 처리 중이거나 대기 중인 작업의 최대 수
+            job_ttl: 끝난 작업 상태를 보관할 시간 (초)
+            on_complete: 작업이 성공하면 호출할 함수 (응답 캐시 무효화 등)
+        """
+        self.rag_engine = rag_engine
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.on_complete = on_complete
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def submit(self, filename: str, file_type: str) -> IngestionJob:
+        """
+        업로드 디렉토리에 저장된 파일의 인제스트 작업 등록
+
+        Raises:
+            IngestionQueueFull: 대기 중인 작업이 너무 많음
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise IngestionQueueFull(f"{self._pending} ingestion jobs pending")
+            self._pending += 1
+
+        self._purge_finished()
+        job = IngestionJob(uuid.uuid4().hex, filename, file_type, self.jobs_dir)
+        job.update(stage=STAGE_QUEUED)
+        logger.info(f"진료 지침 인제스트 작업 등록: {job.id} ({filename})")
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        작업 상태 조회 (없으면 None)
+        """
+        # 작업 ID는 uuid4 hex이므로 그 외 문자열로 파일 경로를 만들지 않음
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.jobs_dir, f"{job_id}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _run(self, job: IngestionJob):
+        try:
+            success = self.rag_engine.add_guideline(job.filename, "", job.file_type, on_progress=job.update)
+            if success:
+                job.update(stage=STAGE_DONE)
+                if self.on_complete:
+                    self.on_complete(job)
+                logger.info(f"진료 지침 인제스트 완료: {job.id} ({job.filename})")
+            else:
+                job.update(stage=STAGE_FAILED, error="진료 지침 처리 중 오류가 발생했습니다.")
+        except Exception as e:
+            logger.error(f"진료 지침 인제스트 실패: {job.id} ({job.filename}): {str(e)}")
+            logger.error(traceback.format_exc())
+            job.update(stage=STAGE_FAILED, error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _purge_finished(self):
+        """
+        보관 시간이 지난 작업 상태 파일 삭제
+        """
+        cutoff = time.time() - self.job_ttl
+        for name in os.listdir(self.jobs_dir):
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
@@ -0,0 +1,187 @@
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 항목별 정의 (llm_processor.BLOOD_TEST_TOOLS 인자 이름 기준)
+# - aliases: 한글/영문 이름과 약어 (긴 것부터 매칭)
+# - unit: 모델 입력 단위, units: 단위별 환산 계수 (입력값 * 계수 = 모델 입력 단위 값)
+# - normal: 정상 범위 (응답 템플릿 표시용, llm_processor 프롬프트와 같음)
+# - plausible: 측정값으로 가능한 범위 (벗어나면 단위/오타 의심으로 LLM에 맡김)
+ANALYTES = {
+    "glucose": {
+        "label": "혈당 (Glucose)",
+        "aliases": ("blood sugar", "glucose", "glu", "bst", "혈당", "포도당"),
+        "unit": "mg/dL",
+        "units": {"mg/dl": 1.0, "mmol/l": 18.016},
+        "normal": (70.0, 100.0),
+        "plausible": (10.0, 1500.0),
+    },
+    "albumin": {
+        "label": "알부민 (Albumin)",
+        "aliases": ("albumin", "alb", "알부민"),
+        "unit": "g/dL",
+        "units": {"g/dl": 1.0, "g/l": 0.1},
+        "normal": (3.4, 5.4),
+        "plausible": (0.5, 7.0),
+    },
+    "bun": {
+        "label": "혈중요소질소 (BUN)",
+        "aliases": ("blood urea nitrogen", "urea nitrogen", "bun", "혈중\\s*요소\\s*질소", "요소\\s*질소"),
+        "unit": "mg/dL",
+        "units": {"mg/dl": 1.0, "mmol/l": 2.801},
+        "normal": (7.0, 20.0),
+        "plausible": (1.0, 300.0),
+    },
+    "phosphorus": {
+        "label": "인 (Phosphorus)",
+        "aliases": ("phosphorus", "phosphate", "phos", "po4", "p", "인산", "인"),
+        "unit": "mg/dL",
+        "units": {"mg/dl": 1.0, "mmol/l": 3.097},
+        "normal": (2.5, 4.5),
+        "plausible": (0.3, 20.0),
+    },
+    "total_protein": {
+        "label": "총 단백질 (Total Protein)",
+        "aliases": ("total\\s*protein", "t\\.?\\s*protein", "tp", "총\\s*단백질?"),
+        "unit": "g/dL",
+        "units": {"g/dl": 1.0, "g/l": 0.1},
+        "normal": (6.0, 8.3),
+        "plausible": (1.0, 15.0),
+    },
+}
+
+# 이름 + (조사/구분자) + 숫자 + (단위). 이름 앞뒤가 다른 글자와 붙어 있으면 매칭하지 않음
+# (예: "TP"의 "P", "확인"의 "인")
+_VALUE_PATTERN = re.compile(
+    r"(?<![A-Za-z가-힣])(?P<name>" + "|".join(
+        f"(?P<{key}>{'|'.join(spec['aliases'])})" for key, spec in ANALYTES.items()
+    ) + r")(?![A-Za-z])"
+    r"\s*(?:수치|값|결과)?\s*(?:[:=]|은|는|이|가|은요|는요)?\s*"
+    r"(?P<value>\d+(?:\.\d+)?)(?!\.?\d)"
+    r"(?:\s*(?P<unit>(?:mg|g|mmol)\s*/\s*d?l)(?![A-Za-z]))?"
+    r"(?P<range>\s*(?:-|~|–)\s*\d)?",
+    re.IGNORECASE
+)
+
+# 검사 수치 외에 질문이 들어 있으면 답변이 필요하므로 LLM에 맡김
+_QUESTION_PATTERN = re.compile(r"\?|？|(?:나요|까요|가요|인가|뭔가|무엇|어떻게|왜|알려)")
+
+
+class LabExtraction:
+    """
+    메시지 하나에서 규칙 기반으로 추출한 혈액검사 값
+    """
+
+    def __init__(self, values: Dict[str, float], issues: List[str], has_question: bool):
+        self.values = values
+        self.issues = issues
+        self.has_question = has_question
+
+    @property
+    def complete(self) -> bool:
+        return all(key in self.values for key in ANALYTES)
+
+    @property
+    def confident(self) -> bool:
+        """
+        5개 항목이 모두 한 번씩(또는 같은 값으로) 단위/범위 문제 없이 추출되었고 질문이 없음
+        """
+        return self.complete and not self.issues and not self.has_question
+
+
+class LabValueExtractor:
+    """
+    LLM 호출 없이 혈액검사 결과 메시지에서 TPN 모델 입력값을 추출
+
+    "Glucose 85, Albumin 3.1, BUN 12, P 5.2, TP 5.4"처럼 검사 결과만 붙여 넣은 메시지는
+    정규식으로 충분히 처리할 수 있으므로, 5개 값이 모두 확실하게 추출되면 ChatPipeline이
+    LLM을 건너뛰고 ml-backend에 바로 예측을 요청한다. 하나라도 빠지거나 단위/범위가
+    애매하면 기존처럼 LLM(function calling)으로 처리한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"fast_path": 0, "partial": 0, "none": 0}
+
+    def extract(self, text: str) -> LabExtraction:
+        """
+        메시지에서 혈액검사 값 추출
+
+        Args:
+            text: 사용자 메시지
+
+        Returns:
+            LabExtraction (값은 모델 입력 단위로 환산)
+        """
+        values, issues = {}, []
+        residual = text or ""
+        for match in _VALUE_PATTERN.finditer(text or ""):
+            key = next(name for name in ANALYTES if match.group(name) is not None)
+            residual = residual.replace(match.group(0), " ", 1)
+            value, issue = self._normalize(key, match)
+            if issue:
+                issues.append(issue)
+                continue
+            if key in values and abs(values[key] - value) > 1e-9:
+                issues.append(f"{key}: conflicting values {values[key]} and {value}")
+                continue
+            values[key] = value
+
+        extraction = LabExtraction(values, issues, _QUESTION_PATTERN.search(residual) is not None)
+        with self._lock:
+            result = "fast_path" if extraction.confident else "partial" if values or issues else "none"
+            self._stats[result] += 1
+        if extraction.issues:
+            logger.info(f"Lab extraction issues: {extraction.issues}")
+        return extraction
+
+    @staticmethod
+    def _normalize(key: str, match: re.Match) -> Tuple[Optional[float], Optional[str]]:
+        """
+        매칭된 값을 모델 입력 단위로 환산하고 범위 확인 ((값, None) 또는 (None, 문제))
+        """
+        spec = ANALYTES[key]
+        if match.group("range"):
+            return None, f"{key}: value range instead of a single value"
+
+        factor = 1.0
+        if match.group("unit"):
+            unit = re.sub(r"\s+", "", match.group("unit")).lower()
+            if unit not in spec["units"]:
+                return None, f"{key}: unexpected unit {match.group('unit')}"
+            factor = spec["units"][unit]
+
+        value = round(float(match.group("value")) * factor, 2)
+        low, high = spec["plausible"]
+        if not low <= value <= high:
+            return None, f"{key}: {value} {spec['unit']} outside plausible range {low}-{high}"
+        return value, None
+
+    @staticmethod
+    def format_response(values: Dict[str, float]) -> str:
+        """
+        LLM 응답 대신 사용할 검사 결과 요약 (뒤에 TPN 처방 계획과 참고 문서가 붙음)
+        """
+        lines = ["입력하신 혈액검사 결과로 TPN 처방을 계산했습니다.", "", "**혈액검사 결과**"]
+        for key, spec in ANALYTES.items():
+            low, high = spec["normal"]
+            value = values[key]
+            flag = "낮음, " if value < low else "높음, " if value > high else ""
+            lines.append(f"- {spec['label']}: {value:g} {spec['unit']} ({flag}정상 범위: {low:g}-{high:g} {spec['unit']})")
+        return "\n".join(lines)
+
+    def render_metrics(self) -> str:
+        """
+        Prometheus 텍스트 형식의 규칙 기반 추출 메트릭
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        return "\n".join([
+            "# HELP lab_extractor_messages_total Chat messages checked by the rule-based lab extractor.",
+            "# TYPE lab_extractor_messages_total counter",
+        ] + [f'lab_extractor_messages_total{{result="{result}"}} {count}' for result, count in stats.items()]) + "\n"
@@ -1,19 +1,260 @@
-import os
 import json
 import logging
-import openai
+import threading
+
+from utils.history_manager import count_message_tokens
+from utils.llm_provider import get_llm_client, get_llm_model
+from utils.tracing import span
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# API 키 설정
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# 응답 본문이 없을 때(tool call만 있는 경우) 사용하는 문구
+EMPTY_RESPONSE_TEXT = "혈액 검사 결과를 분석 중입니다."
+ERROR_RESPONSE_TEXT = "죄송합니다. 메시지 처리 중 오류가 발생했습니다."
+
+# 대화 요약 최대 길이 (토큰)
+SUMMARY_MAX_TOKENS = 400
+
+# 누적 프롬프트 토큰 수 (/api/metrics)
+_prompt_stats_lock = threading.Lock()
+_prompt_stats = {"calls": 0, "prompt_tokens": 0}
+
+# function calling 정의
+BLOOD_TEST_TOOLS = [
+    {
+        "type": "function",
+        "function" : {
+            "name": "extract_blood_test_values",
+            "description": "환자의 혈액 검사 값을 추출합니다.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "glucose": {
+                        "type" : "number",
+                        "description": "혈당 (Glucose) 수치 (mg/dL)"
+                    },
+                     "albumin": {
+                        "type": "number",
+                        "description": "알부민 (Albumin) 수치 (g/dL)"
+                    },
+                    "bun": {
+                        "type": "number",
+                        "description": "혈중요소질소 (BUN) 수치 (mg/dL)"
+                    },
+                    "phosphorus": {
+                        "type": "number",
+                        "description": "인 (Phosphorus) 수치 (mg/dL)"
+                    },
+                    "total_protein": {
+                        "type": "number",
+                        "description": "총 단백질 (Total Protein) 수치 (g/dL)"
+                    }
+                },
+                "required": []
+            }
+        }
+    }
+]
+
+def build_system_message(context=None):
+    """
+    RAG context 유무에 따른 시스템 메시지 생성
+
+    Args:
+        context (str, optional): RAG 시스템에서 검색한 관련 컨텍스트
+
+    Returns:
+        str: 시스템 메시지
+    """
+    if context and context.strip():
+        system_message = """
+        당신은 신생아중환자실(NICU)에서 근무하는 의료진과 동등한 수준의 전문 지식을 갖추고 있는 챗봇입니다.
+
+        **중요한 지침:**
+        1. 답변은 반드시 아래 제공된 의학 문서의 내용에만 기반해야 합니다.
+        2. 제공된 문서에 없는 정보는 절대 추가하지 마세요.
+        3. 문서에서 답을 찾을 수 없는 경우, "제공된 문서에서 관련 정보를 찾을 수 없습니다"라고 명시하세요.
+        4. 필요한 혈액검사 값이 입력된 경우에만 function call을 사용하세요.
+        5. 소아청소년과 이외 다른 진료과에서 다루는 내용이 포함된 경우, 답변 마지막에 "타 진료과와 관련된 내용이 포함되어 있습니다. 필요시 Consult answer를 받으시기 바랍니다." 문장을 추가하세요.
+
+        필요한 혈액 검사 값:
+        1. 혈당 (Glucose, mg/dL) - 정상 범위: 70-100 mg/dL
+        2. 알부민 (Albumin, g/dL) - 정상 범위: 3.4-5.4 g/dL
+        3. 혈중요소질소 (BUN, mg/dL) - 정상 범위: 7-20 mg/dL
+        4. 인 (Phosphorus, mg/dL) - 정상 범위: 2.5-4.5 mg/dL
+        5. 총 단백질 (Total Protein, g/dL) - 정상 범위: 6.0-8.3 g/dL
+
+        **참고할 의학 문서:**
+        {context}
+
+        위 내용을 참고하여 사용자의 질문에 최대한 도움이 되는 답변을 제공하세요. 검색된 내용이 제한적인 경우에도 가능한 정보를 제공하고, 더 자세한 내용이 필요하다면 구체적인 질문을 요청하세요.
+    """.format(context=context)
+    else:
+        system_message = """
+        당신은 신생아중환자실(NICU)에서 근무하는 의료진과 동등한 수준의 전문 지식을 갖추고 있는 챗봇입니다.
+
+        필요한 혈액 검사 값:
+        1. 혈당 (Glucose, mg/dL) - 정상 범위: 70-100 mg/dL
+        2. 알부민 (Albumin, g/dL) - 정상 범위: 3.4-5.4 g/dL
+        3. 혈중요소질소 (BUN, mg/dL) - 정상 범위: 7-20 mg/dL
+        4. 인 (Phosphorus, mg/dL) - 정상 범위: 2.5-4.5 mg/dL
+        5. 총 단백질 (Total Protein, g/dL) - 정상 범위: 6.0-8.3 g/dL
+
+        혈액검사 결과가 제공되면 function call을 사용하여 값을 추출하세요.
+        일반적인 질문에는 현재 업로드된 문서가 없으므로 문서를 업로드 한 후 질문을 할 수 있게끔 안내하세요.
+        """
+
+    return system_message
+
+def build_history_messages(chat_history):
+    """
+    프론트엔드 채팅 기록을 OpenAI 메시지 형식으로 변환
+
+    Args:
+        chat_history (list): 채팅 기록 ({"type": "user"|"bot", "content": ...} 리스트)
+
+    Returns:
+        list: OpenAI 메시지 리스트
+    """
+    return [
+        {
+            "role": "user" if message["type"] == "user" else "assistant",
+            "content": message["content"]
+        }
+        for message in chat_history
+    ]
+
+def parse_blood_test_values(assistant_message, blood_test_mapping):
+    """
+    응답의 tool call에서 혈액검사 값 추출
 
-# OpenAI API 설정
-openai.api_key = OPENAI_API_KEY
+    Args:
+        assistant_message: OpenAI 응답 메시지
+        blood_test_mapping (dict): 혈액검사 필드 매핑
 
-def process_with_openai(user_message, chat_history, blood_test_mapping, context=None):
+    Returns:
+        dict: 추출된 값 딕셔너리
+    """
+    extracted_values = {}
+
+    # tool calls 처리
+    if hasattr(assistant_message, 'tool_calls') and assistant_message.tool_calls:
+        for tool_call in assistant_message.tool_calls:
+            if tool_call.function.name == "extract_blood_test_values":
+                _merge_blood_test_arguments(tool_call.function.arguments, blood_test_mapping, extracted_values)
+
+    return extracted_values
+
+def _merge_blood_test_arguments(arguments, blood_test_mapping, extracted_values):
+    """
+    extract_blood_test_values 호출 인자(JSON 문자열)의 값을 extracted_values에 추가
+    """
+    try:
+        function_args = json.loads(arguments)
+
+        # 추출된 값 저장
+        for key, value in function_args.items():
+            if key in blood_test_mapping and value is not None:
+                extracted_values[key] = value
+    except json.JSONDecodeError:
+        logger.error("Function arguments JSON 파싱 오류")
+
+def record_prompt_tokens(kind, messages, usage=None):
+    """
+    LLM 호출 한 번의 프롬프트 토큰 수 기록 (API가 usage를 주면 그 값, 아니면 추정치)
+
+    Args:
+        kind (str): 호출 종류 (chat, stream, summary)
+        messages (list): 요청 메시지
+        usage: OpenAI 응답의 usage 객체
+    """
+    estimated = count_message_tokens(messages)
+    actual = getattr(usage, "prompt_tokens", None) if usage is not None else None
+    with _prompt_stats_lock:
+        _prompt_stats["calls"] += 1
+        _prompt_stats["prompt_tokens"] += actual if actual is not None else estimated
+    logger.info(f"LLM prompt tokens ({kind}): estimated={estimated} actual={actual} messages={len(messages)}")
+
+def _record_usage(attributes, usage):
+    """
+    OpenAI 응답의 토큰 사용량을 span 속성으로 기록
+    """
+    if usage is not None:
+        attributes["prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+        attributes["completion_tokens"] = getattr(usage, "completion_tokens", None)
+
+def render_prompt_metrics():
+    """
+    Prometheus 텍스트 형식의 LLM 프롬프트 토큰 메트릭
+    """
+    with _prompt_stats_lock:
+        calls, tokens = _prompt_stats["calls"], _prompt_stats["prompt_tokens"]
+    return "\n".join([
+        "# HELP llm_requests_total LLM completion requests.",
+        "# TYPE llm_requests_total counter",
+        f"llm_requests_total {calls}",
+        "# HELP llm_prompt_tokens_total Prompt tokens sent to the LLM.",
+        "# TYPE llm_prompt_tokens_total counter",
+        f"llm_prompt_tokens_total {tokens}",
+    ]) + "\n"
+
+def summarize_history(previous_summary, messages):
+    """
+    이전 대화를 요약 (HistoryManager의 summarize 함수)
+
+    Args:
+        previous_summary (str, optional): 이미 있는 요약 (있으면 이어서 갱신)
+        messages (list): 새로 요약에 포함할 OpenAI 메시지
+
+    Returns:
+        str: 새 요약
+    """
+    transcript = "\n".join(
+        f"{'사용자' if message['role'] == 'user' else '챗봇'}: {message['content']}" for message in messages
+    )
+    prompt = (
+        "다음은 신생아중환자실 의료진과 챗봇의 이전 대화입니다. 이후 대화에 필요한 질문 주제, "
+        "환자 정보, 챗봇이 제시한 결론과 처방 수치를 빠짐없이 한국어로 간결하게 요약하세요.\n\n"
+    )
+    if previous_summary:
+        prompt += f"**기존 요약:**\n{previous_summary}\n\n**이어지는 대화:**\n"
+    prompt += transcript
+
+    summary_messages = [{"role": "user", "content": prompt}]
+    try:
+        with span("openai.summary", model=get_llm_model()) as attrs:
+            response = get_llm_client().chat.completions.create(
+                model=get_llm_model(),
+                messages=summary_messages,
+                max_tokens=SUMMARY_MAX_TOKENS
+            )
+            _record_usage(attrs, getattr(response, "usage", None))
+        record_prompt_tokens("summary", summary_messages, getattr(response, "usage", None))
+        return response.choices[0].message.content or previous_summary or ""
+    except Exception as e:
+        # 요약에 실패하면 기존 요약(또는 빈 요약)으로 계속 진행
+        logger.exception(f"대화 요약 중 오류: {str(e)}")
+        return previous_summary or ""
+
+def build_messages(user_message, chat_history, context=None, history_messages=None):
+    """
+    시스템 메시지, 채팅 기록, 현재 사용자 메시지로 OpenAI 요청 메시지 구성
+    """
+    # 대화 이력 구성
+    messages = [{"role": "system", "content": build_system_message(context)}]
+
+    # 채팅 히스토리 보관
+    if history_messages is None:
+        history_messages = build_history_messages(chat_history)
+    messages.extend(history_messages)
+
+    # 현재 사용자 메시지 추가
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+def process_with_openai(user_message, chat_history, blood_test_mapping, context=None, history_messages=None):
     """
     OpenAI API를 사용하여 사용자 메시지에서 혈액검사 값을 추출하고 응답 생성
     
@@ -22,136 +263,117 @@ def process_with_openai(user_message, chat_history, blood_test_mapping, context=
         chat_history (list): 채팅 기록
         blood_test_mapping (dict): 혈액검사 필드 매핑
         context (str, optional): RAG 시스템에서 검색한 관련 컨텍스트
+        history_messages (list, optional): 미리 변환해 둔 채팅 기록 메시지
+            (없으면 chat_history로부터 생성)
         
     Returns:
         tuple: (추출된 값 딕셔너리, LLM 응답 텍스트)
     """
 
     try:
-        # 대화 이력 구성
-        messages = []
-
-        # 시스템 메시지 - RAG context 유무에 따라 다르게 구성
-        if context and context.strip():
-            system_message = """
-            당신은 신생아중환자실(NICU)에서 근무하는 의료진과 동등한 수준의 전문 지식을 갖추고 있는 챗봇입니다.
-
-            **중요한 지침:**
-            1. 답변은 반드시 아래 제공된 의학 문서의 내용에만 기반해야 합니다.
-            2. 제공된 문서에 없는 정보는 절대 추가하지 마세요.
-            3. 문서에서 답을 찾을 수 없는 경우, "제공된 문서에서 관련 정보를 찾을 수 없습니다"라고 명시하세요.
-            4. 필요한 혈액검사 값이 입력된 경우에만 function call을 사용하세요.
-            5. 소아청소년과 이외 다른 진료과에서 다루는 내용이 포함된 경우, 답변 마지막에 "타 진료과와 관련된 내용이 포함되어 있습니다. 필요시 Consult answer를 받으시기 바랍니다." 문장을 추가하세요.
-
-            필요한 혈액 검사 값:
-            1. 혈당 (Glucose, mg/dL) - 정상 범위: 70-100 mg/dL
-            2. 알부민 (Albumin, g/dL) - 정상 범위: 3.4-5.4 g/dL
-            3. 혈중요소질소 (BUN, mg/dL) - 정상 범위: 7-20 mg/dL
-            4. 인 (Phosphorus, mg/dL) - 정상 범위: 2.5-4.5 mg/dL
-            5. 총 단백질 (Total Protein, g/dL) - 정상 범위: 6.0-8.3 g/dL
-
-            **참고할 의학 문서:**
-            {context}
-
-            위 내용을 참고하여 사용자의 질문에 최대한 도움이 되는 답변을 제공하세요. 검색된 내용이 제한적인 경우에도 가능한 정보를 제공하고, 더 자세한 내용이 필요하다면 구체적인 질문을 요청하세요.
-        """.format(context=context)
-        else:
-            system_message = """
-            당신은 신생아중환자실(NICU)에서 근무하는 의료진과 동등한 수준의 전문 지식을 갖추고 있는 챗봇입니다.
-            
-            필요한 혈액 검사 값:
-            1. 혈당 (Glucose, mg/dL) - 정상 범위: 70-100 mg/dL
-            2. 알부민 (Albumin, g/dL) - 정상 범위: 3.4-5.4 g/dL
-            3. 혈중요소질소 (BUN, mg/dL) - 정상 범위: 7-20 mg/dL
-            4. 인 (Phosphorus, mg/dL) - 정상 범위: 2.5-4.5 mg/dL
-            5. 총 단백질 (Total Protein, g/dL) - 정상 범위: 6.0-8.3 g/dL
-            
-            혈액검사 결과가 제공되면 function call을 사용하여 값을 추출하세요.
-            일반적인 질문에는 현재 업로드된 문서가 없으므로 문서를 업로드 한 후 질문을 할 수 있게끔 안내하세요.
-            """
-
-        messages.append({"role": "system", "content": system_message})
-
-        # 채팅 히스토리 보관
-        for message in chat_history:
-            messages.append({
-                "role": "user" if message["type"] == "user" else "assistant",
-                "content": message["content"]
-            })
-
-        # 현재 사용자 메시지 추가
-        messages.append({"role": "user", "content": user_message})
-
-        # function calling 정의
-        functions =[
-            {
-                "type": "function",
-                "function" : {
-                    "name": "extract_blood_test_values",
-                    "description": "환자의 혈액 검사 값을 추출합니다.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "glucose": {
-                                "type" : "number",
-                                "description": "혈당 (Glucose) 수치 (mg/dL)"
-                            },
-                             "albumin": {
-                                "type": "number",
-                                "description": "알부민 (Albumin) 수치 (g/dL)"
-                            },
-                            "bun": {
-                                "type": "number",
-                                "description": "혈중요소질소 (BUN) 수치 (mg/dL)"
-                            },
-                            "phosphorus": {
-                                "type": "number",
-                                "description": "인 (Phosphorus) 수치 (mg/dL)"
-                            },
-                            "total_protein": {
-                                "type": "number",
-                                "description": "총 단백질 (Total Protein) 수치 (g/dL)"
-                            }
-                        },
-                        "required": []
-                    }
-                }
-            }
-        ]
+        messages = build_messages(user_message, chat_history, context, history_messages)
 
         # API 호출
-        response = openai.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=messages,
-            tools=functions,
-            tool_choice="auto"
-        )
+        with span("openai.chat", model=get_llm_model()) as attrs:
+            response = get_llm_client().chat.completions.create(
+                model=get_llm_model(),
+                messages=messages,
+                tools=BLOOD_TEST_TOOLS,
+                tool_choice="auto"
+            )
+            _record_usage(attrs, getattr(response, "usage", None))
+        record_prompt_tokens("chat", messages, getattr(response, "usage", None))
 
         assistant_message = response.choices[0].message
 
         # 추출된 값 확인
-        extracted_values = {}
-        llm_response_text = ""
-
-        # tool calls 처리
-        if hasattr(assistant_message, 'tool_calls') and assistant_message.tool_calls:
-            for tool_call in assistant_message.tool_calls:
-                if tool_call.function.name == "extract_blood_test_values":
-                    try:
-                        function_args = json.loads(tool_call.function.arguments)
-
-                        # 추출된 값 저장
-                        for key, value in function_args.items():
-                            if key in blood_test_mapping and value is not None:
-                                extracted_values[key] = value
-                    except json.JSONDecodeError:
-                        logger.error("Function arguments JSON 파싱 오류")
+        extracted_values = parse_blood_test_values(assistant_message, blood_test_mapping)
 
         # LLM 응답 텍스트
-        llm_response_text = assistant_message.content if assistant_message.content else "혈액 검사 결과를 분석 중입니다."
+        llm_response_text = assistant_message.content if assistant_message.content else EMPTY_RESPONSE_TEXT
 
         return extracted_values, llm_response_text
     
     except Exception as e:
         logger.exception(f"OpenAI API 처리 중 오류: {str(e)}")
-        return {}, "죄송합니다. 메시지 처리 중 오류가 발생했습니다."
\ No newline at end of file
+        return {}, ERROR_RESPONSE_TEXT
+
+def stream_with_openai(user_message, chat_history, blood_test_mapping, context=None, history_messages=None):
+    """
+    `process_with_openai`의 스트리밍 버전
+
+    응답 토큰을 받는 대로 ("token", 텍스트)로 내보내고, 스트림이 끝나 tool call
+    인자가 완성되면 ("values", 추출된 값 딕셔너리)를 마지막으로 내보낸다.
+
+    Args:
+        user_message (str): 사용자 메시지
+        chat_history (list): 채팅 기록
+        blood_test_mapping (dict): 혈액검사 필드 매핑
+        context (str, optional): RAG 시스템에서 검색한 관련 컨텍스트
+        history_messages (list, optional): 미리 변환해 둔 채팅 기록 메시지
+
+    Yields:
+        tuple: ("token", str) 또는 ("values", dict)
+    """
+    stream = None
+    messages = None
+    usage = None
+    has_content = False
+    # tool call 인덱스별 (함수 이름, 인자 조각 리스트)
+    tool_calls = {}
+
+    try:
+        messages = build_messages(user_message, chat_history, context, history_messages)
+        # 스트림은 응답 헤더를 받을 때까지(연결 + 대기열)만 span으로 기록
+        with span("openai.stream_open", model=get_llm_model()):
+            stream = get_llm_client().chat.completions.create(
+                model=get_llm_model(),
+                messages=messages,
+                tools=BLOOD_TEST_TOOLS,
+                tool_choice="auto",
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+
+        for chunk in stream:
+            # 마지막 청크에만 usage가 있음 (choices는 비어 있음)
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+
+            if delta.content:
+                has_content = True
+                yield "token", delta.content
+
+            for tool_call in delta.tool_calls or []:
+                entry = tool_calls.setdefault(tool_call.index, [None, []])
+                if tool_call.function is not None:
+                    if tool_call.function.name:
+                        entry[0] = tool_call.function.name
+                    if tool_call.function.arguments:
+                        entry[1].append(tool_call.function.arguments)
+
+    except Exception as e:
+        logger.exception(f"OpenAI API 스트리밍 중 오류: {str(e)}")
+        yield "token", ("\n\n" if has_content else "") + ERROR_RESPONSE_TEXT
+        yield "values", {}
+        return
+    finally:
+        # 클라이언트 연결 종료로 제너레이터가 닫혀도 OpenAI 연결을 정리
+        if stream is not None and hasattr(stream, "close"):
+            stream.close()
+        if messages is not None:
+            record_prompt_tokens("stream", messages, usage)
+
+    if not has_content:
+        yield "token", EMPTY_RESPONSE_TEXT
+
+    # 완성된 tool call 인자를 process_with_openai와 같은 규칙으로 파싱
+    extracted_values = {}
+    for name, arguments in tool_calls.values():
+        if name == "extract_blood_test_values":
+            _merge_blood_test_arguments("".join(arguments) or "{}", blood_test_mapping, extracted_values)
+
+    yield "values", extracted_values
\ No newline at end of file
@@ -0,0 +1,75 @@
+import os
+import logging
+import threading
+from typing import Optional
+
+import openai
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 제공자별 기본 API 주소 (None이면 OpenAI 기본값)
+PROVIDER_BASE_URLS = {
+    "openai": None,
+    # benchmarks/mock_openai.py (OpenAI 호환 로컬 대역 서버)
+    "mock": "http://localhost:8100/v1",
+    # vLLM, Ollama 등 OpenAI 호환 서버 (LLM_BASE_URL 필수)
+    "compatible": None,
+}
+
+_lock = threading.Lock()
+_settings = {
+    "provider": os.getenv("LLM_PROVIDER", "openai"),
+    "api_key": os.getenv("OPENAI_API_KEY"),
+    "base_url": os.getenv("LLM_BASE_URL"),
+    "model": os.getenv("LLM_MODEL", "gpt-4.1-mini"),
+}
+_client = None
+
+
+def configure_llm_provider(provider: str, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                           model: Optional[str] = None):
+    """
+    LLM 제공자 설정 (app.py 시작 시 호출)
+
+    Args:
+        provider: "openai", "mock" 또는 "compatible"
+        api_key: API 키 (mock은 필요 없음)
+        base_url: API 주소 (없으면 제공자 기본값)
+        model: 모델 이름
+    """
+    global _client
+    if provider not in PROVIDER_BASE_URLS:
+        raise ValueError(f"Unknown LLM provider: {provider} (expected one of {', '.join(PROVIDER_BASE_URLS)})")
+    base_url = base_url or PROVIDER_BASE_URLS[provider]
+    if provider == "compatible" and not base_url:
+        raise ValueError("LLM_BASE_URL is required for the 'compatible' LLM provider")
+
+    with _lock:
+        _settings.update(provider=provider, api_key=api_key, base_url=base_url)
+        if model:
+            _settings["model"] = model
+        # 클라이언트(연결 풀)는 처음 호출하는 프로세스에서 생성 (gunicorn fork 이후)
+        _client = None
+    logger.info(f"LLM provider: {provider} (model={_settings['model']}, base_url={base_url or 'default'})")
+
+
+def get_llm_client() -> openai.OpenAI:
+    """
+    설정된 제공자의 OpenAI 호환 클라이언트 (프로세스당 하나)
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            api_key = _settings["api_key"]
+            if _settings["provider"] != "openai":
+                # 로컬/호환 서버는 키를 검사하지 않지만 클라이언트는 값이 필요함
+                api_key = api_key or "not-needed"
+            base_url = _settings["base_url"] or PROVIDER_BASE_URLS.get(_settings["provider"])
+            _client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        return _client
+
+
+def get_llm_model() -> str:
+    return _settings["model"]
@@ -0,0 +1,271 @@
+import random
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.tracing import REQUEST_ID_HEADER, current_request_id, span
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 재시도할 ml-backend 응답 상태 코드 (일시적인 과부하/배포 중)
+RETRY_STATUS_CODES = (502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """
+    회로 차단기가 열려 있어 ml-backend 호출을 시도하지 않음
+    """
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 `failure_threshold`번 쌓이면 열려서 `reset_timeout`초 동안 호출을 바로 거부
+
+    - closed: 정상 호출
+    - open: 호출 즉시 거부 (ml-backend가 내려가 있어도 요청마다 제한 시간을 기다리지 않음)
+    - half_open: 열린 뒤 `reset_timeout`이 지나면 시험 호출 하나만 허용,
+      성공하면 closed, 실패하면 다시 open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.opened_count = 0
+        self.rejected_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        지금 호출해도 되는지 확인 (half_open에서는 시험 호출 하나만 허용)
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected_count += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("ml-backend circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened_count += 1
+                    logger.warning(f"ml-backend circuit opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)) if state == self.OPEN else 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "retry_in": round(retry_in, 3),
+                "opened_count": self.opened_count,
+                "rejected_count": self.rejected_count
+            }
+
+
+class MLClient:
+    """
+    ml-backend 호출용 공유 HTTP 클라이언트
+
+    - requests.Session 하나를 모든 요청이 공유해 keep-alive 연결을 재사용
+      (요청마다 TCP 연결을 새로 맺지 않음)
+    - 연결 실패와 502/503/504 응답은 지수 백오프 + 지터로 최대 `max_retries`번 재시도
+    - 연속 실패가 쌓이면 회로 차단기가 열려 바로 실패 처리
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 16, connect_timeout: float = 1,
+                 read_timeout: float = 5, max_retries: int = 2, backoff: float = 0.1,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        MLClient 초기화
+
+        Args:
+            base_url: ml-backend 주소
+            pool_size: 유지할 keep-alive 연결 수 (동시에 ml-backend를 호출하는 스레드 수 이상)
+            connect_timeout: 연결 제한 시간 (초)
+            read_timeout: 응답 제한 시간 (초)
+            max_retries: 첫 시도 이후 재시도 횟수
+            backoff: 재시도 대기 시간 기준 (초, 시도마다 2배, 0 ~ 기준값 사이 무작위)
+            breaker: 회로 차단기 (없으면 기본값으로 생성)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        # urllib3 자체 재시도는 끄고 아래에서 회로 차단기와 함께 재시도
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0, pool_block=False)
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.retry_count = 0
+        self.failure_count = 0
+
+    def predict(self, data: List[List[float]]) -> requests.Response:
+        """
+        POST /predict
+
+        Raises:
+            CircuitOpenError: 회로 차단기가 열려 있음
+            requests.exceptions.RequestException: 재시도 후에도 연결 실패
+        """
+        return self.post("/predict", {"data": data})
+
+    def post(self, path: str, payload: Dict[str, Any]) -> requests.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError("ml-backend circuit is open")
+
+        with self._lock:
+            self.request_count += 1
+
+        attempt = 0
+        while True:
+            try:
+                with span("ml.http", path=path, attempt=attempt + 1) as attrs:
+                    response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout,
+                                                 headers=self._trace_headers())
+                    attrs["status"] = response.status_code
+                    # ml-backend 내부 단계별 시간 (parse, score, serialize)
+                    if response.headers.get("Server-Timing"):
+                        attrs["server_timing"] = response.headers["Server-Timing"]
+                if response.status_code not in RETRY_STATUS_CODES:
+                    # 4xx 등은 ml-backend가 살아 있다는 뜻이므로 성공으로 취급
+                    self.breaker.record_success()
+                    return response
+                error = None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response, error = None, e
+            except BaseException:
+                # 재시도하지 않는 오류(ChunkedEncodingError, InvalidURL 등)도 실패로 기록해야
+                # half_open 시험 호출 슬롯이 풀림
+                self._record_failure()
+                raise
+
+            if attempt >= self.max_retries:
+                self._record_failure()
+                if error is not None:
+                    raise error
+                return response
+
+            attempt += 1
+            with self._lock:
+                self.retry_count += 1
+            # 지수 백오프 + 전체 지터: 동시에 실패한 요청이 한꺼번에 재시도하지 않도록
+            delay = random.uniform(0, self.backoff * (2 ** (attempt - 1)))
+            logger.warning(f"ml-backend 요청 재시도 {attempt}/{self.max_retries} ({delay * 1000:.0f}ms 후): "
+                           f"{error or response.status_code}")
+            time.sleep(delay)
+
+    @staticmethod
+    def _trace_headers() -> Dict[str, str]:
+        request_id = current_request_id()
+        return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+    def _record_failure(self):
+        with self._lock:
+            self.failure_count += 1
+        self.breaker.record_failure()
+
+    def pool_state(self) -> Dict[str, int]:
+        """
+        연결 풀 상태 (유휴 keep-alive 연결 수, 누적 연결 생성 수)
+        """
+        idle = connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            # urllib3는 빈 자리를 None으로 채워 두므로 실제 연결만 셈
+            if pool.pool is not None:
+                idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            connections += pool.num_connections
+        return {"maxsize": self.pool_size, "idle": idle, "connections_created": connections}
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {
+                "requests": self.request_count,
+                "retries": self.retry_count,
+                "failures": self.failure_count
+            }
+        return {
+            "url": self.base_url,
+            "pool": self.pool_state(),
+            "breaker": self.breaker.describe(),
+            **counts
+        }
+
+    def render_metrics(self) -> str:
+        """
+        Prometheus 텍스트 형식의 클라이언트 메트릭
+        """
+        state = self.describe()
+        breaker = state["breaker"]
+        states = (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN)
+        metrics = [
+            ("ml_client_requests_total", "counter", "Prediction requests sent to ml-backend.", [("", state["requests"])]),
+            ("ml_client_retries_total", "counter", "Retried ml-backend requests.", [("", state["retries"])]),
+            ("ml_client_failures_total", "counter", "ml-backend requests that failed after all retries.", [("", state["failures"])]),
+            ("ml_client_pool_idle_connections", "gauge", "Idle keep-alive connections to ml-backend.", [("", state["pool"]["idle"])]),
+            ("ml_client_pool_connections_created_total", "counter", "Connections opened to ml-backend.", [("", state["pool"]["connections_created"])]),
+            ("ml_client_circuit_state", "gauge", "1 for the current circuit breaker state.",
+             [(f'{{state="{name}"}}', int(breaker["state"] == name)) for name in states]),
+            ("ml_client_circuit_opened_total", "counter", "Times the circuit breaker opened.", [("", breaker["opened_count"])]),
+            ("ml_client_circuit_rejected_total", "counter", "Requests rejected while the circuit was open.", [("", breaker["rejected_count"])]),
+        ]
+        lines = []
+        for name, metric_type, help_text, samples in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
@@ -1,11 +1,16 @@
 import os
+import time
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import json
 from langchain.schema import Document
 import traceback
-from utils.document_loader import DocumentLoader
+from utils.document_loader import SUPPORTED_EXTENSIONS, DocumentLoader
 from utils.embeddings import EmbeddingManager
+from utils.context_assembler import ContextAssembler
+from utils.index_manifest import IndexManifest, file_sha256
+from utils.tracing import span
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -16,7 +21,8 @@ class RAGEngine:
     Retrieval-Augmented Generation (RAG) 기능을 구현한 엔진
     """
 
-    def __init__(self, medical_guidelines_dir: str = "./medical_guidelines", vector_db_dir: str = "./data/vector_db", embedding_model: str = "local", openai_api_key: Optional[str] = None):
+    def __init__(self, medical_guidelines_dir: str = "./medical_guidelines", vector_db_dir: str = "./data/vector_db", embedding_model: str = "local", openai_api_key: Optional[str] = None,
+                 context_assembler: Optional[ContextAssembler] = None, use_mmr: bool = False):
         """
         RAGEngine initialize
         
@@ -25,6 +31,8 @@ class RAGEngine:
             vector_db_dir: 백터 데이터베이스 저장 디렉토리
             embedding_model: 사용할 임베딩 모델('local' 또는 'openai')
             openai_api_key: OpenAI API Key
+            context_assembler: 검색 결과 조립기 (겹침 병합, 중복 제거, 토큰 예산)
+            use_mmr: MMR로 서로 덜 겹치는 문서를 검색할지 여부
         """
 
         # 진료 지침 디렉토리
@@ -34,6 +42,9 @@ class RAGEngine:
         os.makedirs(medical_guidelines_dir, exist_ok=True)
         os.makedirs(vector_db_dir, exist_ok=True)
 
+        self.context_assembler = context_assembler or ContextAssembler()
+        self.use_mmr = use_mmr
+
         # 문서 로더 및 임베딩 관리자 초기화
         self.document_loader = DocumentLoader(chunk_size=1000, chunk_overlap=200)
         self.embedding_manager = EmbeddingManager(
@@ -42,45 +53,137 @@ class RAGEngine:
             openai_api_key=openai_api_key
         )
 
-        # 지침 문서 인덱싱
+        # 색인된 파일 목록 (크기, 수정 시각, 내용 해시, 청크 ID)
+        self.manifest = IndexManifest(os.path.join(vector_db_dir, "index_manifest.json"))
+
+        # 지침 문서 인덱싱 (새로 추가되거나 바뀐 파일만)
         self._index_guidelines()
 
     def _index_guidelines(self):
         """
-        진료 지침 디렉토리에 있는 모든 문서를 인덱싱
+        진료 지침 디렉토리와 색인 manifest를 비교해 새로 추가되거나 바뀐 파일만 인덱싱하고,
+        사라진 파일의 청크는 벡터 저장소에서 삭제
+
+        크기와 수정 시각이 manifest와 같으면 파일을 읽지 않고, 다르면 내용 해시를 비교해
+        내용이 같으면(복사, touch 등) 다시 인덱싱하지 않는다.
         """
+        start = time.perf_counter()
         try:
-            # 디렉토리가 비어 있는지 확인
-            files = os.listdir(self.medical_guidelines_dir)
-            if not files:
-                logger.info(f"진료 지침 디렉토리가 비어 있음: {self.medical_guidelines_dir}")
-                return
+            # manifest 없이 쌓인 벡터(이전 버전에서 시작할 때마다 중복 추가된 청크)는 한 번 비우고 다시 인덱싱
+            if not self.manifest.exists() and self.embedding_manager.document_count():
+                logger.info("색인 manifest가 없어 벡터 저장소를 비우고 전체 진료 지침을 다시 인덱싱")
+                self.embedding_manager.clear_collection()
+                self.manifest.reset()
 
-            # 문서 로드 및 청크로 분할
-            documents = self.document_loader.process_dictionary(self.medical_guidelines_dir)
+            indexed = self.manifest.load()
+            files = self._guideline_files()
 
-            if documents:
-                # 벡터 저장소에 문서 추가
-                success = self.embedding_manager.add_documents(documents)
-                if success:
-                    logger.info(f"진료 지침 인덱싱 완료: 총 {len(documents)}개의 청크")
-                else:
-                    logger.error("벡터 저장소에 문서 추가 실패")
-            else:
-                logger.warning("인덱싱할 문서가 없음")
+            unchanged, changed = 0, []
+            for relative_path, file_path in files.items():
+                stat = os.stat(file_path)
+                previous = indexed.get(relative_path)
+                if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+                    unchanged += 1
+                    continue
+
+                digest = file_sha256(file_path)
+                if previous and previous["sha256"] == digest:
+                    self.manifest.set(relative_path, {**previous, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+                    unchanged += 1
+                    continue
+                changed.append((relative_path, file_path))
+
+            # 사라진 파일의 청크 삭제
+            vanished = [relative_path for relative_path in indexed if relative_path not in files]
+            for relative_path in vanished:
+                self._remove_indexed_file(relative_path)
+
+            chunks = 0
+            for relative_path, file_path in changed:
+                documents = self.document_loader.process_file(file_path)
+                chunks += self._store_file_chunks(file_path, documents) or 0
+
+            logger.info(f"진료 지침 인덱싱 완료 ({(time.perf_counter() - start) * 1000:.0f}ms): "
+                        f"변경 없음 {unchanged}개, 인덱싱 {len(changed)}개 파일 ({chunks}개 청크), "
+                        f"삭제 {len(vanished)}개 파일")
 
         except Exception as e:
             logger.error(f"진료 지침 인덱싱 중 오류 발생: {str(e)}")
             logger.error(traceback.format_exc())
+
+    def _guideline_files(self) -> Dict[str, str]:
+        """
+        진료 지침 디렉토리 기준 상대 경로 -> 전체 경로 (색인 대상 확장자만)
+        """
+        files = {}
+        for root, _, filenames in os.walk(self.medical_guidelines_dir):
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() in SUPPORTED_EXTENSIONS:
+                    file_path = os.path.join(root, filename)
+                    files[os.path.relpath(file_path, self.medical_guidelines_dir)] = file_path
+        return files
+
+    def _store_file_chunks(self, file_path: str, documents: List[Document],
+                           on_batch: Optional[Callable[[int, int], None]] = None) -> Optional[int]:
+        """
+        파일 하나의 청크를 벡터 저장소에 추가하고 manifest에 기록 (이전에 색인된 청크는 삭제)
+
+        청크 ID는 파일 경로와 내용 해시로 정하므로 같은 내용을 다시 추가해도 중복되지 않음
+
+        Returns:
+            추가한 청크 수 (실패하면 None)
+        """
+        relative_path = os.path.relpath(file_path, self.medical_guidelines_dir)
+        stat = os.stat(file_path)
+        digest = file_sha256(file_path)
+        previous = self.manifest.get(relative_path)
+
+        documents = [doc for doc in documents if doc.page_content and doc.page_content.strip()]
+        path_key = hashlib.sha256(relative_path.encode("utf-8")).hexdigest()[:12]
+        chunk_ids = [f"{path_key}-{digest[:16]}-{i}" for i in range(len(documents))]
+
+        if documents and not self.embedding_manager.add_documents(documents, ids=chunk_ids, on_batch=on_batch):
+            logger.error(f"벡터 저장소에 문서 추가 실패: {relative_path}")
+            return None
+
+        # 새 청크를 추가한 뒤 이전 버전의 청크 삭제 (추가에 실패하면 이전 청크 유지)
+        if previous:
+            current = set(chunk_ids)
+            stale = [chunk_id for chunk_id in previous.get("chunk_ids", []) if chunk_id not in current]
+            self.embedding_manager.delete_documents(stale)
+
+        # 청크가 없는 파일(로드 실패 등)도 기록해 두어 시작할 때마다 다시 파싱/OCR하지 않음
+        self.manifest.set(relative_path, {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "chunk_ids": chunk_ids,
+        })
+        return len(documents)
+
+    def _remove_indexed_file(self, relative_path: str) -> bool:
+        """
+        manifest에 기록된 파일의 청크를 벡터 저장소에서 삭제
+        """
+        entry = self.manifest.get(relative_path)
+        if entry is None:
+            return False
+        if not self.embedding_manager.delete_documents(entry.get("chunk_ids", [])):
+            return False
+        self.manifest.remove(relative_path)
+        return True
     
-    def add_guideline(self, file_path: str, content: str, file_type: str = "text") -> bool:
+    def add_guideline(self, file_path: str, content: str, file_type: str = "text",
+                      on_progress: Optional[Callable[..., None]] = None) -> bool:
         """
         새로운 진료 지침 문서 추가
         
         Args:
             file_path: 저장할 파일 경로
-            content: 파일 내용
+            content: 파일 내용 (비어 있으면 이미 저장된 파일에서 읽음)
             file_type: 파일 유형 (디폴트 text)
+            on_progress: 진행 상황 콜백 (stage, pages_parsed, pages_total, chunks_total,
+                chunks_embedded 키워드 인자, IngestionJob.update)
             
         Returns:
             성공 여부 (bool)
@@ -97,6 +200,12 @@ class RAGEngine:
                 # 파일 저장
                 with open(save_path, 'w', encoding='utf-8') as f:
                     f.write(content)
+            elif not content and file_type != 'pdf' and os.path.exists(save_path):
+                with open(save_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+
+            report = on_progress or (lambda **fields: None)
+            report(stage="parsing")
 
             # 문서 처리
             if file_type == 'pdf':
@@ -104,9 +213,13 @@ class RAGEngine:
                 logger.info(f"PDF 문서 처리 시작: {save_path}")
 
                 # 상대 경로 대신 전체 경로 사용
-                documents = self.document_loader.load_document(save_path)
+                documents = self.document_loader.load_document(
+                    save_path,
+                    on_page=lambda parsed, total: report(pages_parsed=parsed, pages_total=total)
+                )
                 if documents:
                     # 청크로 분할
+                    report(stage="chunking")
                     documents = self.document_loader.split_documents(documents)
                     logger.info(f"PDF 문서 분할 완료: {len(documents)}개 청크")
                 else:
@@ -128,8 +241,13 @@ class RAGEngine:
             # 벡터 저장소에 추가
             if documents:
                 logger.info(f"벡터 저장소에 문서 추가 시작: {len(documents)}개 청크")
-                success = self.embedding_manager.add_documents(documents)
-                if success:
+                report(stage="embedding", chunks_total=len(documents))
+                stored = self._store_file_chunks(
+                    save_path,
+                    documents,
+                    on_batch=lambda embedded, total: report(chunks_embedded=embedded, chunks_total=total)
+                )
+                if stored is not None:
                     logger.info(f"새 진료 지침 추가 완료: {file_path}")
                     return True
                 else:
@@ -144,20 +262,48 @@ class RAGEngine:
             logger.error(traceback.format_exc())
             return False
         
-    def retrieve_relevant_context(self, query: str, k: int = 3) -> Tuple[List[Dict[str, Any]], str]:
+    def embed_query(self, query: str) -> List[float]:
+        """
+        쿼리 임베딩 계산
+        """
+        return self.embedding_manager.embed_query(query)
+
+    def guidelines_version(self) -> Tuple:
+        """
+        진료 지침 디렉토리의 파일 이름/크기/수정 시각 목록 (지침이 추가/삭제되면 바뀜)
+        """
+        try:
+            entries = []
+            for entry in os.scandir(self.medical_guidelines_dir):
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append((entry.name, stat.st_size, stat.st_mtime_ns))
+            return tuple(sorted(entries))
+        except OSError:
+            return ()
+
+    def retrieve_relevant_context(self, query: str, k: int = 3,
+                                  query_embedding: Optional[List[float]] = None) -> Tuple[List[Dict[str, Any]], str]:
         """
         쿼리와 관련된 진료 지침 검색
         
         Args:
             query: 사용자 쿼리
             k: 검색할 문서 수
+            query_embedding: 미리 계산한 쿼리 임베딩
             
         Returns:
             검색 결과 튜플 (관련 문서 리스트, 관련 문서를 결합한 문자열)
         """
         try:
             # 벡터 저장소에서 관련 문서 검색
-            docs = self.embedding_manager.search_documents(query, k=k)
+            with span("rag.search", k=k):
+                docs = self.embedding_manager.search_documents(query, k=k, query_embedding=query_embedding, mmr=self.use_mmr)
+
+            # 겹치는 청크 병합, 중복 제거, 토큰 예산 적용
+            with span("rag.assemble", chunks=len(docs)) as attrs:
+                docs = self.context_assembler.assemble(docs)
+                attrs["selected"] = len(docs)
 
             # 검색 결과 가공
             context_docs = []
@@ -246,14 +392,19 @@ class RAGEngine:
                 logger.warning(f"삭제할 파일이 존재하지 않음: {filename}")
                 return False
             
+            # 삭제할 파일의 청크를 먼저 벡터 저장소에서 삭제
+            # (실패하면 파일과 색인을 그대로 두어 다시 시도할 수 있게 하고, 요청 안에서
+            #  벡터 저장소 전체를 다시 인덱싱하지 않음)
+            if self.manifest.get(filename) is None:
+                # 인제스트가 실패했거나 아직 진행 중인 파일은 벡터 저장소에 지울 청크가 없음
+                logger.warning(f"색인 manifest에 없는 진료 지침, 파일만 삭제: {filename}")
+            elif not self._remove_indexed_file(filename):
+                logger.error(f"진료 지침 청크 삭제 실패, 파일을 삭제하지 않음: {filename}")
+                return False
+
             # 파일 삭제
             os.remove(file_path)
 
-            # 벡터 저장소 재구성 (삭제 후 모든 문서 다시 인덱싱)
-
-            self.embedding_manager.clear_collection()
-            self._index_guidelines()
-
             logger.info(f"진료 지침 삭제 완료: {filename}")
             return True
 
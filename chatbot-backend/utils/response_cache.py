@@ -0,0 +1,153 @@
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 혈액검사 항목 이름 (영문 약어/한글) 뒤에 숫자가 오면 검사 수치가 포함된 메시지로 간주
+_LAB_VALUE_PATTERN = re.compile(
+    r"(glucose|glu|albumin|alb|bun|phosph\w*|phos|protein|tp|혈당|포도당|알부민|요소\s*질소|인산?|총\s*단백\w*|단백질?)"
+    r"\s*[:=은는이가]?\s*[-+]?\d",
+    re.IGNORECASE
+)
+
+
+def contains_lab_values(text: str) -> bool:
+    """
+    메시지에 혈액검사 수치가 들어 있는지 확인 (환자별 응답이므로 캐시하지 않음)
+    """
+    return bool(text) and _LAB_VALUE_PATTERN.search(text) is not None
+
+
+def context_digest(context_docs: Sequence[Dict[str, Any]]) -> str:
+    """
+    검색된 청크 목록의 해시 (같은 질문이어도 검색 결과가 바뀌면 다른 캐시 키)
+
+    Chroma 검색 결과에는 청크 ID가 없으므로 출처/페이지/내용으로 청크를 식별
+    """
+    digest = hashlib.sha256()
+    for doc in context_docs:
+        digest.update(f"{doc.get('source')}\0{doc.get('page')}\0".encode("utf-8"))
+        digest.update(hashlib.sha256(doc.get("content", "").encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+class CachedResponse:
+    """
+    캐시된 채팅 응답 (LLM 응답 텍스트와 참고 문서)
+    """
+
+    __slots__ = ("llm_response", "references_text", "references")
+
+    def __init__(self, llm_response: str, references_text: str, references: List[Dict[str, Any]]):
+        self.llm_response = llm_response
+        self.references_text = references_text
+        self.references = references
+
+
+class SemanticResponseCache:
+    """
+    질문 임베딩 기반 응답 캐시
+
+    - 키: (질문 임베딩, 검색된 청크 해시). 청크 해시가 같은 항목 중 코사인 유사도가
+      `similarity_threshold` 이상인 가장 가까운 질문의 응답을 재사용
+    - LRU(`max_entries`) + TTL(`ttl`초) 제거
+    - `version`이 바뀌면(진료 지침 추가/삭제) 전체 무효화. gunicorn 워커마다 캐시가
+      따로 있으므로 다른 워커에서 지침이 바뀐 것도 조회 시점에 감지
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, max_entries: int = 256, ttl: float = 3600,
+                 version: Optional[Callable[[], Any]] = None):
+        """
+        SemanticResponseCache 초기화
+
+        Args:
+            similarity_threshold: 같은 질문으로 볼 최소 코사인 유사도
+            max_entries: 최대 캐시 항목 수
+            ttl: 캐시 항목 유효 시간 (초)
+            version: 진료 지침 버전을 반환하는 함수 (RAGEngine.guidelines_version)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = version
+        self._lock = threading.Lock()
+        # 항목 ID -> (정규화된 임베딩, 청크 해시, 응답, 저장 시각)
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._version = version() if version else None
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, embedding: Sequence[float], context_key: str) -> Optional[CachedResponse]:
+        query = self._normalize(embedding)
+        self._check_version()
+
+        with self._lock:
+            now = time.monotonic()
+            best_id, best_score = None, self.similarity_threshold
+            for entry_id, (vector, key, _, stored_at) in list(self._entries.items()):
+                if now - stored_at > self.ttl:
+                    del self._entries[entry_id]
+                    continue
+                if key != context_key:
+                    continue
+                score = float(np.dot(vector, query))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            logger.info(f"Response cache hit (similarity={best_score:.4f})")
+            return self._entries[best_id][2]
+
+    def store(self, embedding: Sequence[float], context_key: str, response: CachedResponse):
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._entries[self._next_id] = (vector, context_key, response, time.monotonic())
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """
+        캐시 전체 삭제 (진료 지침 추가/삭제 시)
+        """
+        with self._lock:
+            self._entries.clear()
+            self._version = self.version() if self.version else None
+        logger.info("Response cache invalidated")
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _check_version(self):
+        if self.version is None:
+            return
+        current = self.version()
+        if current != self._version:
+            self.invalidate()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
@@ -0,0 +1,149 @@
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 요청 ID를 주고받는 HTTP 헤더 (nginx/클라이언트가 보내면 그대로 사용, ml-backend로 전달)
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# 요청별 span 기록을 JSON 한 줄씩 남기는 로거 (TRACE_LOG_PATH로 파일에 따로 기록 가능)
+trace_logger = logging.getLogger("trace")
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """
+    요청 하나의 span(이름, 시작 시각, 소요 시간, 부모 span) 기록
+
+    span은 여러 스레드(ChatPipeline 워커)에서 동시에 추가될 수 있음
+    """
+
+    def __init__(self, request_id: str, name: str):
+        self.request_id = request_id
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict[str, Any]]:
+        """
+        블록 실행 시간을 span으로 기록 (yield한 딕셔너리에 속성을 추가할 수 있음)
+        """
+        with self._lock:
+            span_id = len(self.spans)
+            record = {"id": span_id, "parent": _current_span.get(), "name": name,
+                      "start_ms": (time.perf_counter() - self._start) * 1000.0, "duration_ms": None}
+            self.spans.append(record)
+        if attributes:
+            record["attributes"] = dict(attributes)
+        token = _current_span.set(span_id)
+        start = time.perf_counter()
+        try:
+            yield record.setdefault("attributes", {})
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["duration_ms"] = (time.perf_counter() - start) * 1000.0
+            _current_span.reset(token)
+            if not record["attributes"]:
+                del record["attributes"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [
+                {key: round(value, 2) if key.endswith("_ms") and value is not None else value
+                 for key, value in span.items()}
+                for span in self.spans
+            ]
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self._start) * 1000.0, 2),
+            "spans": spans,
+        }
+
+    def log(self):
+        """
+        span 기록을 JSON 한 줄로 남김 (로컬 수집기가 줄 단위로 집계)
+        """
+        trace_logger.info(json.dumps({"service": "chatbot-backend", **self.to_dict()}, ensure_ascii=False))
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """
+    전달받은 요청 ID가 있으면 그대로, 없으면 새로 생성
+    """
+    if incoming and len(incoming) <= 128 and incoming.isprintable():
+        return incoming
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def trace_request(request_id: str, name: str) -> Iterator[Trace]:
+    """
+    블록 안에서 span()/current_request_id()가 이 요청의 Trace를 사용하도록 설정하고,
+    블록이 끝나면 span 기록을 로그로 남김
+    """
+    trace = Trace(request_id, name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.log()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Dict[str, Any]]:
+    """
+    현재 요청의 Trace에 span 기록 (Trace가 없으면 아무것도 기록하지 않음)
+
+        with span("chroma.search", k=k) as attrs:
+            docs = ...
+            attrs["results"] = len(docs)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield {}
+        return
+    with trace.span(name, **attributes) as attrs:
+        yield attrs
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else None
+
+
+def bind_context(fn: Callable) -> Callable:
+    """
+    현재 Trace/부모 span을 유지한 채 다른 스레드에서 실행할 함수로 감쌈 (executor.submit용)
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def configure_trace_log(path: Optional[str]):
+    """
+    span 기록을 별도 파일에 JSON 한 줄씩 기록 (없으면 일반 로그에만 출력)
+    """
+    if not path:
+        return
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.addHandler(handler)
+    trace_logger.propagate = False
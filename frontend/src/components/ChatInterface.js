@@ -1,11 +1,12 @@
 import React, { useState, useRef, useEffect } from 'react';
 import MessageBubble from './MessageBubble';
 import InputArea from './InputArea';
-import { sendMessage } from '../services/api';
+import { sendMessage, streamMessage } from '../services/api';
 import './ChatInterface.css';
 
 const ChatInterface = ({ messages, setMessages, loading, setLoading }) => {
   const [input, setInput] = useState('');
+  const [streamingId, setStreamingId] = useState(null);
   const messagesEndRef = useRef(null);
 
   // 메시지 자동 스크롤
@@ -34,50 +35,92 @@ const ChatInterface = ({ messages, setMessages, loading, setLoading }) => {
     setInput('');
     setLoading(true);
     
+    // 백엔드 API에 보낼 대화 이력
+    const chatHistory = messages.map(msg => ({
+      type: msg.type,
+      content: msg.content
+    }));
+    const assistantId = (Date.now() + 1).toString();
+
+    // 스트리밍 중인 응답 메시지 갱신
+    const updateAssistant = (update) => {
+      setMessages(prevMessages => prevMessages.map(msg => (
+        msg.id === assistantId ? { ...msg, ...update(msg) } : msg
+      )));
+    };
+
     try {
-      // 백엔드 API에 메시지 전송
-      const chatHistory = messages.map(msg => ({
-        type: msg.type,
-        content: msg.content
-      }));
-      
-      const response = await sendMessage(input, chatHistory);
-      
-      // 응답 추가
-      const assistantMessage = {
-        id: (Date.now() + 1).toString(),
-        type: 'assistant',
-        content: response.response,
-        prediction: response.prediction
-      };
-      
-      setMessages(prevMessages => [...prevMessages, assistantMessage]);
-    } catch (error) {
-      console.error('에러 발생:', error);
-      
-      // 에러 메시지 추가
-      const errorMessage = {
-        id: (Date.now() + 1).toString(),
+      if (!window.ReadableStream || !window.TextDecoder) {
+        throw new Error('streaming unsupported');
+      }
+
+      // 응답 자리 표시 메시지를 추가하고 토큰이 도착하는 대로 채움
+      setMessages(prevMessages => [...prevMessages, {
+        id: assistantId,
         type: 'assistant',
-        content: '죄송합니다. 요청을 처리하는 중 오류가 발생했습니다. 잠시 후 다시 시도해 주세요.'
-      };
-      
-      setMessages(prevMessages => [...prevMessages, errorMessage]);
+        content: ''
+      }]);
+      setStreamingId(assistantId);
+
+      await streamMessage(input, chatHistory, {
+        onToken: (text) => updateAssistant(msg => ({ content: msg.content + text })),
+        onPrediction: (prediction, text) => updateAssistant(msg => ({ content: msg.content + text, prediction })),
+        onReferences: (references, text) => updateAssistant(msg => ({ content: msg.content + text, references })),
+        onError: (error, text) => updateAssistant(msg => ({ content: msg.content + text })),
+        onDone: (response) => {
+          if (response) {
+            updateAssistant(() => ({ content: response }));
+          }
+        }
+      });
+    } catch (streamError) {
+      console.error('스트리밍 오류, 일반 요청으로 재시도:', streamError);
+      setMessages(prevMessages => prevMessages.filter(msg => msg.id !== assistantId));
+
+      try {
+        const response = await sendMessage(input, chatHistory);
+
+        // 응답 추가
+        const assistantMessage = {
+          id: assistantId,
+          type: 'assistant',
+          content: response.response,
+          prediction: response.prediction
+        };
+
+        setMessages(prevMessages => [...prevMessages, assistantMessage]);
+      } catch (error) {
+        console.error('에러 발생:', error);
+
+        // 에러 메시지 추가
+        const errorMessage = {
+          id: assistantId,
+          type: 'assistant',
+          content: '죄송합니다. 요청을 처리하는 중 오류가 발생했습니다. 잠시 후 다시 시도해 주세요.'
+        };
+
+        setMessages(prevMessages => [...prevMessages, errorMessage]);
+      }
     } finally {
+      setStreamingId(null);
       setLoading(false);
     }
   };
 
+  // 첫 토큰이 도착하면 로딩 표시를 숨김
+  const streamingMessage = messages.find(msg => msg.id === streamingId);
+  const showLoading = loading && !(streamingMessage && streamingMessage.content);
+
   return (
     <div className="chat-interface">
       <div className="messages-container">
-        {messages.map(message => (
+        {messages.filter(message => message.type === 'user' || message.content).map(message => (
           <MessageBubble 
             key={message.id} 
             message={message} 
           />
         ))}
-        {loading && (
+        {showLoading && (
           <div className="loading-indicator">
             <div className="loading-dot"></div>
             <div className="loading-dot"></div>
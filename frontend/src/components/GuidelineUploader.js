@@ -1,6 +1,21 @@
 import React, { useState, useEffect } from 'react';
 import './GuidelineUploader.css';
-import { uploadGuideline, getGuidelines, deleteGuideline } from '../services/api';
+import { uploadGuideline, getGuidelines, deleteGuideline, getIngestionJob } from '../services/api';
+
+// 인제스트 작업 상태 조회 간격 (ms)
+const JOB_POLL_INTERVAL = 1000;
+
+// 인제스트 단계별 표시 문구
+const STAGE_LABELS = {
+  queued: '처리 대기 중',
+  parsing: '문서 분석 중',
+  chunking: '문서 분할 중',
+  embedding: '임베딩 중',
+  done: '완료',
+  failed: '실패'
+};
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
 
 const GuidelineUploader = () => {
   const [file, setFile] = useState(null);
@@ -9,6 +24,7 @@ const GuidelineUploader = () => {
   const [error, setError] = useState('');
   const [successMessage, setSuccessMessage] = useState('');
   const [isOpen, setIsOpen] = useState(false);
+  const [job, setJob] = useState(null);
 
   // 지침 목록 로드
   useEffect(() => {
@@ -56,9 +72,22 @@ const GuidelineUploader = () => {
       const formData = new FormData();
       formData.append('file', file);
 
-      await uploadGuideline(formData);
-      
-      setSuccessMessage('진료 지침이 성공적으로 업로드되었습니다.');
+      const response = await uploadGuideline(formData);
+      setJob(response.job);
+
+      // 서버에서 문서 분석/임베딩이 끝날 때까지 작업 상태 확인
+      let status = response.job;
+      while (status && status.stage !== 'done' && status.stage !== 'failed') {
+        await sleep(JOB_POLL_INTERVAL);
+        status = await getIngestionJob(response.job_id);
+        setJob(status);
+      }
+
+      if (status && status.stage === 'failed') {
+        setError(status.error || '진료 지침 처리 중 오류가 발생했습니다.');
+      } else {
+        setSuccessMessage('진료 지침이 성공적으로 업로드되었습니다.');
+      }
       setFile(null);
       // 파일 입력 초기화
       document.getElementById('guideline-file').value = '';
@@ -68,6 +97,7 @@ const GuidelineUploader = () => {
       console.error('업로드 오류:', error);
       setError('파일 업로드 중 오류가 발생했습니다.');
     } finally {
+      setJob(null);
       setUploading(false);
     }
   };
@@ -96,6 +126,18 @@ const GuidelineUploader = () => {
     else return (bytes / 1048576).toFixed(1) + ' MB';
   };
 
+  // 인제스트 진행 상황 문구 (예: "문서 분석 중 (12/40 페이지)")
+  const formatJobProgress = (status) => {
+    const label = STAGE_LABELS[status.stage] || status.stage;
+    if (status.stage === 'parsing' && status.pages_total) {
+      return `${label} (${status.pages_parsed}/${status.pages_total} 페이지)`;
+    }
+    if (status.stage === 'embedding' && status.chunks_total) {
+      return `${label} (${status.chunks_embedded}/${status.chunks_total} 청크)`;
+    }
+    return label;
+  };
+
   const togglePanel = () => {
     setIsOpen(!isOpen);
   };
@@ -126,6 +168,7 @@ const GuidelineUploader = () => {
             </button>
           </div>
           
+          {job && <p className="job-progress">{formatJobProgress(job)}</p>}
           {error && <p className="error-message">{error}</p>}
           {successMessage && <p className="success-message">{successMessage}</p>}
           
@@ -47,6 +47,97 @@ export const sendMessage = async (message, history) => {
     }
 };
 
+/**
+ * Server-Sent Events 응답 본문에서 이벤트를 하나씩 파싱
+ * @param {string} chunk - 빈 줄로 구분된 이벤트 한 개
+ * @returns {Object|null} - { event, data }
+ */
+const parseSseEvent = (chunk) => {
+    let event = 'message';
+    const dataLines = [];
+    chunk.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            dataLines.push(line.slice(5).trim());
+        }
+    });
+    if (dataLines.length === 0) {
+        return null;
+    }
+    return { event, data: JSON.parse(dataLines.join('\n')) };
+};
+
+/**
+ * 사용자 메시지를 서버에 전송하고 응답을 스트리밍으로 수신
+ * (LLM 토큰 -> TPN 예측 -> 참고 문서 순서로 콜백 호출)
+ * @param {string} message - 사용자 메시지
+ * @param {Array} history - 대화 이력
+ * @param {Object} handlers - onToken, onPrediction, onReferences, onError, onDone 콜백
+ * @returns {Promise} - 스트림이 끝나면 완료
+ */
+export const streamMessage = async (message, history, handlers = {}) => {
+    const { onToken, onPrediction, onReferences, onError, onDone } = handlers;
+
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+        },
+        body: JSON.stringify({ message, history }),
+    });
+
+    if (!response.ok || !response.body) {
+        throw new Error('서버 오류가 발생했습니다.');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder('utf-8');
+    let buffer = '';
+
+    const dispatch = ({ event, data }) => {
+        switch (event) {
+            case 'token':
+                onToken && onToken(data.text);
+                break;
+            case 'prediction':
+                onPrediction && onPrediction(data.prediction, data.text);
+                break;
+            case 'references':
+                onReferences && onReferences(data.references, data.text);
+                break;
+            case 'error':
+                onError && onError(data.error, data.text);
+                break;
+            case 'done':
+                onDone && onDone(data.response);
+                break;
+            default:
+                break;
+        }
+    };
+
+    // eslint-disable-next-line no-constant-condition
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+            const parsed = parseSseEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            if (parsed) {
+                dispatch(parsed);
+            }
+            boundary = buffer.indexOf('\n\n');
+        }
+    }
+};
+
 /**
  * 서버 상태 확인
  * @returns {Promise} - 서버 상태
@@ -94,6 +185,21 @@ export const uploadGuideline = async (formData) => {
     }
 };
 
+/**
+ * 진료 지침 인제스트 작업 상태 조회
+ * @param {string} jobId - 업로드 응답의 작업 ID
+ * @returns {Promise} - 작업 상태 (stage, pages_parsed, pages_total, chunks_embedded, chunks_total, error)
+ */
+export const getIngestionJob = async (jobId) => {
+    try {
+        const response = await apiClient.get(`/guidelines/jobs/${jobId}`);
+        return response.data;
+    } catch (error) {
+        console.error('진료 지침 처리 상태 조회 오류:', error);
+        throw new Error('진료 지침 처리 상태를 확인할 수 없습니다.');
+    }
+};
+
 /**
  * 진료 지침 삭제
  * @param {string} filename - 삭제할 파일 이름
@@ -0,0 +1,252 @@
+"""
+과거 코호트 재평가용 오프라인 TPN 일괄 예측 CLI
+
+CSV 또는 Excel(.xlsx) 파일을 고정 크기 청크로 스트리밍하며 평가하고, 입력 열 뒤에
+예측 결과 4개 열을 붙여 CSV 또는 .xlsx로 기록한다. 파일 전체를 메모리에 올리지 않는다.
+
+    python batch_score.py cohort.xlsx scored.csv --chunk-size 5000 --workers 4
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from model_registry import load_bundle
+
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_COLUMNS = ["TPNCALCULATEDGLUCOSE", "TPNCALCULATEDPROTEIN", "TPNCALCULATEDLIPID", "TPNCALCULATEDCALORI"]
+
+# 워커 프로세스별 평가 함수 (initializer에서 설정)
+_scorer = None
+
+
+def load_scorer(model_path: str, scaler_path: str, artifact_dir: Optional[str], engine: str):
+    """
+    평가 함수와 입력 feature 이름 로드
+
+    Args:
+        model_path: pickle된 RandomForestRegressor 경로
+        scaler_path: pickle된 StandardScaler 경로
+        artifact_dir: 메모리 매핑 아티팩트 디렉토리 (지정하면 pickle 대신 사용)
+        engine: "sklearn", "compiled" 또는 "folded"
+
+    Returns:
+        (입력 행렬을 받아 예측 행렬을 반환하는 함수, feature 이름 리스트 또는 None) 튜플
+    """
+    bundle = load_bundle(engine, model_path=model_path, scaler_path=scaler_path, artifact_dir=artifact_dir)
+    feature_names = list(getattr(bundle.scaler, "feature_names_in_", [])) or None
+    return bundle.predict, feature_names
+
+
+def _init_worker(model_path, scaler_path, artifact_dir, engine):
+    global _scorer
+    _scorer, _ = load_scorer(model_path, scaler_path, artifact_dir, engine)
+
+
+def score_chunk(matrix: np.ndarray) -> np.ndarray:
+    """
+    청크 평가 (값이 비어 있는 행은 NaN으로 채움)
+
+    Args:
+        matrix: 입력 행렬, shape (n_rows, n_features)
+
+    Returns:
+        예측값 행렬, shape (n_rows, len(OUTPUT_COLUMNS))
+    """
+    predictions = np.full((len(matrix), len(OUTPUT_COLUMNS)), np.nan)
+    valid = np.isfinite(matrix).all(axis=1)
+    if valid.any():
+        predictions[valid] = _scorer(matrix[valid])
+    return predictions
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    CSV 또는 .xlsx 파일을 청크 단위로 읽음
+
+    Args:
+        path: 입력 파일 경로
+        chunk_size: 청크당 행 수
+
+    Yields:
+        청크 DataFrame
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+
+    if extension in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        # read_only 모드는 행을 순차적으로 읽어 전체 시트를 메모리에 올리지 않음
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(name) for name in next(rows)]
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunk_size:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header)
+        finally:
+            workbook.close()
+        return
+
+    raise ValueError(f"Unsupported input file type: {extension}")
+
+
+class ChunkWriter:
+    """
+    평가된 청크를 CSV 또는 .xlsx 파일에 순차적으로 기록
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.extension = os.path.splitext(path)[1].lower()
+        self._header_written = False
+
+        if self.extension == ".csv":
+            self._file = open(path, "w", newline="", encoding="utf-8")
+        elif self.extension == ".xlsx":
+            from openpyxl import Workbook
+
+            # write_only 모드는 행을 임시 파일로 흘려보내 메모리 사용량이 일정함
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet()
+        else:
+            raise ValueError(f"Unsupported output file type: {self.extension}")
+
+    def write(self, chunk: pd.DataFrame):
+        if self.extension == ".csv":
+            chunk.to_csv(self._file, header=not self._header_written, index=False)
+            self._header_written = True
+            return
+
+        if not self._header_written:
+            self._sheet.append(list(chunk.columns))
+            self._header_written = True
+        for row in chunk.itertuples(index=False, name=None):
+            self._sheet.append([None if isinstance(value, float) and np.isnan(value) else value for value in row])
+
+    def close(self):
+        if self.extension == ".csv":
+            self._file.close()
+        else:
+            self._workbook.save(self.path)
+
+
+def score_file(input_path: str, output_path: str, scorer: Callable, feature_columns: Sequence[str],
+               chunk_size: int = 10000, executor: Optional[ProcessPoolExecutor] = None,
+               max_pending_chunks: int = 1) -> int:
+    """
+    입력 파일을 청크 단위로 평가하여 출력 파일에 기록
+
+    Args:
+        input_path: 입력 CSV/.xlsx 경로
+        output_path: 출력 CSV/.xlsx 경로
+        scorer: 단일 프로세스 평가에 사용할 함수 (executor가 없을 때)
+        feature_columns: 모델 입력 열 이름 (모델 feature 순서)
+        chunk_size: 청크당 행 수
+        executor: 워커 프로세스 풀 (지정하면 청크를 병렬 평가)
+        max_pending_chunks: 동시에 처리 중일 수 있는 최대 청크 수
+
+    Returns:
+        처리한 행 수
+    """
+    global _scorer
+    _scorer = scorer
+
+    writer = ChunkWriter(output_path)
+    pending = []
+    total_rows = 0
+
+    def flush_one():
+        chunk, future = pending.pop(0)
+        predictions = future.result() if executor is not None else future
+        for column, values in zip(OUTPUT_COLUMNS, predictions.T):
+            chunk[column] = values
+        writer.write(chunk)
+
+    try:
+        for chunk in read_chunks(input_path, chunk_size):
+            missing = [column for column in feature_columns if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"Input is missing feature columns: {missing}")
+
+            matrix = chunk[list(feature_columns)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+            total_rows += len(chunk)
+
+            if executor is not None:
+                pending.append((chunk, executor.submit(score_chunk, matrix)))
+                # 출력 순서를 유지하면서 메모리에 올라간 청크 수를 제한
+                while len(pending) > max_pending_chunks:
+                    flush_one()
+            else:
+                pending.append((chunk, score_chunk(matrix)))
+                flush_one()
+
+        while pending:
+            flush_one()
+    finally:
+        writer.close()
+
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV/XLSX cohort with the TPN model in fixed-size chunks")
+    parser.add_argument("input", help="input .csv or .xlsx file")
+    parser.add_argument("output", help="output .csv or .xlsx file")
+    parser.add_argument("--model", default="/app/model.pkl", help="pickled RandomForestRegressor")
+    parser.add_argument("--scaler", default="/app/scaler.pkl", help="pickled StandardScaler")
+    parser.add_argument("--artifact", default=os.getenv("MODEL_ARTIFACT_DIR"), help="memory-mappable model artifact directory")
+    # 큰 청크에서는 sklearn의 Cython 트리 탐색이 벡터화된 CompiledForest보다 빠름
+    parser.add_argument("--engine", default="sklearn", choices=["sklearn", "compiled", "folded"], help="inference engine")
+    parser.add_argument("--columns", nargs=5, metavar="COLUMN",
+                        help="input columns for glucose, albumin, BUN, phosphorus, total protein "
+                             "(defaults to the scaler's feature names)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    scorer, feature_names = load_scorer(args.model, args.scaler, args.artifact, args.engine)
+    feature_columns = args.columns or feature_names
+    if not feature_columns:
+        parser.error("--columns is required when the scaler has no feature names")
+
+    start = time.perf_counter()
+    executor = None
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(args.model, args.scaler, args.artifact, args.engine)
+        )
+    try:
+        total_rows = score_file(args.input, args.output, scorer, feature_columns,
+                                chunk_size=args.chunk_size, executor=executor,
+                                max_pending_chunks=args.workers * 2)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start
+
+    print(f"Scored {total_rows} rows in {elapsed:.2f}s ({total_rows / elapsed if elapsed else 0:.0f} rows/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
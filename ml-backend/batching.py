@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Any, List, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# 배치 크기 분포 집계용 구간 (행 수 상한)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class PredictionBatcher:
+    """
+    동시에 들어온 /predict 요청의 입력 행을 짧은 시간 동안 모아 한 번에 평가하는 coalescer
+
+    첫 요청이 도착한 뒤 `max_wait_ms`가 지나거나 모인 행이 `max_batch_rows`에
+    도달하면, 모든 행을 하나의 행렬로 쌓아 `score_fn`을 한 번만 호출하고 결과를
+    요청별로 나누어 돌려준다. 평가가 진행되는 동안에도 다음 배치를 모으며,
+    동시에 평가 중인 배치 수는 `max_concurrent_batches`로 제한한다.
+    """
+
+    def __init__(self, score_fn: Callable[[np.ndarray], Awaitable[np.ndarray]], max_batch_rows: int = 64,
+                 max_wait_ms: float = 2.0, max_concurrent_batches: int = 1):
+        """
+        PredictionBatcher 초기화
+
+        Args:
+            score_fn: 2차원 입력 행렬을 받아 예측값 행렬을 반환하는 코루틴 함수
+            max_batch_rows: 한 배치에 모을 최대 행 수
+            max_wait_ms: 첫 요청 이후 다른 요청을 기다리는 최대 시간 (밀리초)
+            max_concurrent_batches: 동시에 평가할 수 있는 최대 배치 수
+        """
+        self.score_fn = score_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_concurrent_batches = max_concurrent_batches
+
+        self._queue = None
+        self._slots = None
+        self._task = None
+        self._inflight = set()
+
+        # 통계
+        self.pending_rows = 0
+        self.total_requests = 0
+        self.total_rows = 0
+        self.total_batches = 0
+        self.max_observed_batch_rows = 0
+        self.batch_size_counts = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.batch_size_counts["+Inf"] = 0
+
+    def _ensure_started(self):
+        """
+        현재 이벤트 루프에서 배치 처리 태스크를 (필요하면) 시작
+        """
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, rows: np.ndarray) -> np.ndarray:
+        """
+        입력 행을 큐에 넣고 해당 행들의 예측 결과를 기다림
+
+        Args:
+            rows: 2차원 입력 행렬, shape (n_rows, n_features)
+
+        Returns:
+            예측값 행렬, shape (n_rows, n_outputs)
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self.pending_rows += len(rows)
+        self._queue.put_nowait((rows, future))
+        return await future
+
+    async def _run(self):
+        """
+        큐에서 요청을 모아 배치 단위로 평가하는 루프
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            n_rows = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+
+            while n_rows < self.max_batch_rows:
+                # 이미 도착한 요청은 기다리지 않고 바로 가져옴
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                batch.append(item)
+                n_rows += len(item[0])
+
+            self.pending_rows -= n_rows
+            await self._slots.acquire()
+            task = loop.create_task(self._score_batch(batch, n_rows))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _score_batch(self, batch: List[Tuple[np.ndarray, asyncio.Future]], n_rows: int):
+        """
+        모은 요청을 하나의 행렬로 평가하고 결과를 각 요청에 분배
+        """
+        try:
+            await self._score_and_distribute(batch, n_rows)
+        finally:
+            self._slots.release()
+
+    async def _score_and_distribute(self, batch: List[Tuple[np.ndarray, asyncio.Future]], n_rows: int):
+        self._record_batch(len(batch), n_rows)
+        try:
+            predictions = await self.score_fn(np.vstack([rows for rows, _ in batch]))
+        except Exception as e:
+            if len(batch) == 1:
+                _set_exception(batch[0][1], e)
+                return
+            # 한 요청의 오류가 같은 배치의 다른 요청에 영향을 주지 않도록 개별 평가
+            logger.warning(f"Batch of {len(batch)} requests failed ({str(e)}), scoring individually")
+            for rows, future in batch:
+                try:
+                    _set_result(future, await self.score_fn(rows))
+                except Exception as single_err:
+                    _set_exception(future, single_err)
+            return
+
+        offset = 0
+        for rows, future in batch:
+            _set_result(future, predictions[offset:offset + len(rows)])
+            offset += len(rows)
+
+    def _record_batch(self, n_requests: int, n_rows: int):
+        """
+        배치 크기 통계 갱신
+        """
+        self.total_requests += n_requests
+        self.total_rows += n_rows
+        self.total_batches += 1
+        self.max_observed_batch_rows = max(self.max_observed_batch_rows, n_rows)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if n_rows <= bucket:
+                self.batch_size_counts[bucket] += 1
+                break
+        else:
+            self.batch_size_counts["+Inf"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        큐 깊이와 배치 크기 통계 조회
+
+        Returns:
+            통계 딕셔너리
+        """
+        return {
+            "max_batch_rows": self.max_batch_rows,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "inflight_batches": len(self._inflight),
+            "queue_depth_requests": self._queue.qsize() if self._queue is not None else 0,
+            "queue_depth_rows": self.pending_rows,
+            "total_requests": self.total_requests,
+            "total_rows": self.total_rows,
+            "total_batches": self.total_batches,
+            "mean_batch_rows": self.total_rows / self.total_batches if self.total_batches else 0.0,
+            "max_observed_batch_rows": self.max_observed_batch_rows,
+            "batch_size_counts": {str(bucket): count for bucket, count in self.batch_size_counts.items()},
+        }
+
+
+def _set_result(future: asyncio.Future, result):
+    # 클라이언트 연결 종료 등으로 이미 취소된 요청은 건너뜀
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exc: Exception):
+    if not future.done():
+        future.set_exception(exc)
@@ -0,0 +1,3 @@
+"""
+ml-backend 성능 측정 스크립트 모음
+"""
@@ -0,0 +1,340 @@
+"""
+/predict 부하 테스트 및 지연 시간 회귀 확인
+
+정상 범위 안의 가상 혈액검사 패널을 만들어 /predict를 동시성/요청당 행 수
+조합별로 호출하고, 처리량과 p50/p95/p99 지연 시간, 최대 RSS를 측정한다.
+
+- inprocess: HTTP 계층 없이 main.predict 핸들러를 직접 호출
+- testclient: FastAPI TestClient로 애플리케이션 전체를 거쳐 호출
+- http: 실행 중인 서버에 HTTP로 호출 (--url)
+
+결과는 JSON으로 저장하고, 이전 결과와 비교하여 지연 시간 회귀를 확인할 수 있다.
+
+    python -m benchmarks.load_test --mode testclient --concurrency 1 8 --batch-size 1 16 --output run.json
+    python -m benchmarks.load_test --mode http --url http://localhost:8000 --compare run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+# chatbot-backend/utils/llm_processor.py 프롬프트의 정상 범위
+# (Glucose mg/dL, Albumin g/dL, BUN mg/dL, Phosphorus mg/dL, Total Protein g/dL)
+PANEL_RANGES = (
+    (70.0, 100.0),
+    (3.4, 5.4),
+    (7.0, 20.0),
+    (2.5, 4.5),
+    (6.0, 8.3),
+)
+
+# 값의 반올림 자릿수 (검사 결과지 표기 기준)
+PANEL_DECIMALS = (0, 1, 0, 1, 1)
+
+# 비교 시 회귀로 판단하는 지표
+COMPARED_PERCENTILES = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def generate_panels(n_rows: int, rng: np.random.Generator) -> List[List[float]]:
+    """
+    정상 범위 안에서 균등 분포로 가상 혈액검사 패널 생성
+
+    Args:
+        n_rows: 생성할 패널 수
+        rng: 난수 생성기
+
+    Returns:
+        [Glucose, Albumin, BUN, Phosphorus, Total Protein] 리스트의 리스트
+    """
+    columns = [
+        np.round(rng.uniform(low, high, size=n_rows), decimals)
+        for (low, high), decimals in zip(PANEL_RANGES, PANEL_DECIMALS)
+    ]
+    return np.column_stack(columns).tolist()
+
+
+def peak_rss_bytes() -> int:
+    # Linux의 ru_maxrss 단위는 KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def summarize(latencies: List[float], elapsed: float, batch_size: int, errors: int) -> Dict[str, Any]:
+    """
+    요청별 지연 시간(초)을 처리량/백분위 요약으로 변환
+    """
+    values = np.asarray(latencies) * 1000.0
+    n_requests = len(latencies)
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "requests_per_s": n_requests / elapsed if elapsed else 0.0,
+        "rows_per_s": n_requests * batch_size / elapsed if elapsed else 0.0,
+        "mean_ms": float(values.mean()) if n_requests else None,
+        "p50_ms": float(np.percentile(values, 50)) if n_requests else None,
+        "p95_ms": float(np.percentile(values, 95)) if n_requests else None,
+        "p99_ms": float(np.percentile(values, 99)) if n_requests else None,
+        "max_ms": float(values.max()) if n_requests else None,
+    }
+
+
+async def run_async(send: Callable, payloads: List[dict], concurrency: int):
+    """
+    코루틴 `send(payload)`를 최대 `concurrency`개 동시에 실행하며 지연 시간 측정
+    """
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < len(payloads):
+            payload = payloads[next_index]
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                await send(payload)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start, errors
+
+
+def run_threads(send: Callable, payloads: List[dict], concurrency: int):
+    """
+    동기 함수 `send(payload)`를 `concurrency`개 스레드에서 실행하며 지연 시간 측정
+    """
+    def timed(payload):
+        start = time.perf_counter()
+        try:
+            send(payload)
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, payloads))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency in results if latency is not None]
+    return latencies, elapsed, len(results) - len(latencies)
+
+
+class InProcessTarget:
+    """
+    HTTP 계층 없이 main.predict 핸들러를 이벤트 루프에서 직접 호출
+    """
+
+    name = "inprocess"
+
+    def __init__(self):
+        import main
+        self.main = main
+        self._loop = asyncio.new_event_loop()
+        # startup 이벤트(워커 풀 warmup 등)를 수동으로 실행
+        for handler in main.app.router.on_startup:
+            result = handler()
+            if asyncio.iscoroutine(result):
+                self._loop.run_until_complete(result)
+
+    def run(self, payloads: List[dict], concurrency: int):
+        async def send(payload):
+            # 직접 호출하면 FastAPI가 Header 기본값을 채워 주지 않으므로 요청 ID 없음을 명시
+            await self.main.predict(self.main.PredictionInput(**payload), x_request_id=None)
+        return self._loop.run_until_complete(run_async(send, payloads, concurrency))
+
+    def close(self):
+        for handler in self.main.app.router.on_shutdown:
+            result = handler()
+            if asyncio.iscoroutine(result):
+                self._loop.run_until_complete(result)
+        self._loop.close()
+
+
+class TestClientTarget:
+    """
+    FastAPI TestClient로 라우팅/검증/직렬화를 포함한 전체 경로 호출
+    """
+
+    name = "testclient"
+
+    def __init__(self):
+        from fastapi.testclient import TestClient
+        import main
+        self.client = TestClient(main.app)
+        self.client.__enter__()
+
+    def run(self, payloads: List[dict], concurrency: int):
+        def send(payload):
+            self.client.post("/predict", json=payload).raise_for_status()
+        return run_threads(send, payloads, concurrency)
+
+    def close(self):
+        self.client.__exit__(None, None, None)
+
+
+class HttpTarget:
+    """
+    실행 중인 서버에 HTTP로 호출 (httpx 필요)
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float):
+        import httpx
+        self.httpx = httpx
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def run(self, payloads: List[dict], concurrency: int):
+        async def main():
+            limits = self.httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with self.httpx.AsyncClient(base_url=self.url, timeout=self.timeout, limits=limits) as client:
+                async def send(payload):
+                    response = await client.post("/predict", json=payload)
+                    response.raise_for_status()
+                return await run_async(send, payloads, concurrency)
+        return asyncio.run(main())
+
+    def server_peak_rss(self) -> Optional[float]:
+        """
+        서버 /metrics의 process_peak_resident_memory_bytes (없으면 None)
+        """
+        try:
+            text = self.httpx.get(f"{self.url}/metrics", timeout=self.timeout).text
+        except self.httpx.HTTPError:
+            return None
+        for line in text.splitlines():
+            if line.startswith("process_peak_resident_memory_bytes "):
+                return float(line.split()[1])
+        return None
+
+    def close(self):
+        pass
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    같은 (동시성, 행 수) 조합의 백분위 지연 시간이 기준 결과보다 `tolerance` 비율 이상 느려졌는지 확인
+
+    Returns:
+        회귀 설명 문자열 리스트 (없으면 빈 리스트)
+    """
+    baseline_cases = {(case["concurrency"], case["batch_size"]): case for case in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        previous = baseline_cases.get((case["concurrency"], case["batch_size"]))
+        if previous is None:
+            continue
+        for metric in COMPARED_PERCENTILES:
+            if previous.get(metric) and case.get(metric) and case[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"concurrency={case['concurrency']} batch_size={case['batch_size']} {metric}: "
+                    f"{previous[metric]:.2f}ms -> {case[metric]:.2f}ms"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /predict and record throughput, latency percentiles and RSS")
+    parser.add_argument("--mode", choices=["inprocess", "testclient", "http"], default="testclient", help="how to drive /predict")
+    parser.add_argument("--url", default="http://localhost:8000", help="server URL for --mode http")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="concurrent clients")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 16], help="rows per request")
+    parser.add_argument("--requests", type=int, default=500, help="requests per case")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests before each case")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for generated panels")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON results to check for latency regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before failing --compare")
+    args = parser.parse_args()
+
+    if args.mode == "inprocess":
+        target = InProcessTarget()
+    elif args.mode == "testclient":
+        target = TestClientTarget()
+    else:
+        target = HttpTarget(args.url, args.timeout)
+
+    rng = np.random.default_rng(args.seed)
+    cases = []
+    try:
+        for batch_size in args.batch_size:
+            for concurrency in args.concurrency:
+                warmup = [{"data": generate_panels(batch_size, rng)} for _ in range(args.warmup)]
+                payloads = [{"data": generate_panels(batch_size, rng)} for _ in range(args.requests)]
+                target.run(warmup, concurrency)
+                latencies, elapsed, errors = target.run(payloads, concurrency)
+
+                case = {"concurrency": concurrency, "batch_size": batch_size,
+                        **summarize(latencies, elapsed, batch_size, errors)}
+                cases.append(case)
+                print(f"concurrency={concurrency:<3} batch_size={batch_size:<5} "
+                      f"{case['requests_per_s']:>8.1f} req/s {case['rows_per_s']:>9.1f} rows/s  "
+                      f"p50={case['p50_ms'] or 0:.2f}ms p95={case['p95_ms'] or 0:.2f}ms p99={case['p99_ms'] or 0:.2f}ms "
+                      f"errors={errors}")
+    finally:
+        target.close()
+
+    results = {
+        "mode": args.mode,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        # 서비스 동작에 영향을 주는 환경 변수
+        "environment": {name: os.environ[name] for name in sorted(os.environ)
+                        if name in ("INFERENCE_ENGINE", "SCORING_WORKERS", "PREDICT_BATCHING", "BATCH_MAX_ROWS",
+                                    "BATCH_MAX_WAIT_MS", "PREDICTION_CACHE_SIZE", "MODEL_ARTIFACT_DIR")},
+        "requests_per_case": args.requests,
+        "seed": args.seed,
+        "client_peak_rss_bytes": peak_rss_bytes(),
+        "server_peak_rss_bytes": target.server_peak_rss() if args.mode == "http" else peak_rss_bytes(),
+        "cases": cases,
+    }
+    print(f"peak RSS: {results['server_peak_rss_bytes'] or 0:.0f} bytes (server), {results['client_peak_rss_bytes']} bytes (client)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Latency regressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No latency regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
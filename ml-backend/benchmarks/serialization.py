@@ -0,0 +1,95 @@
+"""
+/predict 요청/응답 직렬화 오버헤드 측정
+
+모델 평가는 제외하고, 요청 본문을 입력 행렬로 바꾸고 예측 행렬을 응답 본문으로
+바꾸는 비용만 경로별로 비교한다.
+
+    python -m benchmarks.serialization --rows 1 64 1024
+"""
+import argparse
+import io
+import json
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import binary_protocol
+
+
+OUTPUT_COLUMNS = ["TPNCALCULATEDGLUCOSE", "TPNCALCULATEDPROTEIN", "TPNCALCULATEDLIPID", "TPNCALCULATEDCALORI"]
+
+
+def legacy_json(body: bytes, predictions: np.ndarray) -> bytes:
+    # 기존 경로: JSON -> DataFrame -> (평가) -> DataFrame -> to_dict
+    data = json.loads(body)["data"]
+    df = pd.DataFrame(data)
+    np.asarray(df, dtype=np.float64)
+    result_df = pd.DataFrame(predictions, columns=OUTPUT_COLUMNS)
+    return json.dumps(result_df.to_dict(orient="records")).encode()
+
+
+def numpy_json(body: bytes, predictions: np.ndarray) -> bytes:
+    # 현재 JSON 경로: JSON -> ndarray -> (평가) -> list of dict
+    data = json.loads(body)["data"]
+    np.asarray(data, dtype=np.float64)
+    return json.dumps([dict(zip(OUTPUT_COLUMNS, row)) for row in predictions.tolist()]).encode()
+
+
+def raw_binary(body: bytes, predictions: np.ndarray, shape: str) -> bytes:
+    headers = {binary_protocol.SHAPE_HEADER: shape, binary_protocol.DTYPE_HEADER: "float64"}
+    _, dtype = binary_protocol.decode_request(body, binary_protocol.RAW_CONTENT_TYPE, headers)
+    content, _ = binary_protocol.encode_response(predictions, binary_protocol.RAW_CONTENT_TYPE, dtype)
+    return content
+
+
+def npy_binary(body: bytes, predictions: np.ndarray) -> bytes:
+    _, dtype = binary_protocol.decode_request(body, binary_protocol.NPY_CONTENT_TYPE, {})
+    content, _ = binary_protocol.encode_response(predictions, binary_protocol.NPY_CONTENT_TYPE, dtype)
+    return content
+
+
+def run(rows: int, repeat: int) -> dict:
+    """
+    주어진 행 수에 대해 경로별 요청당 평균 시간(마이크로초) 측정
+    """
+    rng = np.random.default_rng(0)
+    matrix = rng.uniform(0, 100, size=(rows, 5))
+    predictions = rng.uniform(0, 100, size=(rows, 4))
+
+    json_body = json.dumps({"data": matrix.tolist()}).encode()
+    raw_body = matrix.astype("<f8").tobytes()
+    npy_buffer = io.BytesIO()
+    np.save(npy_buffer, matrix)
+    npy_body = npy_buffer.getvalue()
+    shape = f"{rows},5"
+
+    cases = {
+        "legacy_json": lambda: legacy_json(json_body, predictions),
+        "numpy_json": lambda: numpy_json(json_body, predictions),
+        "raw_binary": lambda: raw_binary(raw_body, predictions, shape),
+        "npy_binary": lambda: npy_binary(npy_body, predictions),
+    }
+
+    results = {}
+    for name, fn in cases.items():
+        number = max(1, repeat // rows)
+        best = min(timeit.repeat(fn, number=number, repeat=5))
+        results[name] = best / number * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /predict serialization overhead per request")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 64, 1024], help="rows per request")
+    parser.add_argument("--repeat", type=int, default=2000, help="approximate number of rows per timing run")
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'legacy_json':>12} {'numpy_json':>12} {'raw_binary':>12} {'npy_binary':>12}  (us/request)")
+    for rows in args.rows:
+        results = run(rows, args.repeat)
+        print(f"{rows:>6} " + " ".join(f"{results[name]:>12.1f}" for name in ("legacy_json", "numpy_json", "raw_binary", "npy_binary")))
+
+
+if __name__ == "__main__":
+    main()
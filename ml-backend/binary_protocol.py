@@ -0,0 +1,93 @@
+import io
+from typing import Dict, Mapping, Tuple
+
+import numpy as np
+
+
+# 지원하는 content type
+RAW_CONTENT_TYPE = "application/octet-stream"
+NPY_CONTENT_TYPE = "application/x-npy"
+
+# raw 버퍼 헤더
+SHAPE_HEADER = "X-Shape"
+DTYPE_HEADER = "X-Dtype"
+
+# raw 버퍼는 항상 little-endian
+BINARY_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float64": np.dtype("<f8"),
+}
+
+
+def decode_request(body: bytes, content_type: str, headers: Mapping[str, str]) -> Tuple[np.ndarray, np.dtype]:
+    """
+    바이너리 요청 본문을 입력 행렬로 변환
+
+    - application/x-npy: `.npy` 형식 (shape/dtype은 파일 헤더에 포함)
+    - application/octet-stream: little-endian raw 버퍼, `X-Shape: <rows>,<cols>` 와
+      `X-Dtype: float32|float64` (기본값 float64) 헤더 필요
+
+    Args:
+        body: 요청 본문
+        content_type: 요청 Content-Type (파라미터 제외)
+        headers: 요청 헤더
+
+    Returns:
+        (입력 행렬, 응답에 사용할 dtype) 튜플
+    """
+    if content_type == NPY_CONTENT_TYPE:
+        matrix = np.load(io.BytesIO(body), allow_pickle=False)
+        dtype_name = matrix.dtype.name
+        if dtype_name not in BINARY_DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype_name} (expected one of {', '.join(BINARY_DTYPES)})")
+        return matrix, BINARY_DTYPES[dtype_name]
+
+    if content_type != RAW_CONTENT_TYPE:
+        raise ValueError(f"Unsupported content type: {content_type}")
+
+    dtype_name = headers.get(DTYPE_HEADER, "float64").strip().lower()
+    if dtype_name not in BINARY_DTYPES:
+        raise ValueError(f"Unsupported dtype: {dtype_name} (expected one of {', '.join(BINARY_DTYPES)})")
+    dtype = BINARY_DTYPES[dtype_name]
+
+    shape_value = headers.get(SHAPE_HEADER)
+    if not shape_value:
+        raise ValueError(f"Missing {SHAPE_HEADER} header")
+    try:
+        shape = tuple(int(dim) for dim in shape_value.split(","))
+    except ValueError:
+        raise ValueError(f"Invalid {SHAPE_HEADER} header: {shape_value}")
+    if len(shape) != 2:
+        raise ValueError(f"{SHAPE_HEADER} must have 2 dimensions, got {shape_value}")
+
+    expected_size = shape[0] * shape[1] * dtype.itemsize
+    if len(body) != expected_size:
+        raise ValueError(f"Body has {len(body)} bytes, expected {expected_size} for shape {shape} and dtype {dtype_name}")
+
+    return np.frombuffer(body, dtype=dtype).reshape(shape), dtype
+
+
+def encode_response(predictions: np.ndarray, content_type: str, dtype: np.dtype) -> Tuple[bytes, Dict[str, str]]:
+    """
+    예측 결과를 요청과 같은 바이너리 형식으로 변환
+
+    Args:
+        predictions: 예측값 행렬, shape (n_rows, n_outputs)
+        content_type: 요청 Content-Type
+        dtype: 응답 dtype
+
+    Returns:
+        (응답 본문, 응답 헤더) 튜플
+    """
+    output = np.ascontiguousarray(predictions, dtype=dtype)
+
+    if content_type == NPY_CONTENT_TYPE:
+        buffer = io.BytesIO()
+        np.save(buffer, output, allow_pickle=False)
+        return buffer.getvalue(), {"Content-Type": NPY_CONTENT_TYPE}
+
+    return output.tobytes(), {
+        "Content-Type": RAW_CONTENT_TYPE,
+        SHAPE_HEADER: f"{output.shape[0]},{output.shape[1]}",
+        DTYPE_HEADER: dtype.name,
+    }
@@ -0,0 +1,337 @@
+import argparse
+import logging
+import pickle
+from typing import Optional
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledForest:
+    """
+    sklearn RandomForestRegressor를 연속된 NumPy 배열로 평탄화한 추론 엔진
+
+    모든 트리의 노드를 하나의 배열 집합(feature, threshold, left, right, value)으로
+    합치고, 배치 전체에 대해 모든 트리를 동시에 벡터화하여 탐색한다.
+    sklearn과 동일하게 입력을 float32로 변환한 뒤 비교하고, 트리 순서대로
+    leaf 값을 누적한 후 트리 개수로 나누므로 `model.predict`와 비트 단위로 같은
+    결과를 반환한다.
+
+    `fold_scaler`로 StandardScaler를 임계값에 접어 넣으면 스케일링 전의 원시
+    입력을 float64 그대로 받아 같은 결과를 낸다.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray, roots: np.ndarray,
+                 max_depth: int, n_features: int, input_dtype=np.float32,
+                 value_scale: Optional[np.ndarray] = None, value_offset: Optional[np.ndarray] = None):
+        """
+        CompiledForest 초기화
+
+        Args:
+            feature: 노드별 분할 feature 인덱스 (leaf는 0)
+            threshold: 노드별 분할 임계값 (float64, 압축된 forest는 float32)
+            left: 노드별 왼쪽 자식의 전역 인덱스 (leaf는 자기 자신)
+            right: 노드별 오른쪽 자식의 전역 인덱스 (leaf는 자기 자신)
+            value: 노드별 출력값, shape (n_nodes, n_outputs)
+            roots: 트리별 루트 노드의 전역 인덱스
+            max_depth: 전체 트리 중 최대 깊이
+            n_features: 입력 feature 수
+            input_dtype: 입력을 비교 전에 변환할 dtype (원본 모델은 float32)
+            value_scale: `value`가 정수로 양자화된 경우 출력별 배율
+            value_offset: `value`가 정수로 양자화된 경우 출력별 오프셋
+                (실제 값 = value * value_scale + value_offset)
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.input_dtype = input_dtype
+        self.value_scale = value_scale
+        self.value_offset = value_offset
+        self.n_trees = len(roots)
+        self.n_outputs = value.shape[1]
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """
+        학습된 RandomForestRegressor로부터 CompiledForest 생성
+
+        Args:
+            model: 학습된 sklearn RandomForestRegressor
+
+        Returns:
+            평탄화된 CompiledForest
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # leaf 노드는 자기 자신을 가리키게 하여 고정 횟수 탐색 후에도 leaf에 머무르게 함
+            left = np.where(is_leaf, node_ids, tree.children_left).astype(np.intp) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right).astype(np.intp) + offset
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.intp)
+
+            features.append(feature)
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(left)
+            rights.append(right)
+            # 회귀 트리의 value shape은 (n_nodes, n_outputs, 1)
+            values.append(tree.value[:, :, 0].astype(np.float64))
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            left=np.ascontiguousarray(np.concatenate(lefts)),
+            right=np.ascontiguousarray(np.concatenate(rights)),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+        )
+
+    def fold_scaler(self, scaler) -> "CompiledForest":
+        """
+        StandardScaler를 분할 임계값에 접어 넣은 새 CompiledForest 생성
+
+        원본 경로의 분기 조건은 `float32((x - mean) / scale) <= t` 이고 x에 대해
+        단조이므로, 이 조건을 만족하는 가장 큰 float64 x를 원시 공간 임계값으로
+        삼으면 모든 float64 입력에 대해 분기가 정확히 일치한다.
+        해당 x는 float64 비트 표현 위에서 이분 탐색으로 찾는다.
+
+        Args:
+            scaler: 학습된 sklearn StandardScaler
+
+        Returns:
+            원시 혈액검사 값을 직접 입력받는 CompiledForest
+        """
+        mean = scaler.mean_ if scaler.mean_ is not None and scaler.with_mean else np.zeros(self.n_features)
+        scale = scaler.scale_ if scaler.scale_ is not None and scaler.with_std else np.ones(self.n_features)
+
+        is_split = self.left != np.arange(len(self.left))
+        feature = self.feature[is_split]
+        t = self.threshold[is_split]
+        m = mean[feature].astype(np.float64)
+        sc = scale[feature].astype(np.float64)
+
+        def goes_left(x):
+            return ((x - m) / sc).astype(np.float32) <= t
+
+        # 분기 경계를 감싸는 초기 구간 설정 (float32 반올림 폭보다 충분히 넓게)
+        margin = np.maximum(np.abs(t), 1.0) * 1e-3
+        lo = _float_to_key(m + (t - margin) * sc)
+        hi = _float_to_key(m + (t + margin) * sc)
+        if not (goes_left(_key_to_float(lo)).all() and not goes_left(_key_to_float(hi)).any()):
+            raise ValueError("Failed to bracket split thresholds in raw feature space")
+
+        # 불변식: lo는 왼쪽으로, hi는 오른쪽으로 분기
+        while True:
+            active = hi - lo > 1
+            if not active.any():
+                break
+            mid = lo + (hi - lo) // 2
+            left_mask = goes_left(_key_to_float(mid))
+            lo = np.where(active & left_mask, mid, lo)
+            hi = np.where(active & ~left_mask, mid, hi)
+
+        threshold = self.threshold.astype(np.float64)
+        threshold[is_split] = _key_to_float(lo)
+
+        return CompiledForest(
+            feature=self.feature,
+            threshold=threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            n_features=self.n_features,
+            input_dtype=np.float64,
+            value_scale=self.value_scale,
+            value_offset=self.value_offset,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        노드 배열이 차지하는 바이트 수
+        """
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.left, self.right, self.value, self.roots))
+
+    def _validate(self, X) -> np.ndarray:
+        """
+        입력을 sklearn과 동일한 규칙(dtype 변환, 2차원, 유한값)으로 검증
+        """
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim != 2:
+            raise ValueError(f"Expected 2D array, got {X.ndim}D array instead")
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but the model is expecting {self.n_features} features as input."
+            )
+        if not np.isfinite(X).all():
+            raise ValueError(f"Input contains NaN, infinity or a value too large for dtype('{X.dtype}').")
+        # float32 -> float64 변환은 정확하므로 float64 임계값과의 비교 결과가 sklearn과 같음
+        return X.astype(np.float64, copy=False)
+
+    def apply(self, X) -> np.ndarray:
+        """
+        각 샘플이 각 트리에서 도달하는 leaf 노드의 전역 인덱스 계산
+
+        Args:
+            X: 입력 배열, shape (n_samples, n_features)
+
+        Returns:
+            leaf 인덱스 배열, shape (n_trees, n_samples)
+        """
+        X = self._validate(X)
+        n_samples = X.shape[0]
+        rows = np.arange(n_samples)
+        nodes = np.repeat(self.roots[:, None], n_samples, axis=1)
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes
+
+    def predict(self, X) -> np.ndarray:
+        """
+        배치 예측 수행
+
+        Args:
+            X: 입력 배열, shape (n_samples, n_features)
+
+        Returns:
+            예측값 배열, shape (n_samples, n_outputs)
+        """
+        leaves = self.apply(X)
+        leaf_values = self.value[leaves]
+
+        # sklearn과 같은 순서로 누적해야 부동소수점 합이 동일함
+        y_hat = np.zeros(leaf_values.shape[1:], dtype=np.float64)
+        for tree_values in leaf_values:
+            y_hat += tree_values
+        y_hat /= self.n_trees
+
+        if self.value_scale is not None:
+            # 양자화된 leaf 값의 평균을 원래 단위로 복원 (선형이므로 평균 후 적용해도 같음)
+            y_hat = y_hat * self.value_scale + self.value_offset
+
+        return y_hat
+
+    def verify(self, model, X: np.ndarray, scaler=None) -> Optional[float]:
+        """
+        원본 모델과 예측 결과가 동일한지 확인
+
+        Args:
+            model: 원본 sklearn 모델
+            X: 비교에 사용할 입력 배열
+            scaler: 지정하면 원본 경로를 `scaler.transform` 후 `model.predict`로 계산
+                (스케일러를 접어 넣은 forest 검증용)
+
+        Returns:
+            동일하면 None, 다르면 최대 절대 오차
+        """
+        expected = model.predict(scaler.transform(X) if scaler is not None else X)
+        actual = self.predict(X)
+        if np.array_equal(expected, actual):
+            return None
+        return float(np.max(np.abs(expected - actual)))
+
+
+def _float_to_key(x: np.ndarray) -> np.ndarray:
+    """
+    float64 값을 크기 순서가 보존되는 int64 키로 변환
+    """
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & np.int64(0x7FFFFFFFFFFFFFFF)), bits)
+
+
+def _key_to_float(key: np.ndarray) -> np.ndarray:
+    """
+    `_float_to_key`의 역변환
+    """
+    bits = np.where(key < 0, (-key) | np.int64(-0x8000000000000000), key)
+    return bits.astype(np.int64).view(np.float64)
+
+
+def verification_grid(forest: CompiledForest, scaler, points_per_feature: int = 9) -> np.ndarray:
+    """
+    스케일러를 접어 넣은 forest를 검증하기 위한 원시 공간 입력 격자 생성
+
+    각 feature의 평균 ± 4 표준편차 범위를 균등 분할한 격자와, 모든 분할 임계값
+    및 그 바로 위/아래 float64 값에서 해당 feature만 바꾼 경계 입력을 포함한다.
+
+    Args:
+        forest: 원시 공간 임계값을 가진 CompiledForest
+        scaler: 학습된 sklearn StandardScaler
+        points_per_feature: feature별 격자 점 개수
+
+    Returns:
+        검증용 입력 배열, shape (n_rows, n_features)
+    """
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+    axes = [np.linspace(mu - 4 * sd, mu + 4 * sd, points_per_feature) for mu, sd in zip(mean, scale)]
+    grid = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(mean))
+
+    is_split = forest.left != np.arange(len(forest.left))
+    feature = forest.feature[is_split]
+    threshold = forest.threshold[is_split]
+    boundary_values = np.concatenate([
+        threshold,
+        np.nextafter(threshold, np.inf),
+        np.nextafter(threshold, -np.inf),
+    ])
+    boundary = np.tile(mean, (len(boundary_values), 1))
+    boundary[np.arange(len(boundary_values)), np.tile(feature, 3)] = boundary_values
+
+    return np.vstack([grid, boundary])
+
+
+def main():
+    """
+    스케일러를 접어 넣은 forest와 기존 2단계(scaler.transform + model.predict) 경로의
+    동등성 검증 모드
+    """
+    parser = argparse.ArgumentParser(description="Verify the scaler-folded forest against scaler.transform + model.predict")
+    parser.add_argument("--model", default="/app/model.pkl", help="pickled RandomForestRegressor")
+    parser.add_argument("--scaler", default="/app/scaler.pkl", help="pickled StandardScaler")
+    parser.add_argument("--points", type=int, default=9, help="grid points per feature")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as model_file:
+        model = pickle.load(model_file)
+    with open(args.scaler, "rb") as scaler_file:
+        scaler = pickle.load(scaler_file)
+
+    folded = CompiledForest.from_sklearn(model).fold_scaler(scaler)
+    grid = verification_grid(folded, scaler, args.points)
+    max_error = folded.verify(model, grid, scaler=scaler)
+
+    if max_error is None:
+        print(f"OK: {len(grid)} inputs, folded forest matches scaler + model exactly")
+    else:
+        print(f"MISMATCH: {len(grid)} inputs, max absolute error {max_error}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+RandomForest 압축 도구
+
+forest를 축소 정밀도(float32 또는 int16 양자화 leaf 값)로 변환하고, 필요하면
+트리 수나 깊이를 줄인 뒤, 원본 모델과의 출력별 최대 절대 오차로 정확도
+기준을 검사한다. 기준을 통과한 경우에만 메모리 매핑 아티팩트로 기록하며,
+MODEL_ARTIFACT_DIR로 지정하면 ml-backend가 그대로 서비스한다.
+
+    python forest_compaction.py --values int16 --trees 50 --out /app/model_compact --report compact.json
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from compiled_forest import CompiledForest
+from model_artifact import _sha256, write_artifact
+from model_registry import N_OUTPUTS, probe_inputs
+
+
+logger = logging.getLogger(__name__)
+
+# 출력별 허용 최대 절대 오차
+# (TPNCALCULATEDGLUCOSE, TPNCALCULATEDPROTEIN, TPNCALCULATEDLIPID, TPNCALCULATEDCALORI)
+DEFAULT_MAX_ERROR = (0.1, 0.05, 0.05, 1.0)
+
+VALUE_DTYPES = ("float64", "float32", "int16")
+
+
+def _floor_float32(values: np.ndarray) -> np.ndarray:
+    """
+    각 값 이하인 가장 큰 float32
+
+    float32 입력 x에 대해 `x <= t`와 `x <= floor32(t)`는 항상 같으므로
+    분할 임계값을 이 값으로 저장하면 분기 결과가 바뀌지 않는다.
+    """
+    rounded = values.astype(np.float32)
+    too_large = rounded.astype(np.float64) > values
+    rounded[too_large] = np.nextafter(rounded[too_large], np.float32(-np.inf))
+    return rounded
+
+
+def node_depths(forest: CompiledForest) -> np.ndarray:
+    """
+    각 노드의 루트로부터의 깊이
+    """
+    depths = np.full(len(forest.left), -1, dtype=np.intp)
+    node_ids = np.arange(len(forest.left))
+    frontier = np.asarray(forest.roots, dtype=np.intp)
+    depth = 0
+    while len(frontier):
+        depths[frontier] = depth
+        frontier = frontier[forest.left[frontier] != node_ids[frontier]]
+        frontier = np.concatenate([forest.left[frontier], forest.right[frontier]]).astype(np.intp)
+        depth += 1
+    return depths
+
+
+def truncate_trees(forest: CompiledForest, n_trees: int) -> CompiledForest:
+    """
+    앞에서부터 `n_trees`개의 트리만 남김 (트리 노드는 연속 구간에 저장되어 있음)
+    """
+    if n_trees >= forest.n_trees:
+        return forest
+    end = int(forest.roots[n_trees])
+    truncated = CompiledForest(
+        feature=forest.feature[:end],
+        threshold=forest.threshold[:end],
+        left=forest.left[:end],
+        right=forest.right[:end],
+        value=forest.value[:end],
+        roots=forest.roots[:n_trees],
+        max_depth=forest.max_depth,
+        n_features=forest.n_features,
+        input_dtype=forest.input_dtype,
+    )
+    truncated.max_depth = int(node_depths(truncated).max())
+    return truncated
+
+
+def limit_depth(forest: CompiledForest, max_depth: int) -> CompiledForest:
+    """
+    `max_depth`보다 깊은 노드를 잘라내고 해당 깊이의 분할 노드를 leaf로 바꿈
+
+    회귀 트리의 내부 노드 값은 그 노드에 도달한 학습 샘플의 평균이므로,
+    잘린 노드는 그 값을 그대로 leaf 값으로 사용한다.
+    """
+    depths = node_depths(forest)
+    if depths.max() <= max_depth:
+        return forest
+
+    keep = depths <= max_depth
+    new_index = np.cumsum(keep) - 1
+    old_ids = np.flatnonzero(keep)
+
+    is_leaf = (forest.left[old_ids] == old_ids) | (depths[old_ids] == max_depth)
+    new_ids = np.arange(len(old_ids))
+    left = np.where(is_leaf, new_ids, new_index[forest.left[old_ids]])
+    right = np.where(is_leaf, new_ids, new_index[forest.right[old_ids]])
+    feature = np.where(is_leaf, 0, forest.feature[old_ids])
+
+    return CompiledForest(
+        feature=feature,
+        threshold=forest.threshold[old_ids],
+        left=left,
+        right=right,
+        value=forest.value[old_ids],
+        roots=new_index[forest.roots],
+        max_depth=max_depth,
+        n_features=forest.n_features,
+        input_dtype=forest.input_dtype,
+    )
+
+
+def quantize_values(value: np.ndarray, dtype: str):
+    """
+    leaf 값을 축소 정밀도로 변환
+
+    Args:
+        value: 노드별 출력값, shape (n_nodes, n_outputs)
+        dtype: "float64", "float32" 또는 "int16"
+
+    Returns:
+        (변환된 값, 출력별 배율 또는 None, 출력별 오프셋 또는 None) 튜플
+    """
+    if dtype == "float64":
+        return value.astype(np.float64), None, None
+    if dtype == "float32":
+        return value.astype(np.float32), None, None
+    if dtype != "int16":
+        raise ValueError(f"Unsupported value dtype: {dtype} (expected one of {', '.join(VALUE_DTYPES)})")
+
+    # 출력별 [min, max]를 int16 전체 범위에 선형으로 대응
+    info = np.iinfo(np.int16)
+    low = value.min(axis=0)
+    high = value.max(axis=0)
+    scale = np.where(high > low, (high - low) / (info.max - info.min), 1.0)
+    offset = low - info.min * scale
+    quantized = np.clip(np.round((value - offset) / scale), info.min, info.max).astype(np.int16)
+    return quantized, scale, offset
+
+
+def compact_forest(forest: CompiledForest, value_dtype: str = "float32", n_trees: Optional[int] = None,
+                   max_depth: Optional[int] = None) -> CompiledForest:
+    """
+    스케일링된 입력을 받는 CompiledForest를 압축
+
+    분할 임계값은 float32로, 노드 인덱스는 int32로, feature 인덱스는 uint8로
+    줄인다(임계값 변환은 분기 결과를 바꾸지 않음). leaf 값은 `value_dtype`으로
+    변환하며, 트리 수와 깊이를 줄이면 그만큼 원본과 결과가 달라진다.
+
+    Args:
+        forest: `CompiledForest.from_sklearn`으로 만든 forest
+        value_dtype: leaf 값 dtype ("float64", "float32", "int16")
+        n_trees: 남길 트리 수 (None이면 전체)
+        max_depth: 최대 깊이 (None이면 제한 없음)
+
+    Returns:
+        압축된 CompiledForest
+    """
+    if n_trees is not None:
+        forest = truncate_trees(forest, n_trees)
+    if max_depth is not None:
+        forest = limit_depth(forest, max_depth)
+
+    if len(forest.left) >= np.iinfo(np.int32).max:
+        raise ValueError(f"Forest has too many nodes for int32 indices: {len(forest.left)}")
+    index_dtype = np.int32
+    feature_dtype = np.uint8 if forest.n_features <= np.iinfo(np.uint8).max + 1 else np.int32
+
+    value, value_scale, value_offset = quantize_values(forest.value, value_dtype)
+
+    return CompiledForest(
+        feature=np.ascontiguousarray(forest.feature, dtype=feature_dtype),
+        threshold=np.ascontiguousarray(_floor_float32(np.asarray(forest.threshold, dtype=np.float64))),
+        left=np.ascontiguousarray(forest.left, dtype=index_dtype),
+        right=np.ascontiguousarray(forest.right, dtype=index_dtype),
+        value=np.ascontiguousarray(value),
+        roots=np.asarray(forest.roots, dtype=index_dtype),
+        max_depth=forest.max_depth,
+        n_features=forest.n_features,
+        input_dtype=np.float32,
+        value_scale=value_scale,
+        value_offset=value_offset,
+    )
+
+
+def _median_latency_ms(fn: Callable, X: np.ndarray, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000.0)
+
+
+def evaluate_compaction(model, scaler, original: CompiledForest, compact: CompiledForest, holdout: np.ndarray,
+                        max_error: Sequence[float], repeat: int = 20) -> Dict[str, Any]:
+    """
+    압축 forest의 크기, 지연 시간, 원본 대비 오차를 측정하고 정확도 기준 통과 여부를 판단
+
+    Args:
+        model: 원본 RandomForestRegressor
+        scaler: 학습된 StandardScaler
+        original: 원본을 평탄화한 CompiledForest
+        compact: 압축된 CompiledForest
+        holdout: 원시 입력 행렬 (스케일링 전)
+        max_error: 출력별 허용 최대 절대 오차
+        repeat: 지연 시간 측정 반복 횟수
+
+    Returns:
+        보고서 딕셔너리 ("passed" 항목에 기준 통과 여부)
+    """
+    scaled = scaler.transform(holdout)
+    expected = model.predict(scaled)
+    actual = compact.predict(scaled)
+    errors = np.abs(actual - expected)
+    max_abs_error = errors.max(axis=0)
+
+    single = scaled[:1]
+    return {
+        "holdout_rows": len(holdout),
+        "passed": bool((max_abs_error <= np.asarray(max_error)).all()),
+        "max_error_allowed": [float(v) for v in max_error],
+        "max_abs_error": max_abs_error.tolist(),
+        "mean_abs_error": errors.mean(axis=0).tolist(),
+        "size": {
+            "original_bytes": original.nbytes,
+            "compact_bytes": compact.nbytes,
+            "ratio": compact.nbytes / original.nbytes,
+            "original_nodes": int(len(original.left)),
+            "compact_nodes": int(len(compact.left)),
+            "original_trees": original.n_trees,
+            "compact_trees": compact.n_trees,
+            "original_max_depth": original.max_depth,
+            "compact_max_depth": compact.max_depth,
+        },
+        "latency_ms": {
+            "sklearn_single": _median_latency_ms(model.predict, single, repeat),
+            "original_single": _median_latency_ms(original.predict, single, repeat),
+            "compact_single": _median_latency_ms(compact.predict, single, repeat),
+            "sklearn_holdout": _median_latency_ms(model.predict, scaled, repeat),
+            "original_holdout": _median_latency_ms(original.predict, scaled, repeat),
+            "compact_holdout": _median_latency_ms(compact.predict, scaled, repeat),
+        },
+    }
+
+
+def load_holdout(path: Optional[str], scaler, n_rows: int) -> np.ndarray:
+    """
+    홀드아웃 입력 로드 (파일이 없으면 스케일러 평균 ± 3 표준편차 범위의 가상 입력 생성)
+    """
+    if not path:
+        return probe_inputs(scaler, n_rows)
+
+    import pandas as pd
+    from batch_score import read_chunks
+
+    feature_names = list(getattr(scaler, "feature_names_in_", []))
+    if not feature_names:
+        raise ValueError("The scaler has no feature names, cannot select holdout columns")
+    matrix = np.vstack([
+        chunk[feature_names].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        for chunk in read_chunks(path, 10000)
+    ])
+    return matrix[np.isfinite(matrix).all(axis=1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the RandomForest and gate it on holdout accuracy")
+    parser.add_argument("--model", default="/app/model.pkl", help="pickled RandomForestRegressor")
+    parser.add_argument("--scaler", default="/app/scaler.pkl", help="pickled StandardScaler")
+    parser.add_argument("--values", choices=VALUE_DTYPES, default="float32", help="leaf value precision")
+    parser.add_argument("--trees", type=int, help="keep only the first N trees")
+    parser.add_argument("--max-depth", type=int, help="collapse nodes deeper than this into leaves")
+    parser.add_argument("--holdout", help="CSV/XLSX holdout inputs with the scaler's feature columns "
+                                          "(defaults to synthetic inputs around the scaler mean)")
+    parser.add_argument("--holdout-rows", type=int, default=5000, help="rows of synthetic holdout input")
+    parser.add_argument("--max-error", type=float, nargs=N_OUTPUTS, default=list(DEFAULT_MAX_ERROR),
+                        metavar="ERROR", help="max absolute error allowed per output")
+    parser.add_argument("--out", help="write the compact model as an artifact directory if the gate passes")
+    parser.add_argument("--report", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.model, "rb") as model_file:
+        model = pickle.load(model_file)
+    with open(args.scaler, "rb") as scaler_file:
+        scaler = pickle.load(scaler_file)
+
+    original = CompiledForest.from_sklearn(model)
+    compact = compact_forest(original, value_dtype=args.values, n_trees=args.trees, max_depth=args.max_depth)
+    holdout = load_holdout(args.holdout, scaler, args.holdout_rows)
+
+    report = evaluate_compaction(model, scaler, original, compact, holdout, args.max_error)
+    report["settings"] = {"values": args.values, "trees": args.trees, "max_depth": args.max_depth,
+                          "holdout": args.holdout or "synthetic"}
+
+    size = report["size"]
+    print(f"size: {size['original_bytes']} -> {size['compact_bytes']} bytes ({size['ratio']:.1%}), "
+          f"{size['compact_trees']} trees, {size['compact_nodes']} nodes, depth {size['compact_max_depth']}")
+    latency = report["latency_ms"]
+    print(f"latency (ms): single row {latency['sklearn_single']:.3f} sklearn / {latency['compact_single']:.3f} compact, "
+          f"{report['holdout_rows']} rows {latency['sklearn_holdout']:.3f} sklearn / {latency['compact_holdout']:.3f} compact")
+    print("max abs error: " + ", ".join(f"{error:.6g} (<= {allowed:g})"
+                                        for error, allowed in zip(report["max_abs_error"], report["max_error_allowed"])))
+
+    if report["passed"] and args.out:
+        folded = compact.fold_scaler(scaler)
+        # 접어 넣은 forest는 압축 forest와 같은 분기를 해야 함 (압축으로 인한 오차 외에 추가 오차 없음)
+        scaled = scaler.transform(holdout)
+        if not np.array_equal(folded.predict(holdout), compact.predict(scaled)):
+            raise SystemExit("Folded compact forest does not match the compact forest")
+
+        source = {
+            os.path.basename(args.model): _sha256(args.model),
+            os.path.basename(args.scaler): _sha256(args.scaler),
+        }
+        manifest = write_artifact(compact, folded, scaler, args.out, source=source,
+                                  extra={"compaction": {key: report[key] for key in ("settings", "max_abs_error", "size")}})
+        report["artifact_version"] = manifest["artifact_version"]
+        print(f"Wrote compact artifact {manifest['artifact_version']} to {args.out}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if not report["passed"]:
+        print("FAILED: accuracy gate not met, no artifact written")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
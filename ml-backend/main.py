@@ -1,11 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-import pickle
+from typing import Optional
+import asyncio
+import functools
+import hmac
+import json
+import random
+import time
 import numpy as np
-import pandas as pd
 import sys
 import os
 import logging
+import multiprocessing
+from batching import PredictionBatcher
+from scoring_pool import ScoringPool
+import binary_protocol
+from prediction_cache import PredictionCache, DEFAULT_DECIMALS
+from model_registry import ShadowScorer, load_bundle, source_fingerprint, validate_bundle
+from metrics import LATENCY_BUCKETS, ROWS_BUCKETS, MetricsRegistry, StageTimer, register_process_metrics
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -17,66 +30,522 @@ logger.debug(f"Python version: {sys.version}")
 logger.debug(f"Current working directory: {os.getcwd()}")
 logger.debug(f"Directory contents: {os.listdir('.')}")
 
+# 모델 파일 경로
+MODEL_PATH = os.getenv("MODEL_PATH", "/app/model.pkl")
+SCALER_PATH = os.getenv("SCALER_PATH", "/app/scaler.pkl")
+
+# 메모리 매핑 아티팩트 디렉토리 (model_artifact.py export로 생성)
+# 지정하면 pickle 대신 읽기 전용 mmap으로 forest/scaler를 로드
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR")
+ARTIFACT_VERIFY_CHECKSUMS = os.getenv("ARTIFACT_VERIFY_CHECKSUMS", "0").lower() in ("1", "true", "yes")
+
+# 추론 엔진 선택: "sklearn" (기본값), "compiled" 또는 "folded"
+# - compiled: 평탄화한 forest로 model.predict 대체
+# - folded: StandardScaler까지 임계값에 접어 넣어 원시 입력을 직접 평가
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "sklearn").lower()
+
 try:
-    # RandomForest Model Load
-    logger.debug("Attempting to load model...")
-    model_path = "/app/model.pkl"
-    logger.debug(f"Model path exists : {os.path.exists(model_path)}")
-
-    if os.path.exists(model_path):
-        with open(model_path, "rb") as model_file:
-            model = pickle.load(model_file)
-        logger.debug("Model loaded successfully")
-    else:
-        logger.error(f"Model file not found at {model_path}")
-        raise FileNotFoundError(f"Model file not found at {model_path}")
-    
-    # StandardScaler Load
-    logger.debug("Attempting to load scaler...")
-    scaler_path = "/app/scaler.pkl"
-    logger.debug(f"Scaler path exists : {os.path.exists(scaler_path)}")
-
-    if os.path.exists(scaler_path):
-        with open(scaler_path, "rb") as scaler_file:
-            scaler = pickle.load(scaler_file)
-        logger.debug("Scaler loaded successfully")
-    else:
-        logger.error(f"Scaler file not found at {scaler_path}")
-        raise FileNotFoundError(f"Scaler file not found at {scaler_path}")
-    
+    # 현재 서비스 중인 모델 번들 (모델 교체 시 참조만 바뀜)
+    active_bundle = load_bundle(
+        INFERENCE_ENGINE,
+        model_path=MODEL_PATH,
+        scaler_path=SCALER_PATH,
+        artifact_dir=MODEL_ARTIFACT_DIR,
+        verify_checksums=ARTIFACT_VERIFY_CHECKSUMS
+    )
+    logger.debug(f"Model {active_bundle.version} ready with {active_bundle.engine} engine")
 except Exception as e:
     logger.error(f"Error during initialization: {str(e)}")
     logger.exception("Stack trace:")
     raise
 
+# 요청 단위 상세 로그를 남길 비율 (0이면 끔, 1이면 모든 요청)
+# 입력 전체를 문자열로 만드는 비용이 크므로 기본값은 꺼져 있음
+PREDICT_LOG_SAMPLE_RATE = float(os.getenv("PREDICT_LOG_SAMPLE_RATE", "0"))
+
+# chatbot-backend가 보낸 요청 ID가 있으면 단계별 시간을 JSON 한 줄로 기록 (요청 추적용)
+REQUEST_ID_HEADER = "X-Request-ID"
+trace_logger = logging.getLogger("trace")
 
+# /metrics로 노출되는 메트릭
+metrics = MetricsRegistry()
+stage_latency = metrics.histogram(
+    "mlbackend_stage_duration_seconds",
+    "Time spent in each stage of a prediction request.",
+    LATENCY_BUCKETS, ("stage",)
+)
+request_latency = metrics.histogram(
+    "mlbackend_request_duration_seconds",
+    "End-to-end prediction request latency.",
+    LATENCY_BUCKETS, ("endpoint",)
+)
+requests_total = metrics.counter(
+    "mlbackend_requests_total",
+    "Prediction requests by endpoint and status code.",
+    ("endpoint", "status")
+)
+rows_total = metrics.counter(
+    "mlbackend_rows_total",
+    "Input rows received by endpoint.",
+    ("endpoint",)
+)
+scoring_rows = metrics.histogram(
+    "mlbackend_scoring_batch_rows",
+    "Rows per model evaluation call (after caching and coalescing).",
+    ROWS_BUCKETS
+)
+register_process_metrics(metrics)
+
+def log_sampled() -> bool:
+    return PREDICT_LOG_SAMPLE_RATE > 0 and random.random() < PREDICT_LOG_SAMPLE_RATE
+
+def log_trace(endpoint: str, request_id: Optional[str], timer: StageTimer, status: str, rows: int):
+    """
+    요청 ID가 있는 예측 요청의 단계별 시간을 JSON 한 줄로 기록 (chatbot-backend trace와 request_id로 연결)
+    """
+    if not request_id:
+        return
+    trace_logger.info(json.dumps({
+        "service": "ml-backend",
+        "request_id": request_id,
+        "name": endpoint,
+        "status": status,
+        "rows": rows,
+        "duration_ms": round(timer.elapsed() * 1000.0, 3),
+        "spans": [{"name": stage, "duration_ms": round(seconds * 1000.0, 3)} for stage, seconds in timer.stages.items()],
+    }))
+
+def trace_headers(timer: StageTimer, request_id: Optional[str]) -> dict:
+    headers = {"Server-Timing": timer.server_timing()}
+    if request_id:
+        headers[REQUEST_ID_HEADER] = request_id
+    return headers
 
 output_columns = ["TPNCALCULATEDGLUCOSE", "TPNCALCULATEDPROTEIN", "TPNCALCULATEDLIPID", "TPNCALCULATEDCALORI"]
 
 class PredictionInput(BaseModel):
     data: list
 
+def score_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    선택된 추론 엔진으로 입력 행을 평가
+
+    호출 시점의 `active_bundle`을 한 번만 참조하므로 평가 도중 모델이 교체되어도
+    한 호출의 결과는 하나의 번들에서 나온다.
+
+    Args:
+        matrix: 혈액검사 값 행렬, shape (n_rows, n_features)
+
+    Returns:
+        예측값 배열, shape (n_rows, len(output_columns))
+    """
+    return active_bundle.predict(matrix)
+
+def score_rows_timed(matrix: np.ndarray):
+    """
+    `score_rows`와 같으나 (예측값, 스케일링 시간, 모델 평가 시간)을 반환
+
+    워커 프로세스에서 측정한 시간을 부모 프로세스의 메트릭에 반영하기 위해 사용
+    """
+    return active_bundle.predict_timed(matrix)
+
+
+def to_input_matrix(rows) -> np.ndarray:
+    """
+    요청 데이터를 (n_rows, n_features) float64 행렬로 변환 및 검증
+    """
+    matrix = np.asarray(rows, dtype=np.float64)
+    n_features = active_bundle.n_features
+    if matrix.ndim != 2 or matrix.shape[1] != n_features:
+        raise ValueError(f"Expected input of shape (n_rows, {n_features}), got {matrix.shape}")
+    return matrix
+
+
+# 모델 평가를 워커 프로세스 풀에서 수행 (0이면 이벤트 루프에서 직접 평가)
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "0"))
+scoring_pool = None
+
+# 워커 프로세스가 이 모듈을 import하는 경우(spawn) 풀을 다시 만들지 않음
+if SCORING_WORKERS > 0 and multiprocessing.parent_process() is None:
+    scoring_pool = ScoringPool(SCORING_WORKERS)
+
+async def score_rows_async(rows):
+    """
+    워커 풀이 설정되어 있으면 풀에서, 아니면 현재 프로세스에서 입력 행을 평가
+    """
+    if scoring_pool is not None:
+        predictions, scale_seconds, evaluate_seconds = await scoring_pool.run(score_rows_timed, rows)
+    else:
+        predictions, scale_seconds, evaluate_seconds = score_rows_timed(rows)
+
+    if scale_seconds:
+        stage_latency.observe(scale_seconds, "scale")
+    stage_latency.observe(evaluate_seconds, "evaluate")
+    scoring_rows.observe(len(rows))
+    return predictions
+
+async def score_matrix(matrix: np.ndarray) -> np.ndarray:
+    """
+    검증된 입력 행렬을 (coalescer가 켜져 있으면 coalescer를 거쳐) 평가
+    """
+    if batcher is not None:
+        return await batcher.submit(matrix)
+    return await score_rows_async(matrix)
+
+
+# 예측 결과 캐시 설정 (PREDICTION_CACHE_SIZE=0이면 비활성화)
+# 캐시가 켜져 있으면 입력을 feature별 자릿수로 반올림한 값으로 평가함
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "0"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "0")) or None
+PREDICTION_CACHE_DECIMALS = [int(d) for d in os.getenv("PREDICTION_CACHE_DECIMALS", ",".join(map(str, DEFAULT_DECIMALS))).split(",")]
+
+prediction_cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(
+        max_entries=PREDICTION_CACHE_SIZE,
+        ttl_seconds=PREDICTION_CACHE_TTL,
+        decimals=PREDICTION_CACHE_DECIMALS,
+        model_version=active_bundle.version,
+        n_features=active_bundle.n_features
+    )
+    metrics.gauge("mlbackend_cache_entries", "Entries in the prediction cache.", lambda: len(prediction_cache))
+    metrics.gauge("mlbackend_cache_hits_total", "Prediction cache hits.", lambda: prediction_cache.hits, "counter")
+    metrics.gauge("mlbackend_cache_misses_total", "Prediction cache misses.", lambda: prediction_cache.misses, "counter")
+
+async def predict_matrix(matrix: np.ndarray) -> np.ndarray:
+    """
+    캐시를 확인한 뒤 캐시에 없는 행만 평가
+    """
+    if prediction_cache is None:
+        return await score_matrix(matrix)
+
+    quantized = prediction_cache.quantize(matrix)
+    # 평가를 기다리는 동안 모델이 교체되면 이전 모델의 결과를 새 버전 캐시에 저장하지 않도록 기록
+    model_version = prediction_cache.model_version
+    results, missing = prediction_cache.lookup(quantized)
+    if missing:
+        predictions = await score_matrix(quantized[missing])
+        prediction_cache.store(quantized[missing], predictions, model_version)
+        for index, prediction in zip(missing, predictions):
+            results[index] = prediction
+    return np.vstack(results)
+
+async def predict_with_shadow(matrix: np.ndarray) -> np.ndarray:
+    """
+    현재 모델로 평가하고, 섀도 후보가 있으면 일부 요청을 백그라운드에서 후보로도 평가
+    """
+    predictions = await predict_matrix(matrix)
+
+    shadow = shadow_scorer
+    if shadow is not None and shadow.should_sample():
+        # 캐시가 켜져 있으면 실제 평가에 쓰인 양자화 입력으로 비교
+        shadow_input = prediction_cache.quantize(matrix) if prediction_cache is not None else matrix
+        asyncio.get_running_loop().run_in_executor(None, shadow.compare, active_bundle, shadow_input)
+
+    return predictions
+
+
+# 요청 coalescing 설정: 짧은 시간 동안 들어온 요청을 모아 한 번에 평가
+PREDICT_BATCHING = os.getenv("PREDICT_BATCHING", "0").lower() in ("1", "true", "yes")
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "2"))
+
+batcher = None
+if PREDICT_BATCHING:
+    batcher = PredictionBatcher(
+        score_rows_async,
+        max_batch_rows=BATCH_MAX_ROWS,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        max_concurrent_batches=max(SCORING_WORKERS, 1)
+    )
+    metrics.gauge("mlbackend_batch_queue_rows", "Rows waiting to be coalesced.", lambda: batcher.pending_rows)
+
 @app.post("/predict")
-async def predict(input_data: PredictionInput):
+async def predict(input_data: PredictionInput, x_request_id: Optional[str] = Header(None)):
+    timer = StageTimer(stage_latency)
+    status = "200"
+    rows = 0
     try:
-        logger.debug(f"Received input data: {input_data}")
-        df = pd.DataFrame(input_data.data)
-        logger.debug(f"Created DataFrame with shape: {df.shape}")
+        matrix = to_input_matrix(input_data.data)
+        rows = len(matrix)
+        rows_total.inc("/predict", amount=len(matrix))
+        timer.mark("parse")
 
-        scaled_data = scaler.transform(df)
-        logger.debug("Data scaled successfully")
+        predictions = await predict_with_shadow(matrix)
+        timer.mark("score")
 
-        predictions = model.predict(scaled_data)
-        logger.debug("Predictions made successfully")
+        # 응답 직렬화 시간까지 측정하기 위해 직접 JSON으로 변환
+        response = JSONResponse([dict(zip(output_columns, row)) for row in predictions.tolist()])
+        timer.mark("serialize")
+        response.headers.update(trace_headers(timer, x_request_id))
 
-        result_df = pd.DataFrame(predictions, columns=output_columns)
-        logger.debug(f"Result Dataframe created with shape: {result_df.shape}")
-
-        return result_df.to_dict(orient="records")
+        if log_sampled():
+            logger.info(f"/predict input={input_data.data} shape={matrix.shape} predictions={predictions.tolist()}")
+        return response
     except Exception as e:
+        status = "400"
         logger.error(f"Error during prediction: {str(e)}")
         logger.exception("Stack trace")
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        request_latency.observe(timer.elapsed(), "/predict")
+        requests_total.inc("/predict", status)
+        log_trace("/predict", x_request_id, timer, status, rows)
+
+@app.post("/predict/binary")
+async def predict_binary(request: Request):
+    """
+    바이너리 예측 엔드포인트
+
+    application/x-npy 본문 또는 X-Shape/X-Dtype 헤더가 붙은 little-endian raw 버퍼
+    (application/octet-stream)를 받아, 출력 4개(output_columns 순서)를 같은 형식과
+    dtype으로 반환한다.
+    """
+    timer = StageTimer(stage_latency)
+    status = "200"
+    rows = 0
+    request_id = request.headers.get(REQUEST_ID_HEADER)
+    try:
+        content_type = request.headers.get("content-type", binary_protocol.RAW_CONTENT_TYPE).split(";")[0].strip().lower()
+        body = await request.body()
+        timer.mark("receive")
+
+        matrix, dtype = binary_protocol.decode_request(body, content_type, request.headers)
+        matrix = to_input_matrix(matrix)
+        rows = len(matrix)
+        rows_total.inc("/predict/binary", amount=len(matrix))
+        timer.mark("parse")
+
+        predictions = await predict_with_shadow(matrix)
+        timer.mark("score")
+
+        content, headers = binary_protocol.encode_response(predictions, content_type, dtype)
+        timer.mark("serialize")
+
+        if log_sampled():
+            logger.info(f"/predict/binary content_type={content_type} shape={matrix.shape} dtype={dtype.name}")
+        return Response(content=content, headers={**headers, **trace_headers(timer, request_id)})
+    except Exception as e:
+        status = "400"
+        logger.error(f"Error during binary prediction: {str(e)}")
+        logger.exception("Stack trace")
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        request_latency.observe(timer.elapsed(), "/predict/binary")
+        requests_total.inc("/predict/binary", status)
+        log_trace("/predict/binary", request_id, timer, status, rows)
+
+@app.get("/batching/stats")
+async def batching_stats():
+    """
+    요청 coalescer의 큐 깊이 및 배치 크기 통계
+    """
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus 텍스트 형식의 단계별 지연 시간, 요청/행 수, 프로세스 메모리 메트릭
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    예측 결과 캐시의 적중/미스 통계
+    """
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+# 모델 교체 관련 설정
+# - ADMIN_TOKEN: /admin 엔드포인트에 필요한 X-Admin-Token 헤더 값 (지정하지 않으면 /admin 비활성화)
+# - MODEL_WATCH_INTERVAL: 0보다 크면 해당 주기(초)로 모델 파일 변경을 감지하여 자동 교체
+# - MODEL_RELOAD_MODE: 자동 교체 방식 ("promote": 즉시 교체, "shadow": 섀도 평가)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+MODEL_RELOAD_MODE = os.getenv("MODEL_RELOAD_MODE", "promote").lower()
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+
+shadow_scorer = None
+reload_in_progress = False
+reload_status = {"state": "idle"}
+
+def activate_bundle(bundle):
+    """
+    모델 번들을 원자적으로 교체
+
+    번들은 요청 시작 시점이 아니라 평가 호출(coalescer 배치 하나) 시점에 정해진다.
+    한 번의 평가 호출은 하나의 번들로 끝까지 평가되지만, 교체 시점에 평가를 기다리던
+    요청은 새 번들로 평가될 수 있다. 워커 풀을 쓰면 교체 전에 제출된 작업은 기존 워커
+    (기존 번들)에서 처리된다. 예측 캐시는 조회 이후 버전이 바뀐 결과를 저장하지 않는다.
+    """
+    global active_bundle
+    previous_version = active_bundle.version
+    active_bundle = bundle
+
+    if prediction_cache is not None:
+        prediction_cache.set_model_version(bundle.version)
+    if scoring_pool is not None and bundle.version != previous_version:
+        # 워커는 fork 시점의 모델을 가지고 있으므로 새 워커로 교체
+        scoring_pool.restart()
+
+    logger.info(f"Model swapped: {previous_version} -> {bundle.version} ({bundle.engine})")
+
+async def reload_model(model_path: Optional[str], scaler_path: Optional[str], artifact_dir: Optional[str],
+                       mode: str, sample_rate: float):
+    """
+    새 모델을 백그라운드 스레드에서 로드/검증한 뒤 교체하거나 섀도 후보로 등록
+    """
+    global reload_in_progress, reload_status, shadow_scorer
+    loop = asyncio.get_running_loop()
+    reload_status = {"state": "loading", "mode": mode, "started_at": time.time()}
+
+    try:
+        load = functools.partial(
+            load_bundle,
+            INFERENCE_ENGINE,
+            model_path=model_path,
+            scaler_path=scaler_path,
+            artifact_dir=artifact_dir,
+            verify_checksums=True
+        )
+        candidate = await loop.run_in_executor(None, load)
+        report = await loop.run_in_executor(None, validate_bundle, candidate, active_bundle)
+
+        if mode == "shadow":
+            shadow_scorer = ShadowScorer(candidate, sample_rate, report)
+            logger.info(f"Shadow scoring candidate {candidate.version} on {sample_rate:.0%} of requests")
+        else:
+            shadow_scorer = None
+            activate_bundle(candidate)
+
+        reload_status = {**reload_status, "state": "done", "finished_at": time.time(), "report": report}
+    except Exception as e:
+        logger.error(f"Model reload failed: {str(e)}")
+        logger.exception("Stack trace")
+        reload_status = {**reload_status, "state": "failed", "finished_at": time.time(), "error": str(e)}
+    finally:
+        reload_in_progress = False
+
+def start_reload(model_path, scaler_path, artifact_dir, mode, sample_rate) -> bool:
+    """
+    모델 교체 작업 시작 (이미 진행 중이면 False)
+    """
+    global reload_in_progress
+    if reload_in_progress:
+        return False
+    reload_in_progress = True
+    asyncio.get_running_loop().create_task(reload_model(model_path, scaler_path, artifact_dir, mode, sample_rate))
+    return True
+
+def check_admin_token(token: Optional[str]):
+    # 모델 로드는 pickle을 역직렬화하므로 토큰이 설정되지 않은 서버는 /admin을 열지 않음
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class ReloadRequest(BaseModel):
+    mode: str = "promote"
+    sample_rate: Optional[float] = None
+
+@app.post("/admin/reload", status_code=202)
+async def admin_reload(reload_request: ReloadRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    새 모델을 백그라운드에서 로드하여 교체("promote")하거나 섀도 후보("shadow")로 등록
+
+    항상 설정된 경로(MODEL_ARTIFACT_DIR 또는 MODEL_PATH/SCALER_PATH)에서 다시 로드한다.
+    새 모델은 해당 경로에 배포한 뒤 이 엔드포인트를 호출한다.
+    """
+    check_admin_token(x_admin_token)
+    if reload_request.mode not in ("promote", "shadow"):
+        raise HTTPException(status_code=400, detail="mode must be 'promote' or 'shadow'")
+
+    started = start_reload(
+        MODEL_PATH,
+        SCALER_PATH,
+        MODEL_ARTIFACT_DIR,
+        reload_request.mode,
+        reload_request.sample_rate if reload_request.sample_rate is not None else SHADOW_SAMPLE_RATE
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    return {"status": "accepted", "mode": reload_request.mode}
+
+@app.post("/admin/shadow/promote")
+async def admin_promote_shadow(x_admin_token: Optional[str] = Header(None)):
+    """
+    섀도 후보를 현재 모델로 승격
+    """
+    global shadow_scorer
+    check_admin_token(x_admin_token)
+    if shadow_scorer is None:
+        raise HTTPException(status_code=404, detail="No shadow candidate")
+    candidate = shadow_scorer.candidate
+    shadow_scorer = None
+    activate_bundle(candidate)
+    return {"status": "promoted", "model": candidate.describe()}
+
+@app.delete("/admin/shadow")
+async def admin_drop_shadow(x_admin_token: Optional[str] = Header(None)):
+    """
+    섀도 후보 제거
+    """
+    global shadow_scorer
+    check_admin_token(x_admin_token)
+    shadow_scorer = None
+    return {"status": "removed"}
+
+@app.get("/admin/model")
+async def admin_model_status(x_admin_token: Optional[str] = Header(None)):
+    """
+    현재 모델, 마지막 교체 작업, 섀도 평가 통계 조회
+    """
+    check_admin_token(x_admin_token)
+    return {
+        "active": active_bundle.describe(),
+        "reload": reload_status,
+        "shadow": shadow_scorer.stats() if shadow_scorer is not None else None,
+    }
+
+async def watch_model_files():
+    """
+    모델 파일 변경을 주기적으로 확인하여 자동으로 교체 작업 시작
+
+    파일을 쓰는 도중에 로드하지 않도록, 변경된 상태가 두 번 연속 같을 때 교체한다.
+    """
+    current = source_fingerprint(MODEL_PATH, SCALER_PATH, MODEL_ARTIFACT_DIR)
+    previous = current
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        observed = source_fingerprint(MODEL_PATH, SCALER_PATH, MODEL_ARTIFACT_DIR)
+        if observed is not None and observed != current and observed == previous:
+            logger.info("Model files changed, reloading")
+            if start_reload(MODEL_PATH, SCALER_PATH, MODEL_ARTIFACT_DIR, MODEL_RELOAD_MODE, SHADOW_SAMPLE_RATE):
+                current = observed
+        previous = observed
+
+@app.on_event("startup")
+def start_scoring_pool():
+    # 요청을 받기 전에 워커를 모두 띄워 첫 요청이 fork 비용을 치르지 않게 함
+    # (모듈 import 중에는 score_rows를 pickle할 수 없으므로 startup 시점에 수행)
+    if scoring_pool is not None:
+        scoring_pool.warmup(score_rows, active_bundle.scaler.mean_[None, :])
+        logger.debug(f"Scoring pool ready with {SCORING_WORKERS} workers")
+
+@app.on_event("startup")
+async def start_model_watcher():
+    if MODEL_WATCH_INTERVAL > 0:
+        asyncio.get_running_loop().create_task(watch_model_files())
+        logger.debug(f"Watching model files every {MODEL_WATCH_INTERVAL}s ({MODEL_RELOAD_MODE})")
+
+@app.on_event("shutdown")
+def shutdown_scoring_pool():
+    if scoring_pool is not None:
+        scoring_pool.shutdown()
     
 @app.get("/health")
 async def health_check():
@@ -91,7 +560,11 @@ async def test_endpoint():
     return {
         "status": "ok",
         "message": "API is responding",
-        "model_loaded": model is not None,
-        "scaler_loaded": scaler is not None
+        "model_loaded": active_bundle is not None,
+        "scaler_loaded": active_bundle.scaler is not None,
+        "scoring_pool": scoring_pool.stats() if scoring_pool is not None else None,
+        "model_version": active_bundle.version,
+        "model_artifact": active_bundle.source.get("artifact_dir"),
+        "inference_engine": active_bundle.engine
     }
     
\ No newline at end of file
@@ -0,0 +1,214 @@
+import os
+import resource
+import time
+from typing import Callable, List, Optional, Sequence
+
+
+# 단계별 지연 시간 구간 (초)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 평가 호출당 행 수 구간
+ROWS_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    단조 증가 카운터 (라벨 값 조합별로 집계)
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    누적 구간 히스토그램 (라벨 값 조합별로 집계)
+
+    관측 한 번은 구간 탐색과 정수 덧셈 몇 번으로 끝나므로 요청 경로에서
+    호출해도 부담이 거의 없다.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        # 라벨 값 조합별 [구간별 개수..., +Inf 개수], 합계
+        self._counts = {}
+        self._sums = {}
+
+    def observe(self, value: float, *label_values: str):
+        counts = self._counts.get(label_values)
+        if counts is None:
+            counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+            self._sums[label_values] = 0.0
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        self._sums[label_values] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[label_values])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    조회 시점에 콜백으로 값을 읽는 메트릭
+
+    다른 객체가 이미 집계하고 있는 값(캐시 적중 수 등)은 `metric_type="counter"`로
+    노출한다.
+    """
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Optional[float]], metric_type: str = "gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        self.metric_type = metric_type
+
+    def render(self) -> List[str]:
+        value = self.read()
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}", f"{self.name} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    """
+    Prometheus 텍스트 형식으로 내보낼 메트릭 모음
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float], label_names: Sequence[str] = ()) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets, label_names))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Optional[float]], metric_type: str = "gauge") -> Gauge:
+        return self._register(Gauge(name, help_text, read, metric_type))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Prometheus 텍스트 노출 형식 (version 0.0.4)으로 변환
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    요청 하나의 단계별 소요 시간을 히스토그램에 기록하는 타이머
+
+        timer = StageTimer(stage_latency)
+        ... 파싱 ...
+        timer.mark("parse")
+        ... 평가 ...
+        timer.mark("score")
+    """
+
+    __slots__ = ("histogram", "stages", "_start", "_last")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.stages = {}
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        """
+        직전 mark 이후 경과 시간을 `stage`로 기록
+        """
+        now = time.perf_counter()
+        self.histogram.observe(now - self._last, stage)
+        self.stages[stage] = now - self._last
+        self._last = now
+
+    def elapsed(self) -> float:
+        """
+        타이머 생성 이후 전체 경과 시간
+        """
+        return time.perf_counter() - self._start
+
+    def server_timing(self) -> str:
+        """
+        HTTP Server-Timing 헤더 값 (호출한 chatbot-backend가 요청 trace에 기록)
+        """
+        return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items())
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def resident_memory_bytes() -> Optional[float]:
+    """
+    현재 프로세스의 상주 메모리 (Linux /proc 기준, 그 외에는 None)
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return float(int(f.read().split()[1]) * _PAGE_SIZE)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_memory_bytes() -> float:
+    """
+    현재 프로세스의 최대 상주 메모리
+    """
+    # Linux의 ru_maxrss 단위는 KiB
+    return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def register_process_metrics(registry: MetricsRegistry):
+    """
+    프로세스 메모리/시작 시각 게이지 등록
+    """
+    start_time = time.time()
+    registry.gauge("process_resident_memory_bytes", "Resident memory size in bytes.", resident_memory_bytes)
+    registry.gauge("process_peak_resident_memory_bytes", "Peak resident memory size in bytes.", peak_memory_bytes)
+    registry.gauge("process_start_time_seconds", "Start time of the process since unix epoch in seconds.", lambda: start_time)
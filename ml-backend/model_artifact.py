@@ -0,0 +1,371 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from compiled_forest import CompiledForest, verification_grid
+
+
+logger = logging.getLogger(__name__)
+
+# 디스크 형식이 바뀌면 올림
+# 2: 양자화된 leaf 값(value_scale/value_offset)과 축소 dtype 배열 지원
+FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+MANIFEST_NAME = "manifest.json"
+
+# 아티팩트에 저장되는 평탄화 배열
+ARRAY_NAMES = (
+    "feature",
+    "threshold",
+    "raw_threshold",
+    "left",
+    "right",
+    "value",
+    "roots",
+    "scaler_mean",
+    "scaler_scale",
+)
+
+
+class ModelArtifact:
+    """
+    메모리 매핑 가능한 모델 아티팩트
+
+    forest와 scaler를 평탄화한 `.npy` 배열과, 각 배열의 dtype/shape/sha256을 담은
+    `manifest.json`으로 구성된다. 배열은 읽기 전용 mmap으로 열리므로 여러 워커가
+    같은 물리 페이지를 공유하고, 로딩 시간은 모델 크기와 무관하게 거의 일정하다.
+
+    아티팩트 경로(예: /app/model_artifact)는 버전별 디렉토리(model_artifact-<버전>)를
+    가리키는 심볼릭 링크이다. 내보낼 때 새 버전 디렉토리를 모두 작성한 뒤 링크만
+    원자적으로 바꾸므로, 실행 중인 서버가 mmap한 기존 파일은 수정되지 않는다.
+    """
+
+    def __init__(self, directory: str, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        """
+        ModelArtifact 초기화
+
+        Args:
+            directory: 아티팩트 디렉토리
+            manifest: manifest.json 내용
+            arrays: 배열 이름별 (mmap) 배열
+        """
+        self.directory = directory
+        self.manifest = manifest
+        self.arrays = arrays
+
+    @property
+    def version(self) -> str:
+        """
+        아티팩트 내용으로부터 결정되는 버전 문자열
+        """
+        return self.manifest["artifact_version"]
+
+    def compiled_forest(self) -> CompiledForest:
+        """
+        스케일링된 입력을 받는 CompiledForest (scaler.transform 이후 평가)
+        """
+        return self._forest(self.arrays["threshold"], np.float32)
+
+    def folded_forest(self) -> CompiledForest:
+        """
+        스케일러가 임계값에 접혀 들어가 원시 입력을 받는 CompiledForest
+        """
+        return self._forest(self.arrays["raw_threshold"], np.float64)
+
+    def _forest(self, threshold: np.ndarray, input_dtype) -> CompiledForest:
+        return CompiledForest(
+            feature=self.arrays["feature"],
+            threshold=threshold,
+            left=self.arrays["left"],
+            right=self.arrays["right"],
+            value=self.arrays["value"],
+            roots=self.arrays["roots"],
+            max_depth=self.manifest["max_depth"],
+            n_features=self.manifest["n_features"],
+            input_dtype=input_dtype,
+            value_scale=self._value_encoding("scale"),
+            value_offset=self._value_encoding("offset"),
+        )
+
+    def _value_encoding(self, name: str) -> Optional[np.ndarray]:
+        encoding = self.manifest.get("value_encoding")
+        if not encoding:
+            return None
+        return np.asarray(encoding[name], dtype=np.float64)
+
+    def scaler(self) -> StandardScaler:
+        """
+        저장된 평균/표준편차로 학습 완료 상태의 StandardScaler 복원
+        """
+        mean = np.asarray(self.arrays["scaler_mean"])
+        scale = np.asarray(self.arrays["scaler_scale"])
+        scaler = StandardScaler()
+        scaler.mean_ = mean
+        scaler.scale_ = scale
+        scaler.var_ = scale ** 2
+        scaler.n_features_in_ = len(mean)
+        scaler.n_samples_seen_ = self.manifest.get("n_samples_seen", 0)
+        return scaler
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_artifact(model, scaler, output_dir: str, source: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    pickle로 로드한 forest/scaler를 메모리 매핑 가능한 아티팩트로 내보냄
+
+    내보내기 전에 평탄화한 forest와 스케일러를 접어 넣은 forest가 원본과
+    비트 단위로 같은 결과를 내는지 검증한다.
+
+    Args:
+        model: 학습된 RandomForestRegressor
+        scaler: 학습된 StandardScaler
+        output_dir: 아티팩트를 저장할 디렉토리
+        source: 원본 파일 이름별 sha256 (manifest에 기록)
+
+    Returns:
+        작성된 manifest
+    """
+    compiled = CompiledForest.from_sklearn(model)
+    folded = compiled.fold_scaler(scaler)
+
+    grid = verification_grid(folded, scaler, points_per_feature=7)
+    if compiled.verify(model, scaler.transform(grid)) is not None:
+        raise ValueError("Compiled forest does not match model.predict")
+    if folded.verify(model, grid, scaler=scaler) is not None:
+        raise ValueError("Folded forest does not match scaler.transform + model.predict")
+
+    return write_artifact(compiled, folded, scaler, output_dir, source=source)
+
+
+def write_artifact(compiled: CompiledForest, folded: CompiledForest, scaler, output_dir: str,
+                   source: Optional[Dict[str, str]] = None, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    이미 검증된 forest 쌍을 아티팩트 디렉토리에 기록
+
+    같은 위치의 임시 디렉토리에 모든 파일을 작성한 뒤 버전별 디렉토리로 옮기고,
+    `output_dir` 심볼릭 링크를 한 번에 교체한다. 기존 버전 디렉토리는 지우지 않는다
+    (실행 중인 서버가 mmap하고 있을 수 있고 롤백에 사용).
+
+    Args:
+        compiled: 스케일링된 입력을 받는 CompiledForest
+        folded: `compiled.fold_scaler(scaler)` 결과
+        scaler: 학습된 StandardScaler
+        output_dir: 아티팩트를 저장할 디렉토리
+        source: 원본 파일 이름별 sha256 (manifest에 기록)
+        extra: manifest에 추가로 기록할 항목 (압축 보고서 등)
+
+    Returns:
+        작성된 manifest
+    """
+    arrays = {
+        "feature": compiled.feature,
+        "threshold": compiled.threshold,
+        "raw_threshold": folded.threshold,
+        "left": compiled.left,
+        "right": compiled.right,
+        "value": compiled.value,
+        "roots": compiled.roots,
+        "scaler_mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64),
+    }
+
+    output_dir = os.path.abspath(output_dir)
+    _check_replaceable(output_dir)
+    os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(output_dir)}.", suffix=".tmp",
+                                   dir=os.path.dirname(output_dir))
+    try:
+        manifest = _write_files(compiled, folded, scaler, arrays, staging_dir, source, extra)
+        _publish(staging_dir, output_dir, manifest["artifact_version"])
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    return manifest
+
+
+def _check_replaceable(output_dir: str):
+    """
+    심볼릭 링크로 교체할 수 없는 위치(내용이 있는 실제 디렉토리)면 거부
+    """
+    if os.path.isdir(output_dir) and not os.path.islink(output_dir) and os.listdir(output_dir):
+        raise FileExistsError(
+            f"{output_dir} is a non-empty directory; artifacts are published as a symlink to a versioned "
+            f"directory and are never overwritten in place. Move it aside or export to a new path."
+        )
+
+
+def _write_files(compiled: CompiledForest, folded: CompiledForest, scaler, arrays: Dict[str, np.ndarray],
+                 directory: str, source: Optional[Dict[str, str]], extra: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    배열 파일과 manifest를 디렉토리에 작성
+    """
+    files = {}
+    for name in ARRAY_NAMES:
+        filename = f"{name}.npy"
+        path = os.path.join(directory, filename)
+        # 플랫폼 독립적인 little-endian, C-연속 배열로 저장
+        array = np.ascontiguousarray(arrays[name])
+        array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+        np.save(path, array, allow_pickle=False)
+        files[name] = {
+            "file": filename,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "sha256": _sha256(path),
+        }
+
+    value_encoding = None
+    if compiled.value_scale is not None:
+        value_encoding = {
+            "scale": [float(v) for v in compiled.value_scale],
+            "offset": [float(v) for v in compiled.value_offset],
+        }
+
+    # 배열 checksum으로부터 버전을 정해 내용이 같으면 버전도 같게 함
+    version_source = "".join(files[name]["sha256"] for name in ARRAY_NAMES)
+    if value_encoding is not None:
+        version_source += json.dumps(value_encoding, sort_keys=True)
+    version_digest = hashlib.sha256(version_source.encode()).hexdigest()
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "artifact_version": version_digest[:16],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "n_trees": compiled.n_trees,
+        "n_nodes": int(len(compiled.threshold)),
+        "n_features": compiled.n_features,
+        "n_outputs": compiled.n_outputs,
+        "max_depth": compiled.max_depth,
+        "n_samples_seen": int(np.max(scaler.n_samples_seen_)),
+        "arrays": files,
+        "source": source or {},
+    }
+    if value_encoding is not None:
+        manifest["value_encoding"] = value_encoding
+    if extra:
+        manifest.update(extra)
+
+    with open(os.path.join(directory, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _publish(staging_dir: str, output_dir: str, version: str):
+    """
+    작성이 끝난 임시 디렉토리를 버전별 디렉토리로 옮기고 output_dir 링크를 원자적으로 교체
+    """
+    parent, name = os.path.split(output_dir)
+    versioned_dir = os.path.join(parent, f"{name}-{version}")
+    if os.path.isdir(versioned_dir):
+        # 버전은 배열 내용으로 정해지므로 같은 버전이 이미 있으면 그대로 사용
+        shutil.rmtree(staging_dir)
+    else:
+        os.chmod(staging_dir, 0o755)
+        os.rename(staging_dir, versioned_dir)
+
+    link_tmp = os.path.join(parent, f".{name}.{os.getpid()}.link")
+    if os.path.lexists(link_tmp):
+        os.remove(link_tmp)
+    os.symlink(os.path.basename(versioned_dir), link_tmp)
+
+    _check_replaceable(output_dir)
+    if os.path.isdir(output_dir) and not os.path.islink(output_dir):
+        # 빈 디렉토리는 링크로 바꿈
+        os.rmdir(output_dir)
+    os.replace(link_tmp, output_dir)
+
+
+def load_artifact(directory: str, verify_checksums: bool = False) -> ModelArtifact:
+    """
+    아티팩트를 읽기 전용 mmap으로 로드
+
+    Args:
+        directory: 아티팩트 디렉토리
+        verify_checksums: True이면 모든 배열 파일의 sha256을 확인 (파일 전체를 읽음)
+
+    Returns:
+        로드된 ModelArtifact
+    """
+    # 로드 도중 링크가 새 버전으로 바뀌어도 manifest와 배열을 같은 버전에서 읽도록 먼저 해석
+    directory = os.path.realpath(directory)
+    with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"Unsupported artifact format version: {manifest.get('format_version')} "
+                         f"(expected one of {SUPPORTED_FORMAT_VERSIONS})")
+
+    arrays = {}
+    for name in ARRAY_NAMES:
+        entry = manifest["arrays"][name]
+        path = os.path.join(directory, entry["file"])
+
+        if verify_checksums and _sha256(path) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {entry['file']}")
+
+        array = np.load(path, mmap_mode="r", allow_pickle=False)
+        if array.dtype.str != entry["dtype"] or list(array.shape) != entry["shape"]:
+            raise ValueError(
+                f"{entry['file']} has dtype {array.dtype.str} and shape {list(array.shape)}, "
+                f"manifest expects {entry['dtype']} and {entry['shape']}"
+            )
+        arrays[name] = array
+
+    logger.debug(f"Mapped model artifact {manifest['artifact_version']} from {directory}")
+    return ModelArtifact(directory, manifest, arrays)
+
+
+def main():
+    """
+    아티팩트 내보내기/검증 CLI
+    """
+    parser = argparse.ArgumentParser(description="Export or verify the memory-mappable model artifact")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="convert model.pkl/scaler.pkl into an artifact directory")
+    export_parser.add_argument("--model", default="/app/model.pkl", help="pickled RandomForestRegressor")
+    export_parser.add_argument("--scaler", default="/app/scaler.pkl", help="pickled StandardScaler")
+    export_parser.add_argument("--out", default="/app/model_artifact", help="output directory")
+
+    verify_parser = subparsers.add_parser("verify", help="check manifest, shapes and checksums of an artifact")
+    verify_parser.add_argument("directory", nargs="?", default="/app/model_artifact", help="artifact directory")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        with open(args.model, "rb") as model_file:
+            model = pickle.load(model_file)
+        with open(args.scaler, "rb") as scaler_file:
+            scaler = pickle.load(scaler_file)
+
+        source = {
+            os.path.basename(args.model): _sha256(args.model),
+            os.path.basename(args.scaler): _sha256(args.scaler),
+        }
+        manifest = export_artifact(model, scaler, args.out, source=source)
+        print(f"Exported artifact {manifest['artifact_version']} to {args.out} "
+              f"({manifest['n_trees']} trees, {manifest['n_nodes']} nodes)")
+    else:
+        artifact = load_artifact(args.directory, verify_checksums=True)
+        print(f"OK: artifact {artifact.version}, {artifact.manifest['n_nodes']} nodes, checksums verified")
+
+
+if __name__ == "__main__":
+    main()
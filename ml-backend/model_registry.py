@@ -0,0 +1,347 @@
+import hashlib
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from compiled_forest import CompiledForest, verification_grid
+from model_artifact import load_artifact, MANIFEST_NAME
+
+
+logger = logging.getLogger(__name__)
+
+N_OUTPUTS = 4
+
+
+class ModelBundle:
+    """
+    한 버전의 모델/스케일러와 선택된 추론 엔진을 묶은 불변 객체
+
+    서비스는 현재 번들에 대한 참조 하나만 들고 있으며, 새 버전은 별도로 로드/검증한
+    뒤 참조를 교체하는 방식으로 원자적으로 반영된다. 이미 진행 중인 요청은
+    자신이 시작할 때의 번들로 끝까지 평가된다.
+    """
+
+    def __init__(self, version: str, engine: str, scaler, model=None,
+                 compiled: Optional[CompiledForest] = None, folded: Optional[CompiledForest] = None,
+                 source: Optional[Dict[str, str]] = None):
+        """
+        ModelBundle 초기화
+
+        Args:
+            version: 모델 버전 문자열
+            engine: 실제 사용되는 추론 엔진 ("sklearn", "compiled", "folded")
+            scaler: StandardScaler
+            model: sklearn RandomForestRegressor (아티팩트에서 로드한 경우 None)
+            compiled: 스케일링된 입력을 받는 CompiledForest
+            folded: 원시 입력을 받는 CompiledForest
+            source: 로드한 파일 경로 정보
+        """
+        self.version = version
+        self.engine = engine
+        self.scaler = scaler
+        self.model = model
+        self.compiled = compiled
+        self.folded = folded
+        self.source = source or {}
+        self.loaded_at = time.time()
+        self.n_features = scaler.n_features_in_
+
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        입력 행렬 평가
+
+        Args:
+            matrix: 혈액검사 값 행렬, shape (n_rows, n_features)
+
+        Returns:
+            예측값 배열, shape (n_rows, 4)
+        """
+        if self.folded is not None:
+            # 스케일러가 임계값에 포함되어 있으므로 원시 값을 바로 평가
+            return self.folded.predict(matrix)
+
+        scaled_data = self.scaler.transform(matrix)
+        if self.compiled is not None:
+            return self.compiled.predict(scaled_data)
+        return self.model.predict(scaled_data)
+
+    def predict_timed(self, matrix: np.ndarray) -> Tuple[np.ndarray, float, float]:
+        """
+        `predict`와 같으나 스케일링과 모델 평가 소요 시간을 함께 반환
+
+        Returns:
+            (예측값 배열, 스케일링 시간(초), 모델 평가 시간(초)) 튜플
+            folded 엔진은 스케일링이 평가에 포함되므로 스케일링 시간은 0
+        """
+        start = time.perf_counter()
+        if self.folded is not None:
+            predictions = self.folded.predict(matrix)
+            return predictions, 0.0, time.perf_counter() - start
+
+        scaled_data = self.scaler.transform(matrix)
+        scaled = time.perf_counter()
+        if self.compiled is not None:
+            predictions = self.compiled.predict(scaled_data)
+        else:
+            predictions = self.model.predict(scaled_data)
+        return predictions, scaled - start, time.perf_counter() - scaled
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "engine": self.engine,
+            "loaded_at": self.loaded_at,
+            "source": self.source,
+        }
+
+
+def _file_version(*paths: str) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def load_bundle(engine: str, model_path: Optional[str] = None, scaler_path: Optional[str] = None,
+                artifact_dir: Optional[str] = None, verify_checksums: bool = False) -> ModelBundle:
+    """
+    pickle 파일 또는 메모리 매핑 아티팩트에서 ModelBundle 로드
+
+    Args:
+        engine: 요청한 추론 엔진 ("sklearn", "compiled", "folded")
+        model_path: pickle된 RandomForestRegressor 경로
+        scaler_path: pickle된 StandardScaler 경로
+        artifact_dir: 아티팩트 디렉토리 (지정하면 pickle 대신 사용)
+        verify_checksums: 아티팩트 배열의 sha256 확인 여부
+
+    Returns:
+        로드된 ModelBundle
+    """
+    if artifact_dir:
+        logger.debug(f"Mapping model artifact from {artifact_dir}...")
+        artifact = load_artifact(artifact_dir, verify_checksums=verify_checksums)
+        scaler = artifact.scaler()
+        source = {"artifact_dir": artifact_dir}
+
+        # 아티팩트에는 sklearn 모델이 없으므로 평탄화된 forest로만 평가
+        # (원본과의 동등성은 export 시점에 검증됨)
+        if engine == "compiled":
+            return ModelBundle(artifact.version, "compiled", scaler, compiled=artifact.compiled_forest(), source=source)
+        if engine != "folded":
+            logger.warning(f"INFERENCE_ENGINE={engine} is not available with a model artifact, using folded")
+        return ModelBundle(artifact.version, "folded", scaler, folded=artifact.folded_forest(), source=source)
+
+    # RandomForest Model Load
+    logger.debug("Attempting to load model...")
+    logger.debug(f"Model path exists : {os.path.exists(model_path)}")
+
+    if os.path.exists(model_path):
+        with open(model_path, "rb") as model_file:
+            model = pickle.load(model_file)
+        logger.debug("Model loaded successfully")
+    else:
+        logger.error(f"Model file not found at {model_path}")
+        raise FileNotFoundError(f"Model file not found at {model_path}")
+
+    # StandardScaler Load
+    logger.debug("Attempting to load scaler...")
+    logger.debug(f"Scaler path exists : {os.path.exists(scaler_path)}")
+
+    if os.path.exists(scaler_path):
+        with open(scaler_path, "rb") as scaler_file:
+            scaler = pickle.load(scaler_file)
+        logger.debug("Scaler loaded successfully")
+    else:
+        logger.error(f"Scaler file not found at {scaler_path}")
+        raise FileNotFoundError(f"Scaler file not found at {scaler_path}")
+
+    # pickle 파일 내용으로 모델 버전을 정함 (캐시 무효화 등에 사용)
+    version = _file_version(model_path, scaler_path)
+    source = {"model_path": model_path, "scaler_path": scaler_path}
+
+    compiled_model = None
+    folded_model = None
+
+    if engine in ("compiled", "folded"):
+        logger.debug("Compiling RandomForest into flat arrays...")
+        compiled_model = CompiledForest.from_sklearn(model)
+
+        # 원본 모델과 결과가 다르면 sklearn 경로로 되돌림
+        sample = np.random.default_rng(0).standard_normal((256, compiled_model.n_features))
+        max_error = compiled_model.verify(model, sample)
+        if max_error is None:
+            logger.debug(f"Compiled forest ready: {compiled_model.n_trees} trees, {len(compiled_model.threshold)} nodes")
+        else:
+            logger.error(f"Compiled forest does not match model.predict (max error {max_error}), falling back to sklearn")
+            compiled_model = None
+
+    if engine == "folded" and compiled_model is not None:
+        logger.debug("Folding StandardScaler into split thresholds...")
+        try:
+            folded_model = compiled_model.fold_scaler(scaler)
+            grid = verification_grid(folded_model, scaler, points_per_feature=5)
+            max_error = folded_model.verify(model, grid, scaler=scaler)
+            if max_error is None:
+                logger.debug(f"Folded forest verified on {len(grid)} inputs")
+            else:
+                logger.error(f"Folded forest does not match scaler + model (max error {max_error}), using compiled engine")
+                folded_model = None
+        except ValueError as e:
+            logger.error(f"Failed to fold scaler into forest: {str(e)}")
+            folded_model = None
+
+    actual_engine = "folded" if folded_model is not None else "compiled" if compiled_model is not None else "sklearn"
+    return ModelBundle(version, actual_engine, scaler, model=model, compiled=compiled_model,
+                       folded=folded_model, source=source)
+
+
+def probe_inputs(scaler, n_rows: int = 256) -> np.ndarray:
+    """
+    스케일러 평균 ± 3 표준편차 범위의 검증용 원시 입력 생성
+    """
+    rng = np.random.default_rng(0)
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    return mean + rng.uniform(-3, 3, size=(n_rows, len(mean))) * scale
+
+
+def validate_bundle(candidate: ModelBundle, active: Optional[ModelBundle] = None) -> Dict[str, Any]:
+    """
+    교체 전 후보 번들 검증
+
+    입력/출력 차원이 서비스 계약과 맞는지, 검증 입력에서 유한한 값을 내는지
+    확인하고, 현재 번들과의 출력 차이를 보고한다.
+
+    Args:
+        candidate: 검증할 번들
+        active: 현재 서비스 중인 번들
+
+    Returns:
+        검증 보고서 딕셔너리
+
+    Raises:
+        ValueError: 검증에 실패한 경우
+    """
+    if active is not None and candidate.n_features != active.n_features:
+        raise ValueError(f"Candidate expects {candidate.n_features} features, active model expects {active.n_features}")
+
+    probe = probe_inputs(candidate.scaler)
+    start = time.perf_counter()
+    predictions = candidate.predict(probe)
+    elapsed = time.perf_counter() - start
+
+    if predictions.shape != (len(probe), N_OUTPUTS):
+        raise ValueError(f"Candidate returned shape {predictions.shape}, expected {(len(probe), N_OUTPUTS)}")
+    if not np.isfinite(predictions).all():
+        raise ValueError("Candidate returned non-finite predictions")
+
+    report = {
+        "version": candidate.version,
+        "engine": candidate.engine,
+        "probe_rows": len(probe),
+        "probe_latency_ms": elapsed * 1000.0,
+    }
+    if active is not None:
+        deltas = np.abs(predictions - active.predict(probe))
+        report["max_abs_delta"] = deltas.max(axis=0).tolist()
+        report["mean_abs_delta"] = deltas.mean(axis=0).tolist()
+    return report
+
+
+def source_fingerprint(model_path: Optional[str], scaler_path: Optional[str], artifact_dir: Optional[str]) -> Optional[tuple]:
+    """
+    파일 변경 감지를 위한 (경로, 크기, 수정 시각) 목록
+    """
+    # 아티팩트 링크가 다른 버전 디렉토리로 바뀌면 해석된 경로가 달라짐
+    paths = [os.path.join(os.path.realpath(artifact_dir), MANIFEST_NAME)] if artifact_dir else [model_path, scaler_path]
+    try:
+        return tuple((path, os.path.getsize(path), os.path.getmtime(path)) for path in paths)
+    except OSError:
+        return None
+
+
+class ShadowScorer:
+    """
+    실 트래픽 일부를 후보 번들로 함께 평가하여 지연 시간과 출력 차이를 기록
+
+    응답은 항상 현재 번들의 결과로 나가며, 후보 평가는 응답 이후에 백그라운드에서
+    수행된다.
+    """
+
+    def __init__(self, candidate: ModelBundle, sample_rate: float, report: Optional[Dict[str, Any]] = None):
+        """
+        ShadowScorer 초기화
+
+        Args:
+            candidate: 섀도 평가할 후보 번들
+            sample_rate: 섀도 평가할 요청 비율 (0~1)
+            report: 후보 로드 시 검증 보고서
+        """
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.report = report or {}
+
+        # compare는 여러 워커 스레드에서 동시에 호출될 수 있음
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.active_latency_total = 0.0
+        self.candidate_latency_total = 0.0
+        self.max_abs_delta = np.zeros(N_OUTPUTS)
+        self.sum_abs_delta = np.zeros(N_OUTPUTS)
+
+    def should_sample(self) -> bool:
+        return random.random() < self.sample_rate
+
+    def compare(self, active: ModelBundle, matrix: np.ndarray):
+        """
+        같은 입력을 현재 번들과 후보 번들로 평가하여 통계에 반영 (워커 스레드에서 호출)
+
+        Args:
+            active: 현재 서비스 중인 번들
+            matrix: 평가된 입력 행렬
+        """
+        try:
+            start = time.perf_counter()
+            expected = active.predict(matrix)
+            active_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = self.candidate.predict(matrix)
+            candidate_elapsed = time.perf_counter() - start
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.warning(f"Shadow scoring failed for candidate {self.candidate.version}: {str(e)}")
+            return
+
+        deltas = np.abs(actual - expected)
+        with self._lock:
+            self.requests += 1
+            self.rows += len(matrix)
+            self.active_latency_total += active_elapsed
+            self.candidate_latency_total += candidate_elapsed
+            self.max_abs_delta = np.maximum(self.max_abs_delta, deltas.max(axis=0))
+            self.sum_abs_delta += deltas.sum(axis=0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "candidate": self.candidate.describe(),
+            "validation": self.report,
+            "sample_rate": self.sample_rate,
+            "requests": self.requests,
+            "rows": self.rows,
+            "errors": self.errors,
+            "mean_active_latency_ms": self.active_latency_total / self.requests * 1000.0 if self.requests else None,
+            "mean_candidate_latency_ms": self.candidate_latency_total / self.requests * 1000.0 if self.requests else None,
+            "max_abs_delta": self.max_abs_delta.tolist(),
+            "mean_abs_delta": (self.sum_abs_delta / self.rows).tolist() if self.rows else None,
+        }
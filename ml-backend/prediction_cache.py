@@ -0,0 +1,172 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# 입력 feature별 임상적으로 의미 있는 소수점 자릿수
+# (Glucose mg/dL, Albumin g/dL, BUN mg/dL, Phosphorus mg/dL, Total Protein g/dL)
+DEFAULT_DECIMALS = (0, 1, 0, 1, 1)
+
+
+class PredictionCache:
+    """
+    입력 벡터를 양자화한 값을 키로 하는 예측 결과 캐시
+
+    각 feature를 임상적으로 의미 있는 자릿수로 반올림한 벡터를 키로 사용하며,
+    양자화된 값으로 평가한 결과를 저장한다. 캐시 적중 여부와 관계없이 같은
+    입력에는 항상 같은 결과가 반환된다.
+    크기 제한 LRU 제거와 선택적 TTL을 지원하고, 모델 버전이 바뀌면 비워진다.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: Optional[float] = None,
+                 decimals: Sequence[int] = DEFAULT_DECIMALS, model_version: Optional[str] = None,
+                 n_features: Optional[int] = None):
+        """
+        PredictionCache 초기화
+
+        Args:
+            max_entries: 최대 저장 항목 수
+            ttl_seconds: 항목 유효 시간 (초), None이면 만료 없음
+            decimals: feature별 반올림 자릿수
+            model_version: 현재 로드된 모델 버전
+            n_features: 모델 입력 feature 수 (주어지면 decimals 길이와 같은지 확인)
+        """
+        # 길이가 다르면 quantize에서 일부 열이 초기화되지 않거나 IndexError가 나므로 미리 거부
+        if n_features is not None and len(decimals) != n_features:
+            raise ValueError(
+                f"Prediction cache decimals has {len(decimals)} entries, but the model expects {n_features} features"
+            )
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.decimals = tuple(decimals)
+        self.model_version = model_version
+
+        self._entries = OrderedDict()
+
+        # 통계
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_stores = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def quantize(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        입력 행렬을 feature별 자릿수로 반올림
+
+        Args:
+            matrix: 입력 행렬, shape (n_rows, n_features)
+
+        Returns:
+            양자화된 행렬
+        """
+        quantized = np.empty_like(matrix, dtype=np.float64)
+        for column, decimals in enumerate(self.decimals):
+            quantized[:, column] = np.round(matrix[:, column], decimals)
+        # -0.0과 0.0이 같은 키가 되도록 정규화
+        return quantized + 0.0
+
+    def set_model_version(self, model_version: str):
+        """
+        모델 버전을 갱신하고, 바뀐 경우 캐시를 비움
+
+        Args:
+            model_version: 새로 로드된 모델 버전
+        """
+        if model_version != self.model_version:
+            self.model_version = model_version
+            self.clear()
+            self.invalidations += 1
+
+    def lookup(self, quantized: np.ndarray) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """
+        양자화된 행들의 캐시 결과 조회
+
+        Args:
+            quantized: `quantize`로 양자화된 행렬
+
+        Returns:
+            (행별 캐시 결과 또는 None 리스트, 캐시에 없는 행 인덱스 리스트) 튜플
+        """
+        now = time.monotonic()
+        results = []
+        missing = []
+
+        for index, row in enumerate(quantized):
+            key = row.tobytes()
+            entry = self._entries.get(key)
+
+            if entry is not None and self.ttl_seconds is not None and now - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                results.append(None)
+                missing.append(index)
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                results.append(entry[0])
+
+        return results, missing
+
+    def store(self, quantized: np.ndarray, predictions: np.ndarray, model_version: Optional[str] = None):
+        """
+        양자화된 행들의 예측 결과 저장
+
+        Args:
+            quantized: 양자화된 입력 행렬
+            predictions: 각 행의 예측값 행렬
+            model_version: 조회 시점의 모델 버전. 그 사이 모델이 교체되었으면
+                이전 모델의 결과이므로 저장하지 않음
+        """
+        if model_version is not None and model_version != self.model_version:
+            self.stale_stores += 1
+            return
+
+        now = time.monotonic()
+        for row, prediction in zip(quantized, predictions):
+            key = row.tobytes()
+            self._entries[key] = (np.array(prediction), now)
+            self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        모든 항목 삭제
+        """
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        적중/미스 통계 조회
+
+        Returns:
+            통계 딕셔너리
+        """
+        lookups = self.hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "decimals": list(self.decimals),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_stores": self.stale_stores,
+        }
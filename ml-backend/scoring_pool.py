@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScoringPool:
+    """
+    CPU 연산인 모델 평가를 이벤트 루프 밖의 워커 프로세스에서 수행하는 풀
+
+    가능하면 fork로 워커를 만들어, 부모 프로세스에서 이미 로드한 model/scaler를
+    copy-on-write로 공유한다. fork를 쓸 수 없는 환경에서는 워커가 모듈을 import
+    하면서 model.pkl/scaler.pkl을 한 번씩 로드한다.
+    """
+
+    def __init__(self, workers: int):
+        """
+        ScoringPool 초기화
+
+        Args:
+            workers: 워커 프로세스 수
+        """
+        self.workers = workers
+        self.restarts = 0
+        self.inflight = 0
+        self.total_tasks = 0
+        self._lock = threading.Lock()
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        """
+        워커 프로세스 풀 생성
+        """
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        logger.debug(f"Starting scoring pool with {self.workers} workers ({context.get_start_method()})")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def warmup(self, fn: Callable, *args):
+        """
+        모든 워커를 미리 띄우고 평가 함수를 한 번씩 실행
+
+        요청을 받기 전(서버 startup 핸들러)에 호출하여 첫 요청이 fork 비용을 치르지
+        않게 한다. 워커가 모두 준비될 때까지 호출한 스레드(이벤트 루프)를 블로킹한다.
+
+        Args:
+            fn: 워커에서 실행할 함수 (모듈 최상위 함수여야 함)
+            *args: 함수 인자
+        """
+        futures = [self._executor.submit(fn, *args) for _ in range(self.workers)]
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        워커 프로세스에서 함수를 실행하고 결과를 기다림
+
+        Args:
+            fn: 워커에서 실행할 함수 (모듈 최상위 함수여야 함)
+            *args: 함수 인자
+
+        Returns:
+            함수 실행 결과
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        self.inflight += 1
+        self.total_tasks += 1
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # 워커가 비정상 종료되면 풀 전체가 사용 불가가 되므로 새로 만듦
+            # (같은 풀에서 실패한 호출이 여러 개여도 한 번만 교체)
+            if self._replace_executor(executor):
+                logger.error("Scoring pool is broken, restarting workers")
+            raise
+        finally:
+            self.inflight -= 1
+
+    def restart(self):
+        """
+        새 워커 프로세스 풀로 교체
+
+        모델이 교체된 뒤 호출하면 새 워커는 교체된 모델을 가진 상태로 fork된다.
+        기존 풀에 이미 제출된 작업은 기존 워커에서 끝까지 처리된다.
+        """
+        self._replace_executor(self._executor)
+
+    def _replace_executor(self, expected: ProcessPoolExecutor) -> bool:
+        """
+        현재 풀이 `expected`일 때만 새 풀로 교체 (이미 교체되었으면 False)
+        """
+        with self._lock:
+            if self._executor is not expected:
+                return False
+            self._executor = self._create_executor()
+            self.restarts += 1
+        expected.shutdown(wait=False)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        풀 상태 조회
+
+        Returns:
+            통계 딕셔너리
+        """
+        return {
+            "workers": self.workers,
+            "inflight": self.inflight,
+            "total_tasks": self.total_tasks,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self):
+        """
+        워커 프로세스 종료
+        """
+        self._executor.shutdown(wait=True)
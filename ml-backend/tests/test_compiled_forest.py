@@ -0,0 +1,44 @@
+"""
+CompiledForest가 sklearn RandomForestRegressor와 비트 단위로 같은 결과를 내는지 확인
+
+    cd ml-backend && python -m pytest tests
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from compiled_forest import CompiledForest, verification_grid
+
+N_FEATURES = 5
+N_OUTPUTS = 4
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    """
+    운영 모델과 같은 형태(입력 5개, 출력 4개)의 작은 모델과 스케일러
+    """
+    rng = np.random.default_rng(0)
+    # 혈액검사 값과 비슷한 크기의 원시 입력
+    raw = rng.uniform([50, 2, 5, 1, 4], [200, 5, 40, 8, 9], size=(400, N_FEATURES))
+    y = rng.standard_normal((400, N_OUTPUTS))
+    scaler = StandardScaler().fit(raw)
+    model = RandomForestRegressor(n_estimators=10, max_depth=8, random_state=0).fit(scaler.transform(raw), y)
+    holdout = rng.uniform([50, 2, 5, 1, 4], [200, 5, 40, 8, 9], size=(200, N_FEATURES))
+    return model, scaler, holdout
+
+
+def test_from_sklearn_matches_model(fitted):
+    model, scaler, holdout = fitted
+    X = scaler.transform(holdout)
+    np.testing.assert_array_equal(CompiledForest.from_sklearn(model).predict(X), model.predict(X))
+
+
+def test_fold_scaler_matches_scaled_model(fitted):
+    model, scaler, holdout = fitted
+    folded = CompiledForest.from_sklearn(model).fold_scaler(scaler)
+    np.testing.assert_array_equal(folded.predict(holdout), model.predict(scaler.transform(holdout)))
+    # 분할 임계값 바로 위아래의 원시 값에서도 분기가 같아야 함
+    grid = verification_grid(folded, scaler)
+    assert folded.verify(model, grid, scaler=scaler) is None